@@ -0,0 +1,413 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+import pyarrow.ipc as ipc
+from joblib import Parallel, delayed
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# AES-256-GCM data keys, 96-bit nonces (the GCM standard size) and per-id HKDF salts
+KEY_BYTES = 32
+NONCE_BYTES = 12
+SALT_BYTES = 16
+
+# HKDF context of the per-id data keys (changing it changes every derived key)
+KEY_INFO_PREFIX = b'datamesh-column-encryption-v1:'
+
+# Rows encrypted per worker task, and per record batch of the output
+CHUNK_ROWS = 50000
+
+# Keys file layout: one salt per id, sorted by id
+KEYS_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('salt', pa.binary(SALT_BYTES)),
+])
+
+
+def generate_master_key(file_path):
+    """
+    Create a random master key file, readable by its owner only. An existing key is never overwritten.
+    """
+    dir_path = os.path.dirname(file_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+
+    descriptor = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(os.urandom(KEY_BYTES))
+    print(f"Generated master key {file_path}")
+
+
+def load_master_key(file_path):
+    with open(file_path, 'rb') as file:
+        master_key = file.read()
+    if len(master_key) != KEY_BYTES:
+        raise ValueError(f"Master key {file_path} must be {KEY_BYTES} bytes, found {len(master_key)}")
+    return master_key
+
+
+def derive_key(master_key, id_value, salt):
+    """
+    Data key of an id: HKDF-SHA256 of the master key with the id's salt, bound to the id.
+
+    Only the salt is stored per id, deleting it makes the id's data unrecoverable (crypto-shredding)
+    without touching the encrypted data.
+    """
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=KEY_BYTES,
+        salt=salt,
+        info=KEY_INFO_PREFIX + str(id_value).encode('utf-8'),
+    ).derive(master_key)
+
+
+def associated_data(column, id_value):
+    """
+    GCM associated data of a value: its column and id, so a ciphertext cannot be moved to another cell.
+    """
+    return f"{column}\x00{id_value}".encode('utf-8')
+
+
+def id_strings(values):
+    """
+    Ids as the strings their keys are derived from, the same on the encryption and decryption paths
+    whatever the id type (e.g. 0.0 stays '0.0', timestamps keep their time), null ids stay None.
+
+    Parameters:
+        values (pandas.Series, pyarrow.Array or list): Id values.
+
+    Returns:
+        list: str(id) per id.
+    """
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        values = values.to_pandas()
+    values = pd.Series(values).astype(object)
+    return [str(value) if value is not None else None for value in values.where(values.notna(), None)]
+
+
+def check_ids(df, id_col):
+    """
+    Reject data with null ids: a row without a data subject has no data key to encrypt it with.
+    """
+    nulls = int(df[id_col].isna().sum())
+    if nulls:
+        raise ValueError(f"Id column {id_col} has {nulls} null values, every encrypted row needs an id")
+
+
+def keys_table(ids, existing=None):
+    """
+    Keys table (id, salt) for the given ids, keeping the salts of the ids already in existing.
+
+    Returns:
+        pyarrow.Table: One row per distinct id, sorted by id (KEYS_SCHEMA).
+    """
+    ids = pd.unique(np.array([id_value for id_value in id_strings(ids) if id_value is not None], dtype=object))
+    salts = {}
+    if existing is not None:
+        salts = dict(zip(existing.column('id').to_pylist(), existing.column('salt').to_pylist()))
+
+    ids = np.sort(np.union1d(ids.astype(str), np.array(list(salts), dtype=str)))
+    random_salts = os.urandom(SALT_BYTES * len(ids))
+    salt_values = [
+        salts.get(id_value) or random_salts[position * SALT_BYTES:(position + 1) * SALT_BYTES]
+        for position, id_value in enumerate(ids)
+    ]
+    return pa.table({'id': pa.array(ids.tolist(), pa.string()), 'salt': pa.array(salt_values, pa.binary(SALT_BYTES))},
+                    schema=KEYS_SCHEMA)
+
+
+def save_keys(keys, file_path):
+    dir_path = os.path.dirname(file_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+    with ipc.new_file(file_path, keys.schema) as writer:
+        writer.write_table(keys)
+
+
+def load_keys(file_path):
+    with pa.memory_map(file_path, 'r') as source:
+        return ipc.open_file(source).read_all()
+
+
+class KeyIndex:
+    """
+    Binary search index over a keys table: id -> offset of its salt, without merging the keys into the data.
+    """
+
+    def __init__(self, keys):
+        self.ids = np.array(keys.column('id').to_pylist(), dtype=object)
+        self.salts = keys.column('salt')
+
+    @classmethod
+    def load(cls, file_path):
+        return cls(load_keys(file_path))
+
+    def offsets(self, ids):
+        """
+        Offset of every id in the keys table, -1 for ids without a salt (never encrypted or shredded).
+        """
+        ids = np.asarray(ids, dtype=object)
+        position = np.searchsorted(self.ids, ids)
+        found = position < len(self.ids)
+        found[found] = self.ids[position[found]] == ids[found]
+        return np.where(found, position, -1)
+
+    def salts_for(self, ids):
+        """
+        Salt of every distinct id in ids.
+
+        Raises:
+            KeyError: If an id has no salt.
+        """
+        ids = pd.unique(np.asarray(ids, dtype=object))
+        offsets = self.offsets(ids)
+        if (offsets < 0).any():
+            raise KeyError(f"No key for ids {ids[offsets < 0][:10].tolist()}")
+        return dict(zip(ids.tolist(), self.salts.take(pa.array(offsets)).to_pylist()))
+
+
+def encrypt_chunk(master_key, salts, ids, columns):
+    """
+    Encrypt the values of a chunk of rows, one AESGCM object per id in the chunk.
+
+    Parameters:
+        master_key (bytes): The master key.
+        salts (dict): id -> salt, for the ids of the chunk.
+        ids (list): id per row (as strings).
+        columns (dict): Column name -> list of values to encrypt (None stays None).
+
+    Returns:
+        dict: Column name -> list of nonce + ciphertext + tag bytes per row.
+    """
+    ciphers = {id_value: AESGCM(derive_key(master_key, id_value, salts[id_value])) for id_value in set(ids)}
+
+    encrypted = {}
+    for column, values in columns.items():
+        nonces = os.urandom(NONCE_BYTES * len(values))
+        encrypted_values = []
+        for position, (id_value, value) in enumerate(zip(ids, values)):
+            if value is None:
+                encrypted_values.append(None)
+                continue
+            nonce = nonces[position * NONCE_BYTES:(position + 1) * NONCE_BYTES]
+            ciphertext = ciphers[id_value].encrypt(nonce, str(value).encode('utf-8'), associated_data(column, id_value))
+            encrypted_values.append(nonce + ciphertext)
+        encrypted[column] = encrypted_values
+    return encrypted
+
+
+def decrypt_value(cipher, column, id_value, encrypted):
+    """
+    Decrypt one nonce + ciphertext + tag value (None stays None).
+    """
+    if encrypted is None:
+        return None
+    nonce, ciphertext = encrypted[:NONCE_BYTES], encrypted[NONCE_BYTES:]
+    return cipher.decrypt(nonce, ciphertext, associated_data(column, id_value)).decode('utf-8')
+
+
+def decrypt_chunk(master_key, salts, ids, columns):
+    """
+    Decrypt the values of a chunk of rows, one AESGCM object per id in the chunk (the inverse of encrypt_chunk).
+
+    Returns:
+        dict: Column name -> list of plaintext strings per row.
+    """
+    ciphers = {id_value: AESGCM(derive_key(master_key, id_value, salts[id_value])) for id_value in set(ids)}
+    return {
+        column: [decrypt_value(ciphers[id_value], column, id_value, value) for id_value, value in zip(ids, values)]
+        for column, values in columns.items()
+    }
+
+
+def encrypted_schema(df, columns):
+    """
+    Arrow schema of the encrypted output: the encrypted columns as binary, the others as inferred from their values.
+
+    The types are inferred from the whole column (an object column can only be typed from its values, and
+    nested values such as lists or dicts from all of them), so every chunk converts to the same schema.
+    """
+    passed = pa.Schema.from_pandas(df.drop(columns=columns), preserve_index=False)
+    return pa.schema([
+        pa.field(column, pa.binary()) if column in columns else passed.field(column)
+        for column in df.columns
+    ])
+
+
+def encrypt_batches(df, id_col, columns, master_key, keys, chunk_rows=CHUNK_ROWS, n_jobs=-1, schema=None):
+    """
+    Encrypt columns of a DataFrame in chunks across a process pool.
+
+    Parameters:
+        df (pandas.DataFrame): Data to encrypt.
+        id_col (str): Column identifying the data subject (each id has its own data key).
+        columns (list): Columns to encrypt.
+        master_key (bytes): The master key.
+        keys (pyarrow.Table): Keys table covering every id of df (keys_table).
+        chunk_rows (int): Rows per worker task and per output record batch.
+        n_jobs (int): Worker processes (-1 = all cores).
+        schema (pyarrow.Schema): Output schema, when already computed (encrypted_schema).
+
+    Yields:
+        pyarrow.RecordBatch: The encrypted rows, in order, as soon as each chunk is done.
+    """
+    check_ids(df, id_col)
+    salts = dict(zip(keys.column('id').to_pylist(), keys.column('salt').to_pylist()))
+    schema = encrypted_schema(df, columns) if schema is None else schema
+    ids = id_strings(df[id_col])
+
+    def chunk_task(start):
+        chunk_ids = ids[start:start + chunk_rows]
+        chunk_columns = {
+            column: df[column].iloc[start:start + chunk_rows].astype(object).where(lambda values: values.notna(), None).tolist()
+            for column in columns
+        }
+        return delayed(encrypt_chunk)(master_key, {id_value: salts[id_value] for id_value in set(chunk_ids)},
+                                      chunk_ids, chunk_columns)
+
+    starts = range(0, len(df), chunk_rows)
+    results = Parallel(n_jobs=n_jobs, backend='loky', return_as='generator')(chunk_task(start) for start in starts)
+    for start, encrypted in zip(starts, results):
+        chunk = df.iloc[start:start + chunk_rows]
+        arrays = [
+            pa.array(encrypted[field.name], pa.binary()) if field.name in encrypted
+            else pa.Array.from_pandas(chunk[field.name], type=field.type)
+            for field in schema
+        ]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def encrypt_to_file(df, id_col, columns, master_key, keys_path, output_path, chunk_rows=CHUNK_ROWS, n_jobs=-1):
+    """
+    Encrypt columns of a DataFrame into an Arrow IPC file, written batch by batch, and save the keys file.
+
+    Ids already in an existing keys file keep their salt (and so their data key). Null ids raise ValueError.
+
+    Returns:
+        int: Number of rows written.
+    """
+    # Before anything is written
+    check_ids(df, id_col)
+    existing = load_keys(keys_path) if os.path.exists(keys_path) else None
+    keys = keys_table(df[id_col], existing)
+    save_keys(keys, keys_path)
+
+    dir_path = os.path.dirname(output_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+
+    rows = 0
+    schema = encrypted_schema(df, columns)
+    with ipc.new_file(output_path, schema) as writer:
+        for batch in encrypt_batches(df, id_col, columns, master_key, keys, chunk_rows=chunk_rows, n_jobs=n_jobs,
+                                     schema=schema):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    print(f"Encrypted {len(columns)} columns of {rows} rows ({keys.num_rows} ids) to {output_path}")
+    return rows
+
+
+def decrypted_schema(encrypted_path, columns, select=None):
+    """
+    Arrow schema of the decrypted output: the selected columns of the encrypted file, the decrypted ones as strings.
+    """
+    with pa.memory_map(encrypted_path, 'r') as source:
+        schema = ipc.open_file(source).schema.remove_metadata()
+    names = schema.names if select is None else list(select)
+    return pa.schema([pa.field(name, pa.string()) if name in columns else schema.field(name) for name in names])
+
+
+def selected_batches(encrypted_path, id_col, names, ids=None, chunk_rows=CHUNK_ROWS):
+    """
+    Record batches of the encrypted file, reduced to the given columns and to the rows of the given ids.
+
+    The file is memory mapped, so the columns and rows left out are never read.
+
+    Yields:
+        tuple: (record batch of at most chunk_rows rows, list of its ids as strings)
+    """
+    wanted = None if ids is None else pa.array(id_strings(ids), pa.string())
+    with pa.memory_map(encrypted_path, 'r') as source:
+        reader = ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            batch_ids = pa.array(id_strings(batch.column(id_col)), pa.string())
+            if wanted is not None:
+                mask = pc.is_in(batch_ids, value_set=wanted)
+                batch, batch_ids = batch.filter(mask), batch_ids.filter(mask)
+            batch = batch.select(names)
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows), batch_ids.slice(start, chunk_rows).to_pylist()
+
+
+def decrypt_batches(encrypted_path, key_index, master_key, id_col, columns, ids=None, select=None,
+                    chunk_rows=CHUNK_ROWS, n_jobs=-1):
+    """
+    Decrypt columns of an encrypted Arrow IPC file in chunks across a process pool.
+
+    Only the requested rows and columns are read and decrypted, and only the keys of the ids met are
+    derived, so re-identifying a few subjects does not cost a pass over the whole table and keys.
+
+    Parameters:
+        encrypted_path (str): Arrow IPC file written by encrypt_to_file.
+        key_index (KeyIndex): Index over the keys table.
+        master_key (bytes): The master key.
+        id_col (str): Column identifying the data subject.
+        columns (list): Encrypted columns to decrypt.
+        ids (list): Ids whose rows are decrypted (None = every row).
+        select (list): Columns of the output (None = every column of the file).
+        chunk_rows (int): Rows per worker task.
+        n_jobs (int): Worker processes (-1 = all cores).
+
+    Yields:
+        pyarrow.RecordBatch: The decrypted rows, in file order, as soon as each chunk is done.
+    """
+    schema = decrypted_schema(encrypted_path, columns, select)
+    decrypted_columns = [name for name in schema.names if name in columns]
+    chunks = []
+
+    def chunk_task(batch, chunk_ids):
+        chunks.append(batch)
+        chunk_columns = {column: batch.column(column).to_pylist() for column in decrypted_columns}
+        return delayed(decrypt_chunk)(master_key, key_index.salts_for(chunk_ids), chunk_ids, chunk_columns)
+
+    tasks = selected_batches(encrypted_path, id_col, schema.names, ids=ids, chunk_rows=chunk_rows)
+    results = Parallel(n_jobs=n_jobs, backend='loky', return_as='generator')(
+        chunk_task(batch, chunk_ids) for batch, chunk_ids in tasks if batch.num_rows
+    )
+    for decrypted in results:
+        batch = chunks.pop(0)
+        arrays = [
+            pa.array(decrypted[field.name], pa.string()) if field.name in decrypted else batch.column(field.name)
+            for field in schema
+        ]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def decrypt_to_csv(encrypted_path, keys_path, master_key, id_col, columns, output_path, ids=None, select=None,
+                   chunk_rows=CHUNK_ROWS, n_jobs=-1):
+    """
+    Decrypt columns of an encrypted Arrow IPC file into a CSV file, written batch by batch.
+
+    Returns:
+        int: Number of rows written.
+    """
+    key_index = KeyIndex.load(keys_path)
+    schema = decrypted_schema(encrypted_path, columns, select)
+
+    dir_path = os.path.dirname(output_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+
+    rows = 0
+    with csv.CSVWriter(output_path, schema) as writer:
+        for batch in decrypt_batches(encrypted_path, key_index, master_key, id_col, columns, ids=ids, select=select,
+                                     chunk_rows=chunk_rows, n_jobs=n_jobs):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    print(f"Decrypted {len(columns)} columns of {rows} rows to {output_path}")
+    return rows
@@ -0,0 +1,147 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371  # Earth radius in kilometers
+
+# Relative slack added to the BallTree radius query so that points lying exactly on the
+# radius are never dropped by rounding; candidates are then re-checked with haversine_km
+RADIUS_QUERY_SLACK = 1e-9
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine distance in kilometers between two sets of coordinates.
+
+    Uses the same formula as the scalar haversine the feature jobs were built on,
+    so distances match them value for value.
+
+    Parameters:
+        lat1, lon1 (array-like): Origin coordinates in degrees.
+        lat2, lon2 (array-like): Destination coordinates in degrees (broadcastable to the origins).
+
+    Returns:
+        numpy.ndarray: Distances in kilometers.
+    """
+    lat1 = np.asarray(lat1, dtype=float)
+    lon1 = np.asarray(lon1, dtype=float)
+    lat2 = np.asarray(lat2, dtype=float)
+    lon2 = np.asarray(lon2, dtype=float)
+
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def nearby_counts_and_distances(origin_lat, origin_lon, target_lat, target_lon, radius):
+    """
+    Count the targets within a radius of every origin and find the closest one, in one batched query.
+
+    A haversine BallTree is built over the targets, so the cost is O((origins + targets) log targets)
+    instead of the O(origins x targets) of a pairwise loop.
+
+    Parameters:
+        origin_lat, origin_lon (array-like): Coordinates (degrees) of the points to enrich, e.g. bus stops.
+        target_lat, target_lon (array-like): Coordinates (degrees) of the points to look for, e.g. POIs.
+        radius (float): Radius in kilometers to consider a target as "nearby".
+
+    Returns:
+        tuple: (counts, closest_km) arrays aligned with the origins. closest_km is NaN when there are no targets.
+    """
+    origin_lat = np.asarray(origin_lat, dtype=float)
+    origin_lon = np.asarray(origin_lon, dtype=float)
+    target_lat = np.asarray(target_lat, dtype=float)
+    target_lon = np.asarray(target_lon, dtype=float)
+
+    n_origins = len(origin_lat)
+    counts = np.zeros(n_origins, dtype=int)
+    closest_km = np.full(n_origins, np.nan)
+
+    if n_origins == 0 or len(target_lat) == 0:
+        return counts, closest_km
+
+    origins = np.radians(np.column_stack([origin_lat, origin_lon]))
+    tree = BallTree(np.radians(np.column_stack([target_lat, target_lon])), metric='haversine')
+
+    # Closest target, with the distance recomputed through haversine_km for consistency
+    nearest = tree.query(origins, k=1, return_distance=False)[:, 0]
+    closest_km = haversine_km(origin_lat, origin_lon, target_lat[nearest], target_lon[nearest])
+
+    # Candidates inside the (slightly padded) radius, re-checked with the exact distance
+    candidates = tree.query_radius(origins, r=radius / EARTH_RADIUS_KM * (1 + RADIUS_QUERY_SLACK))
+    candidates_per_origin = np.fromiter((len(c) for c in candidates), dtype=int, count=n_origins)
+
+    if candidates_per_origin.sum() > 0:
+        owner = np.repeat(np.arange(n_origins), candidates_per_origin)
+        target = np.concatenate(candidates)
+        distance = haversine_km(origin_lat[owner], origin_lon[owner], target_lat[target], target_lon[target])
+        counts = np.bincount(owner[distance <= radius], minlength=n_origins)
+
+    return counts, closest_km
+
+
+# Types of points of interest the nearby features are computed for
+POI_ENTITY_TYPES = [
+    'school',
+    'hospital',
+    'university',
+    'public office',
+    'tourist attraction',
+    'train station',
+    'subway station',
+]
+
+
+def add_nearby_entity_fields(locations, entities, radius, entity_types=POI_ENTITY_TYPES,
+                             location_lat_key='lat', location_lon_key='lon',
+                             entity_lat_key='lat', entity_lon_key='long'):
+    """
+    Adds number_of_nearby_<type>s and closest_<type>_km fields to each location for every entity type.
+
+    Both point sets are converted to NumPy arrays once and every type is resolved with a single
+    batched query, so any pair of lat/lon datasets (bus stops, wifi hotspots, ...) can be enriched.
+
+    Parameters:
+        locations (list): Dicts to enrich (e.g. bus stops or wifi hotspots). Locations without coordinates are left untouched.
+        entities (list): Dicts with coordinates and a 'type' field (e.g. Porto main institutions).
+        radius (float): Radius in kilometers to consider an entity as "nearby".
+        entity_types (list): Entity types to compute the fields for.
+        location_lat_key, location_lon_key (str): Coordinate keys in the locations.
+        entity_lat_key, entity_lon_key (str): Coordinate keys in the entities.
+
+    Returns:
+        list: The locations with the new fields added.
+    """
+    located = [
+        location for location in locations
+        if location.get(location_lat_key) is not None and location.get(location_lon_key) is not None
+    ]
+    location_lat = np.array([location[location_lat_key] for location in located], dtype=float)
+    location_lon = np.array([location[location_lon_key] for location in located], dtype=float)
+
+    for entity_type in entity_types:
+        # Entities of this type with valid coordinates
+        filtered_entities = [
+            entity for entity in entities
+            if entity.get('type') == entity_type
+            and entity.get(entity_lat_key) is not None and entity.get(entity_lon_key) is not None
+        ]
+
+        counts, closest_km = nearby_counts_and_distances(
+            location_lat,
+            location_lon,
+            [entity[entity_lat_key] for entity in filtered_entities],
+            [entity[entity_lon_key] for entity in filtered_entities],
+            radius
+        )
+
+        # Update the count and closest distance fields
+        field_name = entity_type.replace(" ", "_")
+        for location, count, min_distance in zip(located, counts, closest_km):
+            location[f'number_of_nearby_{field_name}s'] = int(count)
+            location[f'closest_{field_name}_km'] = (
+                float(min_distance) if not np.isnan(min_distance) else None
+            )
+
+    return locations
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+import application.services.http_client_utils as hcu
+import application.services.geo_proximity_service as gps
+
+# Google Geocoding API endpoint
+GEOCODE_API_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+# Coordinates are rounded to this many decimal places to build the cache key (~0.1 m)
+COORDINATE_PRECISION = 6
+
+# Maximum distance in kilometers for the offline nearest-known-address fallback
+FALLBACK_MAX_DISTANCE_KM = 0.05
+
+REQUEST_TIMEOUT = 30  # seconds
+
+
+def open_cache(db_path):
+    """
+    Open (or create) the SQLite reverse-geocoding cache.
+
+    A NULL address records a coordinate the API has no result for, so it is not asked again.
+
+    Parameters:
+        db_path (str): Path of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    dir_path = os.path.dirname(db_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS addresses ('
+        'lat REAL NOT NULL, lon REAL NOT NULL, address TEXT, PRIMARY KEY (lat, lon))'
+    )
+    return conn
+
+
+def cache_key(lat, lon):
+    return round(float(lat), COORDINATE_PRECISION), round(float(lon), COORDINATE_PRECISION)
+
+
+def fetch_address(session, rate_limiter, lat, lon, api_key, base_url=GEOCODE_API_URL):
+    """
+    Reverse-geocode one coordinate with the Geocoding API.
+
+    Returns:
+        tuple: (found, address). found is False on transport/API errors (nothing to cache),
+        True with address None when the API has no result for the coordinate.
+    """
+    rate_limiter.wait()
+    try:
+        response = session.get(base_url, params={'latlng': f'{lat},{lon}', 'key': api_key}, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        # The exception message carries the request URL (and API key), only report its type
+        print(f"Error with Geocoding API: {type(e).__name__}")
+        return False, None
+
+    if response.status_code != 200:
+        print(f"Error with Geocoding API: {response.status_code}")
+        return False, None
+
+    try:
+        result = response.json()
+    except ValueError:
+        print("Error with Geocoding API: response is not JSON")
+        return False, None
+
+    status = result.get('status') if isinstance(result, dict) else None
+    if status == 'OK':
+        return True, result['results'][0]['formatted_address']
+    if status == 'ZERO_RESULTS':
+        return True, None
+
+    print(f"Error with Geocoding API: {status or 'response has no status'}")
+    return False, None
+
+
+def nearest_known_address(conn, lat, lon, max_distance_km=FALLBACK_MAX_DISTANCE_KM):
+    """
+    Offline fallback: the cached address closest to a coordinate, if within max_distance_km.
+    """
+    known = conn.execute('SELECT lat, lon, address FROM addresses WHERE address IS NOT NULL').fetchall()
+    if not known:
+        return None
+
+    known_lat, known_lon, known_address = zip(*known)
+    distances = gps.haversine_km(lat, lon, np.array(known_lat), np.array(known_lon))
+    closest = int(np.argmin(distances))
+    return known_address[closest] if distances[closest] <= max_distance_km else None
+
+
+def reverse_geocode(coordinates, api_key, cache_path, base_url=GEOCODE_API_URL, max_workers=8,
+                    requests_per_second=10, fallback_max_distance_km=FALLBACK_MAX_DISTANCE_KM):
+    """
+    Reverse-geocode a list of coordinates, only paying the API for coordinates not seen before.
+
+    Cached coordinates are answered from SQLite, the rest are requested concurrently on a
+    bounded worker pool (pooled session with retries, rate limited). Coordinates the API
+    cannot resolve fall back to the nearest cached address.
+
+    Parameters:
+        coordinates (list): (lat, lon) pairs.
+        api_key (str): Google API key.
+        cache_path (str): Path of the SQLite cache.
+        base_url (str): Geocoding endpoint (a local stub server in tests).
+        max_workers (int): Maximum concurrent requests.
+        requests_per_second (float): Request rate limit.
+        fallback_max_distance_km (float): Radius of the nearest-known-address fallback.
+
+    Returns:
+        list: Address per coordinate (None when not found).
+    """
+    conn = open_cache(cache_path)
+    try:
+        keys = [cache_key(lat, lon) for lat, lon in coordinates]
+
+        # Addresses already in the cache
+        cached = {}
+        for key in set(keys):
+            row = conn.execute('SELECT address FROM addresses WHERE lat = ? AND lon = ?', key).fetchone()
+            if row is not None:
+                cached[key] = row[0]
+
+        missing = sorted(set(keys) - set(cached))
+        print(f"Geocoding {len(missing)} new coordinates ({len(cached)} cached)")
+
+        if missing:
+            session = hcu.create_session(pool_size=max_workers)
+            rate_limiter = hcu.RateLimiter(requests_per_second)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(
+                    lambda key: fetch_address(session, rate_limiter, key[0], key[1], api_key, base_url),
+                    missing
+                ))
+
+            # Cache the answered coordinates (SQLite writes stay on this thread)
+            answered = [(key[0], key[1], address) for key, (found, address) in zip(missing, results) if found]
+            conn.executemany('INSERT OR REPLACE INTO addresses (lat, lon, address) VALUES (?, ?, ?)', answered)
+            conn.commit()
+
+            for key, (found, address) in zip(missing, results):
+                cached[key] = address
+
+        # Offline fallback for the coordinates still without an address
+        for key, address in cached.items():
+            if address is None:
+                cached[key] = nearest_known_address(conn, key[0], key[1], fallback_max_distance_km)
+
+        return [cached[key] for key in keys]
+
+    finally:
+        conn.close()
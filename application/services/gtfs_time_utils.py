@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# Code of a missing or malformed time
+INVALID_TIME = -1
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# GTFS HH:MM:SS (H:MM:SS allowed), hours may go past 24 for trips running after midnight
+GTFS_TIME_PATTERN = r'^\s*(\d{1,3}):([0-5]\d):([0-5]\d)\s*$'
+
+
+def parse_gtfs_times(times):
+    """
+    Parse GTFS HH:MM:SS times into seconds since the start of the service day.
+
+    Times past 24:00:00 (trips running after midnight) are kept, e.g. 25:10:00 -> 90600.
+    Only the distinct strings are parsed (a feed has far fewer distinct times than stop_times rows)
+    and the result is broadcast back with their integer codes.
+
+    Parameters:
+        times (array-like): GTFS time strings.
+
+    Returns:
+        numpy.ndarray: int32 seconds per time, INVALID_TIME where missing or malformed.
+    """
+    codes, uniques = pd.factorize(pd.Series(times, dtype=object))
+    parts = pd.Series(uniques, dtype=object).str.extract(GTFS_TIME_PATTERN).astype(float)
+    unique_seconds = (parts[0] * 3600 + parts[1] * 60 + parts[2]).fillna(INVALID_TIME).to_numpy(dtype=np.int32)
+
+    # Append the invalid code so missing values (code -1) pick it up
+    unique_seconds = np.append(unique_seconds, np.int32(INVALID_TIME))
+    return unique_seconds[codes]
+
+
+def slice_labels(width_minutes=60, wrap=True, max_seconds=SECONDS_PER_DAY):
+    """
+    Labels of the time slices, e.g. '07:00-07:59' for hourly slices.
+
+    Parameters:
+        width_minutes (int): Slice width in minutes.
+        wrap (bool): Whether slices are wrapped to the 24h clock (one day of labels).
+        max_seconds (int): Latest time to label when not wrapping (e.g. 26:59:59 for overnight service).
+
+    Returns:
+        list: Label per slice code.
+    """
+    width = width_minutes * 60
+    slices = SECONDS_PER_DAY // width if wrap else max_seconds // width + 1
+    starts = np.arange(slices) * width_minutes
+    ends = starts + width_minutes - 1
+    return [f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}" for start, end in zip(starts, ends)]
+
+
+def time_slices(seconds, width_minutes=60, wrap=True):
+    """
+    Bucket seconds since the start of the service day into fixed width time slices.
+
+    Parameters:
+        seconds (numpy.ndarray): Seconds from parse_gtfs_times (INVALID_TIME entries stay missing).
+        width_minutes (int): Slice width in minutes, must divide a day.
+        wrap (bool): Map times past 24:00:00 back to the clock time (25:10 -> the 01:00-01:59 slice).
+            Otherwise they get their own slices (24:00-24:59, ...).
+
+    Returns:
+        pandas.Categorical: Slice per time, with integer codes ordered by time of day.
+    """
+    width = width_minutes * 60
+    if SECONDS_PER_DAY % width:
+        raise ValueError(f"Slice width of {width_minutes} minutes does not divide a day")
+
+    seconds = np.asarray(seconds)
+    valid = seconds != INVALID_TIME
+    codes = np.full(len(seconds), -1, dtype=np.int32)
+    codes[valid] = seconds[valid] // width
+    if wrap:
+        codes[valid] %= SECONDS_PER_DAY // width
+
+    max_seconds = int(seconds[valid].max()) if valid.any() else 0
+    labels = slice_labels(width_minutes, wrap=wrap, max_seconds=max(max_seconds, SECONDS_PER_DAY - 1))
+    return pd.Categorical.from_codes(codes, categories=labels)
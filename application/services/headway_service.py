@@ -0,0 +1,115 @@
+import numpy as np
+
+import application.services.gtfs_time_utils as gtu
+
+# Percentiles of the headway distribution reported per key
+HEADWAY_PERCENTILES = [50, 90]
+
+
+def sorted_gaps(keys, seconds):
+    """
+    Gaps between consecutive departures of every key, from one sort of all rows.
+
+    Parameters:
+        keys (pandas.DataFrame): Key columns per row (e.g. route_id, direction_id, service_id, stop_id).
+        seconds (numpy.ndarray): Seconds since the start of the service day per row (INVALID_TIME rows are ignored).
+
+    Returns:
+        tuple: (key_values, gap_codes, gaps, gap_end_seconds). key_values is a DataFrame with one row per
+        key code; gaps (seconds) are ordered by key code, then by time.
+    """
+    groups = keys.groupby(list(keys.columns), sort=True)
+    # Rows with a null key belong to no group (NaN code), mark them -1 so they are dropped below
+    codes = groups.ngroup().fillna(-1).astype(np.int64).to_numpy()
+    key_values = groups.size().index.to_frame(index=False)
+
+    seconds = np.asarray(seconds)
+    valid = (codes >= 0) & (seconds != gtu.INVALID_TIME)
+    codes, seconds = codes[valid], seconds[valid].astype(np.int64)
+
+    order = np.lexsort((seconds, codes))
+    codes, seconds = codes[order], seconds[order]
+
+    # Consecutive rows of the same key
+    same_key = codes[1:] == codes[:-1]
+    gaps = (seconds[1:] - seconds[:-1])[same_key]
+    return key_values, codes[1:][same_key], gaps, seconds[1:][same_key]
+
+
+def grouped_percentiles(gap_codes, gaps, counts, percentiles):
+    """
+    Per key percentiles of the gaps (linear interpolation, as numpy.percentile), without a loop over keys.
+
+    The gaps come grouped by key (sorted_gaps), only their order within each key is missing: they are
+    sorted once as key code and gap packed in one int64 (gaps, in seconds, fit in the low 32 bits),
+    a plain value sort instead of a two-key lexsort and its gather.
+
+    Returns:
+        numpy.ndarray: (keys, percentiles) values, NaN for keys without gaps.
+    """
+    packed = np.sort((gap_codes.astype(np.int64) << 32) | gaps.astype(np.int64))
+    values = (packed & 0xFFFFFFFF).astype(np.float64)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    has_gaps = counts > 0
+
+    result = np.full((len(counts), len(percentiles)), np.nan)
+    for column, percentile in enumerate(percentiles):
+        position = starts[has_gaps] + percentile / 100 * (counts[has_gaps] - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        result[has_gaps, column] = values[lower] + (values[upper] - values[lower]) * (position - lower)
+    return result
+
+
+def headway_stats(keys, seconds, percentiles=HEADWAY_PERCENTILES):
+    """
+    Headway distribution per key: departures, mean, percentiles and maximum gap, in minutes.
+
+    Parameters:
+        keys (pandas.DataFrame): Key columns per row.
+        seconds (numpy.ndarray): Seconds since the start of the service day per row.
+        percentiles (list): Percentiles to report.
+
+    Returns:
+        pandas.DataFrame: Key columns plus departures, headway_mean_min, headway_p<N>_min and headway_max_min,
+        for the keys with at least two departures.
+    """
+    key_values, gap_codes, gaps, _ = sorted_gaps(keys, seconds)
+    counts = np.bincount(gap_codes, minlength=len(key_values))
+    has_gaps = counts > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(gap_codes, weights=gaps, minlength=len(key_values)) / counts
+
+    maximum = np.full(len(key_values), np.nan)
+    np.fmax.at(maximum, gap_codes, gaps.astype(np.float64))
+
+    stats = key_values.copy()
+    stats['departures'] = counts + 1
+    stats['headway_mean_min'] = mean / 60
+    for column, values in zip(percentiles, grouped_percentiles(gap_codes, gaps, counts, percentiles).T):
+        stats[f'headway_p{column}_min'] = values / 60
+    stats['headway_max_min'] = maximum / 60
+    return stats[has_gaps].reset_index(drop=True)
+
+
+def hourly_headways(keys, seconds):
+    """
+    Mean headway per key and clock hour (a gap counts in the hour of the departure closing it).
+
+    Returns:
+        pandas.DataFrame: Key columns plus hour (0-23), headways (number of gaps) and headway_mean_min.
+    """
+    key_values, gap_codes, gaps, gap_end_seconds = sorted_gaps(keys, seconds)
+    hours = (gap_end_seconds // 3600) % 24
+    cells = gap_codes * 24 + hours
+
+    counts = np.bincount(cells, minlength=len(key_values) * 24)
+    totals = np.bincount(cells, weights=gaps, minlength=len(key_values) * 24)
+    cell_index = np.flatnonzero(counts)
+
+    hourly = key_values.iloc[cell_index // 24].reset_index(drop=True)
+    hourly['hour'] = (cell_index % 24).astype(np.int8)
+    hourly['headways'] = counts[cell_index]
+    hourly['headway_mean_min'] = totals[cell_index] / counts[cell_index] / 60
+    return hourly
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# HTTP status codes worth retrying (rate limited or transient server errors)
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+def create_session(pool_size=8, retries=3, backoff_factor=0.5):
+    """
+    Create a requests session with a connection pool and retry/backoff on transient errors.
+
+    Parameters:
+        pool_size (int): Maximum number of pooled connections per host (match the worker count).
+        retries (int): Number of retries for failed requests.
+        backoff_factor (float): Exponential backoff factor between retries, in seconds.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=['GET'],
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls so that at most requests_per_second start every second.
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        # Reserve the next free slot, then sleep outside the lock until it comes
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON responses, one file per query key.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        file_path = self.path(key)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def set(self, key, value):
+        # Write to a temporary file first so concurrent readers never see a partial response
+        file_path = self.path(key)
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(value, file, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
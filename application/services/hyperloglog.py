@@ -0,0 +1,199 @@
+import math
+import os
+import numpy as np
+import pandas as pd
+
+# Default standard error of the distinct count estimates (1.04 / sqrt(registers))
+DEFAULT_RELATIVE_ERROR = 0.02
+
+# Register count bounds, 2^4 to 2^16 registers per sketch
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+HASH_BITS = 64
+
+
+def precision_for_error(relative_error=DEFAULT_RELATIVE_ERROR):
+    """
+    Smallest precision p (2^p registers) whose standard error is at most relative_error.
+    """
+    precision = math.ceil(2 * math.log2(1.04 / relative_error))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+def standard_error(precision):
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def hash_values(values):
+    """
+    64-bit hashes of the values (stable across runs and processes, unlike the builtin hash).
+    """
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def register_ranks(hashes, precision):
+    """
+    Register (first p bits) and rank (position of the first 1 bit in the remaining bits) of every hash.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    registers = (hashes >> np.uint64(HASH_BITS - precision)).astype(np.int32)
+    remaining = hashes & np.uint64((1 << (HASH_BITS - precision)) - 1)
+
+    # Bit length of the remaining bits, floor(log2) corrected where float rounding went up a power of two
+    bit_length = np.floor(np.log2(np.maximum(remaining, np.uint64(1)).astype(np.float64))).astype(np.int64) + 1
+    bit_length[remaining == 0] = 0
+    rounded_up = (bit_length > 0) & (np.left_shift(np.uint64(1), np.maximum(bit_length - 1, 0).astype(np.uint64)) > remaining)
+    bit_length -= rounded_up
+
+    ranks = (HASH_BITS - precision) - bit_length + 1
+    return registers, ranks.astype(np.uint8)
+
+
+def compact(keys, registers, ranks):
+    """
+    One entry per (key, register), with the highest rank, ordered by key and register.
+    """
+    order = np.lexsort((ranks, registers, keys))
+    keys, registers, ranks = keys[order], registers[order], ranks[order]
+    last = np.append((keys[1:] != keys[:-1]) | (registers[1:] != registers[:-1]), True)
+    return keys[last], registers[last], ranks[last]
+
+
+def sigma(x):
+    """
+    sigma(x) = x + sum_k x^(2^k) 2^(k-1), the correction for the empty registers (x: their fraction, below 1).
+    """
+    x = np.asarray(x, dtype=np.float64).copy()
+    y, z = 1.0, x.copy()
+    while True:
+        x = x * x
+        previous = z
+        z = z + x * y
+        y += y
+        if np.array_equal(z, previous):
+            return z
+
+
+def tau(x):
+    """
+    tau(x) = (1 - x - sum_k (1 - x^(2^-k))^2 2^-k) / 3, the correction for the saturated registers (x: 1 minus their fraction).
+    """
+    x = np.asarray(x, dtype=np.float64).copy()
+    edge = (x == 0) | (x == 1)
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        previous = z
+        y *= 0.5
+        z = z - np.square(1 - x) * y
+        if np.array_equal(z, previous):
+            return np.where(edge, 0.0, z / 3)
+
+
+class HyperLogLogSketches:
+    """
+    HyperLogLog distinct count sketches of many keys (e.g. hotspot-hours), stored sparsely.
+
+    Only the non-zero registers are kept, as (key, register, rank) entries: a sketch costs at most one entry
+    per distinct value it has seen and never more than 2^precision entries, however many values are added.
+    Sketches are merged by taking the highest rank per register, so rolling hotspot-hours up to days,
+    neighborhoods or the city is a merge of their sketches instead of a rescan of the values.
+    """
+
+    def __init__(self, precision, keys=None, registers=None, ranks=None):
+        self.precision = precision
+        self.keys = np.array([], dtype=np.int64) if keys is None else keys
+        self.registers = np.array([], dtype=np.int32) if registers is None else registers
+        self.ranks = np.array([], dtype=np.uint8) if ranks is None else ranks
+
+    @classmethod
+    def for_error(cls, relative_error=DEFAULT_RELATIVE_ERROR):
+        return cls(precision_for_error(relative_error))
+
+    def add(self, keys, hashes):
+        """
+        Add hashed values (hash_values) to the sketches of their keys.
+        """
+        registers, ranks = register_ranks(hashes, self.precision)
+        self.keys, self.registers, self.ranks = compact(
+            np.concatenate([self.keys, np.asarray(keys, dtype=np.int64)]),
+            np.concatenate([self.registers, registers]),
+            np.concatenate([self.ranks, ranks]),
+        )
+
+    def merge(self, other):
+        """
+        Union with sketches of the same precision (keys present in both are merged).
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge sketches of precision {other.precision} into precision {self.precision}")
+        return HyperLogLogSketches(self.precision, *compact(
+            np.concatenate([self.keys, other.keys]),
+            np.concatenate([self.registers, other.registers]),
+            np.concatenate([self.ranks, other.ranks]),
+        ))
+
+    def rollup(self, key_map):
+        """
+        Merge the sketches of the keys mapped to the same new key.
+
+        Parameters:
+            key_map (callable): Maps an int64 array of keys to an int64 array of new keys (negative = dropped).
+
+        Returns:
+            HyperLogLogSketches: One sketch per new key.
+        """
+        keys = np.asarray(key_map(self.keys), dtype=np.int64)
+        kept = keys >= 0
+        return HyperLogLogSketches(self.precision, *compact(keys[kept], self.registers[kept], self.ranks[kept]))
+
+    def estimate(self):
+        """
+        Distinct count estimate per key, with the improved estimator of Ertl (2017), "New cardinality
+        estimation algorithms for HyperLogLog sketches".
+
+        It corrects the raw HyperLogLog estimate from the histogram of register ranks in closed form, at
+        both ends of the range (the empty registers with sigma, the saturated ones with tau), so it stays
+        unbiased across the switch from linear counting to the raw estimate (around 2.5 * 2^precision)
+        where the classic estimator misses its standard error, without HyperLogLog++ empirical bias tables.
+
+        Returns:
+            tuple: (keys, float64 estimates), ordered by key.
+        """
+        registers = 1 << self.precision
+        max_rank = HASH_BITS - self.precision + 1
+
+        # Registers per key and rank (rank 0: empty registers)
+        keys, codes = np.unique(self.keys, return_inverse=True)
+        histogram = np.bincount(codes * (max_rank + 1) + self.ranks.astype(np.int64),
+                                minlength=len(keys) * (max_rank + 1)).reshape(len(keys), max_rank + 1)
+        histogram[:, 0] = registers - histogram[:, 1:].sum(axis=1)
+
+        z = registers * tau(1 - histogram[:, max_rank] / registers)
+        for rank in range(max_rank - 1, 0, -1):
+            z = 0.5 * (z + histogram[:, rank])
+        z = z + registers * sigma(histogram[:, 0] / registers)
+        return keys, registers * registers / (2 * math.log(2)) / z
+
+    def estimate_keys(self, keys):
+        """
+        Distinct count estimates of the given keys, 0 for keys without a sketch.
+        """
+        sketch_keys, estimates = self.estimate()
+        estimates = np.append(estimates, 0.0)
+        position = np.searchsorted(sketch_keys, keys)
+        found = position < len(sketch_keys)
+        found[found] = sketch_keys[position[found]] == np.asarray(keys)[found]
+        return estimates[np.where(found, position, len(sketch_keys))]
+
+    def save(self, file_path):
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        np.savez(file_path, precision=np.array(self.precision), keys=self.keys, registers=self.registers, ranks=self.ranks)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path, allow_pickle=False) as arrays:
+            return cls(int(arrays['precision']), arrays['keys'], arrays['registers'], arrays['ranks'])
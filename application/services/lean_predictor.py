@@ -0,0 +1,130 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+# Categorical input column the training pipeline ordinal-encodes
+HOUR_COLUMN = 'hour_slice'
+
+
+def booster_thresholds(booster, column_names):
+    """
+    Split thresholds of a LightGBM booster per input column.
+
+    Parameters:
+        booster (lightgbm.Booster): The trained booster.
+        column_names (list): Input column name of every booster feature, in booster order.
+
+    Returns:
+        dict: Column name -> sorted thresholds (columns never split on are absent).
+    """
+    names = dict(zip(booster.feature_name(), column_names))
+    trees = booster.trees_to_dataframe()
+    splits = trees[trees['split_feature'].notna()]
+    return {
+        names[feature]: np.unique(thresholds.to_numpy(dtype=np.float64))
+        for feature, thresholds in splits.groupby('split_feature')['threshold']
+    }
+
+
+def preferred_model_path(lean_path, pipeline_path):
+    """
+    The model to load: the lean export when it exists and is not older than the joblib pipeline it was
+    compiled from, the pipeline otherwise (missing export, or one left by an earlier training run).
+    """
+    if os.path.exists(lean_path) and (
+            not os.path.exists(pipeline_path) or os.path.getmtime(lean_path) >= os.path.getmtime(pipeline_path)):
+        return lean_path
+    print(f"Lean predictor {lean_path} missing or older than {pipeline_path}, using the sklearn pipeline")
+    return pipeline_path
+
+
+class LeanPredictor:
+    """
+    The mobility regressor without the sklearn pipeline: the raw LightGBM booster, the hour_slice
+    ordinal codes and the booster column order.
+
+    predict(frame) is a drop-in for the pipeline's predict (same feature_names_in_, same predictions);
+    predict_matrix skips pandas altogether for callers that already hold the encoded feature matrix.
+    """
+
+    def __init__(self, booster, columns, feature_names_in, hour_categories):
+        self.booster = booster
+        self.columns = list(columns)
+        self.feature_names_in_ = np.array(feature_names_in, dtype=object)
+        self.hour_categories = list(hour_categories)
+        self.hour_codes = {label: code for code, label in enumerate(self.hour_categories)}
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Compile the fitted ColumnTransformer(OrdinalEncoder on hour_slice) + LGBMRegressor pipeline.
+        """
+        preprocessor = pipeline.named_steps['cat_pipeline']
+        encoder = preprocessor.named_transformers_['hour_slice_encoder']
+
+        # Booster columns are the transformed columns: hour_slice first, then the passthrough remainder
+        columns = [name.split('__', 1)[-1] for name in preprocessor.get_feature_names_out()]
+        return cls(
+            booster=pipeline.named_steps['model'].booster_,
+            columns=columns,
+            feature_names_in=pipeline.feature_names_in_,
+            hour_categories=encoder.categories_[0].tolist(),
+        )
+
+    def save(self, file_path):
+        """
+        Save as one JSON file: the booster in LightGBM text format plus the column order and hour codes.
+        """
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'columns': self.columns,
+                'feature_names_in': self.feature_names_in_.tolist(),
+                'hour_categories': self.hour_categories,
+                'booster': self.booster.model_to_string(),
+            }, file, ensure_ascii=False)
+        print(f"Saved lean predictor ({self.booster.num_trees()} trees) to {file_path}")
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            model = json.load(file)
+        return cls(
+            booster=lgb.Booster(model_str=model['booster']),
+            columns=model['columns'],
+            feature_names_in=model['feature_names_in'],
+            hour_categories=model['hour_categories'],
+        )
+
+    def encode_hours(self, labels):
+        """
+        Ordinal codes of hour_slice labels, as the pipeline's OrdinalEncoder assigns them.
+        """
+        codes = pd.Categorical(labels, categories=self.hour_categories).codes
+        if (codes < 0).any():
+            unknown = sorted(set(np.asarray(labels, dtype=object)[codes < 0]))
+            raise ValueError(f"Unknown hour_slice values: {unknown}")
+        return codes
+
+    def feature_matrix(self, frame, dtype=np.float64):
+        """
+        Encoded (rows, columns) matrix in booster column order.
+        """
+        matrix = np.empty((len(frame), len(self.columns)), dtype=dtype)
+        for position, column in enumerate(self.columns):
+            matrix[:, position] = self.encode_hours(frame[column]) if column == HOUR_COLUMN else frame[column].to_numpy()
+        return matrix
+
+    def predict_matrix(self, matrix):
+        return self.booster.predict(matrix)
+
+    def predict(self, frame):
+        return self.predict_matrix(self.feature_matrix(frame))
+
+    def split_thresholds(self):
+        return booster_thresholds(self.booster, self.columns)
@@ -0,0 +1,253 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+import application.services.geo_proximity_service as gps
+import application.services.lean_predictor as lp
+import application.services.pipeline_runner as runner
+
+# Stop features the mobility regressor was trained on (count and closest distance per POI type, total POIs)
+POI_FEATURES = [
+    feature
+    for entity_type in gps.POI_ENTITY_TYPES
+    for feature in (f"number_of_nearby_{entity_type.replace(' ', '_')}s", f"closest_{entity_type.replace(' ', '_')}_km")
+]
+POI_COUNT_FEATURES = [feature for feature in POI_FEATURES if feature.startswith('number_of_nearby_')]
+STOP_FEATURES = POI_FEATURES + ['total_pois']
+
+# Calendar features, the only ones that change from one date to the next
+DATE_FEATURES = ['day_of_week', 'day_of_month']
+
+# Stop, service and hour attributes carried next to the features into the output
+KEY_COLUMNS = ['stop_id', 'service_id', 'hourly_slice', 'neighborhood_name']
+
+
+def day_of_week_category(day_of_week):
+    """
+    GTFS service of a weekday (0 = Monday): SAB on Saturdays, DOM on Sundays, UTEIS otherwise.
+    """
+    return np.select([day_of_week == 5, day_of_week == 6], ['SAB', 'DOM'], default='UTEIS')
+
+
+def build_calendar(start, end):
+    """
+    Dates to predict with their calendar features and service.
+
+    Returns:
+        pandas.DataFrame: date, day_of_month, day_of_week and day_of_week_category per date.
+    """
+    dates = pd.date_range(start=start, end=end, freq='D')
+    calendar = pd.DataFrame({'date': dates, 'day_of_month': dates.day, 'day_of_week': dates.dayofweek})
+    calendar['day_of_week_category'] = day_of_week_category(calendar['day_of_week'].to_numpy())
+    return calendar
+
+
+def build_stop_hour_features(trip_counts, stops):
+    """
+    Feature rows per (stop, service, hour): the stop POI features joined on stop_id to the hourly trip counts.
+
+    Parameters:
+        trip_counts (pandas.DataFrame): stop_id, service_id, hourly_slice and distinct_trip_count per row.
+        stops (pandas.DataFrame): stcp_stops_nearby_poi records (stop_id, lat, lon, neighborhood_name, POI features).
+
+    Returns:
+        pandas.DataFrame: Key columns, lat, lon, distinct_trip_count, hour_slice and STOP_FEATURES.
+    """
+    stops = stops.drop_duplicates(subset=['stop_id']).copy()
+    stops['total_pois'] = stops[POI_COUNT_FEATURES].sum(axis=1)
+
+    features = trip_counts[['stop_id', 'service_id', 'hourly_slice', 'distinct_trip_count']].merge(
+        stops[['stop_id', 'neighborhood_name', 'lat', 'lon'] + STOP_FEATURES], on='stop_id', how='inner'
+    )
+    features = features[features['stop_id'] != '.'].reset_index(drop=True)
+
+    # Hour slices were labelled with an en dash when the model was trained
+    features['hour_slice'] = features['hourly_slice'].str.replace('-', '–', regex=False)
+    return features
+
+
+def save_feature_cache(features, file_path, fingerprint):
+    """
+    Cache the stop x service x hour features as typed arrays (.npz, no pickles) with the fingerprint of their inputs.
+    """
+    dir_path = os.path.dirname(file_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+
+    np.savez(
+        file_path,
+        fingerprint=np.array(json.dumps(fingerprint, sort_keys=True)),
+        stop_features=features[STOP_FEATURES].to_numpy(dtype=np.float64),
+        lat=features['lat'].to_numpy(dtype=np.float64),
+        lon=features['lon'].to_numpy(dtype=np.float64),
+        distinct_trip_count=features['distinct_trip_count'].to_numpy(dtype=np.int32),
+        **{column: features[column].to_numpy(dtype=str) for column in KEY_COLUMNS + ['hour_slice']}
+    )
+
+
+def load_feature_cache(file_path, fingerprint):
+    """
+    Load the cached features, or None when there is no cache or it was built from other inputs.
+    """
+    if not os.path.exists(file_path):
+        return None
+
+    with np.load(file_path, allow_pickle=False) as arrays:
+        if str(arrays['fingerprint']) != json.dumps(fingerprint, sort_keys=True):
+            return None
+        features = pd.DataFrame({column: arrays[column] for column in KEY_COLUMNS + ['hour_slice']})
+        features['lat'] = arrays['lat']
+        features['lon'] = arrays['lon']
+        features['distinct_trip_count'] = arrays['distinct_trip_count']
+        features[STOP_FEATURES] = arrays['stop_features']
+    return features
+
+
+def cached_stop_hour_features(trip_counts_loader, stops_loader, input_paths, cache_path):
+    """
+    Stop x service x hour features from the cache, rebuilt only when one of the input files changed.
+
+    Parameters:
+        trip_counts_loader (callable): Returns the hourly trip counts DataFrame.
+        stops_loader (callable): Returns the stops DataFrame.
+        input_paths (list): Files the features are built from (their content hashes key the cache).
+        cache_path (str): Path of the .npz cache.
+
+    Returns:
+        pandas.DataFrame: The features (see build_stop_hour_features).
+    """
+    fingerprint = {path: runner.hash_path(path) for path in input_paths}
+    features = load_feature_cache(cache_path, fingerprint)
+    if features is not None:
+        print(f"Loaded {len(features)} stop x service x hour feature rows from {cache_path}")
+        return features
+
+    features = build_stop_hour_features(trip_counts_loader(), stops_loader())
+    save_feature_cache(features, cache_path, fingerprint)
+    print(f"Cached {len(features)} stop x service x hour feature rows to {cache_path}")
+    return features
+
+
+def split_thresholds(model):
+    """
+    Split thresholds of the mobility regressor per input feature.
+
+    Two values of a feature falling between the same consecutive thresholds take the same branch
+    in every tree, so the model cannot tell them apart.
+
+    Parameters:
+        model: A LeanPredictor, or the fitted ColumnTransformer + LGBMRegressor pipeline.
+
+    Returns:
+        dict: Input feature -> sorted thresholds (features never split on are absent),
+        or None when the model is neither (raw values are then compared).
+    """
+    if hasattr(model, 'split_thresholds'):
+        return model.split_thresholds()
+
+    try:
+        preprocessor = model.named_steps['cat_pipeline']
+        booster = model.named_steps['model'].booster_
+    except (AttributeError, KeyError):
+        return None
+
+    # Booster columns (Column_<i>) are the transformed columns, named after the input feature they come from
+    input_names = [name.split('__', 1)[-1] for name in preprocessor.get_feature_names_out()]
+    return lp.booster_thresholds(booster, input_names)
+
+
+def feature_bins(values, thresholds):
+    """
+    Bin of every value between the model thresholds (LightGBM sends value <= threshold left), -1 for NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if thresholds is None:
+        return pd.factorize(values)[0]
+    bins = np.searchsorted(thresholds, values, side='left')
+    return np.where(np.isnan(values), -1, bins)
+
+
+def unique_rows(frame, columns, thresholds):
+    """
+    Codes of the rows of frame that the model cannot tell apart on the given columns.
+
+    Returns:
+        tuple: (codes per row, positions of one representative row per code)
+    """
+    keys = []
+    for column in columns:
+        if column == 'hour_slice':
+            keys.append(pd.factorize(frame[column])[0])
+        elif thresholds is None:
+            keys.append(feature_bins(frame[column], None))
+        else:
+            # A feature the model never splits on has no effect on the predictions
+            keys.append(feature_bins(frame[column], thresholds.get(column, np.array([]))))
+
+    if not keys:
+        return np.zeros(len(frame), dtype=np.int64), np.array([0])
+
+    _, representatives, codes = np.unique(np.column_stack(keys), axis=0, return_index=True, return_inverse=True)
+    return codes.ravel(), representatives
+
+
+def predict_calendar(model, features, calendar):
+    """
+    Predict every (date, stop, hour) of the calendar, running the model only once per distinct feature row.
+
+    For each service, the dates and the stop x hour rows are reduced to the distinct rows the model can
+    tell apart (see split_thresholds), the model predicts their cross product, and the predictions are
+    broadcast back to all dates.
+
+    Parameters:
+        model: Fitted mobility regressor (a pipeline with feature_names_in_).
+        features (pandas.DataFrame): Stop x service x hour features.
+        calendar (pandas.DataFrame): Dates from build_calendar.
+
+    Returns:
+        tuple: (DataFrame of (date, stop, hour) rows with their feature row index, predictions, number of predicted rows)
+    """
+    model_features = list(model.feature_names_in_)
+    thresholds = split_thresholds(model)
+    date_columns = [column for column in model_features if column in DATE_FEATURES]
+    stop_columns = [column for column in model_features if column not in DATE_FEATURES]
+
+    rows = []
+    predictions = []
+    predicted_rows = 0
+
+    for service_id, service_dates in calendar.groupby('day_of_week_category', sort=False):
+        service_rows = np.flatnonzero(features['service_id'].to_numpy() == service_id)
+        if len(service_rows) == 0:
+            continue
+        service_features = features.iloc[service_rows].reset_index(drop=True)
+
+        date_codes, date_representatives = unique_rows(service_dates, date_columns, thresholds)
+        row_codes, row_representatives = unique_rows(service_features, stop_columns, thresholds)
+
+        # Cross product of the distinct dates and distinct stop x hour rows
+        distinct = pd.concat([
+            service_dates.iloc[np.repeat(date_representatives, len(row_representatives))][date_columns].reset_index(drop=True),
+            service_features.iloc[np.tile(row_representatives, len(date_representatives))][stop_columns].reset_index(drop=True),
+        ], axis=1)[model_features]
+        distinct_predictions = model.predict(distinct).reshape(len(date_representatives), len(row_representatives))
+        predicted_rows += len(distinct)
+
+        # Broadcast to every date of the service
+        date_index = np.repeat(np.arange(len(service_dates)), len(service_rows))
+        row_index = np.tile(np.arange(len(service_rows)), len(service_dates))
+        rows.append(pd.DataFrame({
+            'calendar_index': service_dates.index.to_numpy()[date_index],
+            'feature_index': service_rows[row_index],
+        }))
+        predictions.append(distinct_predictions[date_codes[date_index], row_codes[row_index]])
+
+    if not rows:
+        return pd.DataFrame({'calendar_index': [], 'feature_index': []}, dtype=np.int64), np.array([]), 0
+
+    # Date by date, as the calendar is ordered
+    rows = pd.concat(rows, ignore_index=True)
+    predictions = np.concatenate(predictions)
+    order = np.lexsort((rows['feature_index'].to_numpy(), rows['calendar_index'].to_numpy()))
+    return rows.iloc[order].reset_index(drop=True), predictions[order], predicted_rows
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import time
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+import joblib
+import numpy as np
+import pandas as pd
+
+import application.services.mobility_inference_service as mis
+from application.services.lean_predictor import LeanPredictor
+
+# Micro-batching: a batch is sent to the model when it is full or when its first query waited this long
+MAX_BATCH_SIZE = 256
+MAX_BATCH_WAIT_MS = 2
+
+# Number of most recent request latencies the percentiles are computed over
+LATENCY_WINDOW = 10000
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class LatencyMetrics:
+    """
+    Request latencies over a sliding window, with p50/p99 summaries.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+        self.requests += 1
+
+    def summary(self):
+        if not self.latencies:
+            return {'requests': self.requests, 'p50_ms': None, 'p99_ms': None, 'mean_ms': None}
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': self.requests,
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+            'mean_ms': round(float(latencies.mean()), 3),
+        }
+
+
+class MobilityPredictor:
+    """
+    The mobility regressor with the stop POI features kept in memory, predicting (stop_id, date, hour) queries.
+
+    The returned mobility_score is the raw model output (expected wifi sessions per hour); the batch CSV
+    rescales its scores to 0-100 over each run, which an online query cannot do.
+
+    model_path is either the lean predictor (.json, fed the encoded matrix directly) or the joblib pipeline.
+    """
+
+    def __init__(self, model_path, stops_path):
+        self.model = LeanPredictor.load(model_path) if model_path.endswith('.json') else joblib.load(model_path)
+        self.model_features = list(self.model.feature_names_in_)
+
+        stops = pd.read_json(stops_path, dtype={'stop_id': str}).drop_duplicates(subset=['stop_id'])
+        stops['total_pois'] = stops[mis.POI_COUNT_FEATURES].sum(axis=1)
+        self.stop_columns = [column for column in self.model_features if column not in mis.DATE_FEATURES + ['hour_slice']]
+        self.stop_positions = {stop_id: position for position, stop_id in enumerate(stops['stop_id'])}
+        self.stop_features = stops[self.stop_columns].to_numpy(dtype=np.float64)
+
+        # Hour labels as used in training ('07:00–07:59')
+        self.hour_labels = np.array([f"{hour:02d}:00–{hour:02d}:59" for hour in range(24)], dtype=object)
+
+    def validate(self, query):
+        """
+        Normalize a query dict (stop_id, date, hour).
+
+        Raises KeyError for a missing field, ValueError for a malformed one and LookupError for an unknown stop.
+        """
+        stop_id = str(query['stop_id'])
+        if stop_id not in self.stop_positions:
+            raise LookupError(f"Unknown stop_id {stop_id}")
+        date = pd.Timestamp(query['date'])
+        hour = int(query['hour'])
+        if not 0 <= hour <= 23:
+            raise ValueError(f"Hour {hour} is not between 0 and 23")
+        return stop_id, date, hour
+
+    def predict(self, queries):
+        """
+        Predict a batch of validated (stop_id, date, hour) queries with a single model.predict call.
+
+        Returns:
+            numpy.ndarray: mobility_score per query.
+        """
+        stop_index = np.array([self.stop_positions[stop_id] for stop_id, _, _ in queries])
+        dates = pd.DatetimeIndex([date for _, date, _ in queries])
+        hours = np.array([hour for _, _, hour in queries])
+
+        columns = dict(zip(self.stop_columns, self.stop_features[stop_index].T))
+        columns['day_of_week'] = dates.dayofweek
+        columns['day_of_month'] = dates.day
+
+        if isinstance(self.model, LeanPredictor):
+            # Fast path: encoded matrix straight to the booster
+            columns['hour_slice'] = self.model.encode_hours(self.hour_labels[hours])
+            return self.model.predict_matrix(np.column_stack([columns[column] for column in self.model.columns]))
+
+        columns['hour_slice'] = self.hour_labels[hours]
+        return self.model.predict(pd.DataFrame(columns)[self.model_features])
+
+
+class MicroBatcher:
+    """
+    Collects concurrent queries into batches so the model runs once per batch instead of once per query.
+
+    The model runs on a worker thread, so the event loop keeps accepting requests while a batch is predicted.
+    """
+
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.batched_queries = 0
+        self.worker = None
+
+    def start(self):
+        self.worker = asyncio.create_task(self.run())
+
+    async def predict(self, query):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a first query, then gather more until the batch is full or the wait is over
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            queries = [query for query, _ in batch]
+            try:
+                predictions = await loop.run_in_executor(None, self.predictor.predict, queries)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_queries += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(float(prediction))
+
+    def summary(self):
+        return {
+            'batches': self.batches,
+            'mean_batch_size': round(self.batched_queries / self.batches, 2) if self.batches else None,
+        }
+
+
+class MobilityPredictionServer:
+    """
+    Minimal HTTP/1.1 JSON API (keep-alive, no external web framework) on top of the micro-batcher.
+
+    GET  /predict?stop_id=<id>&date=<YYYY-MM-DD>&hour=<0-23>  one mobility score
+    POST /predict                                            JSON list of {stop_id, date, hour} queries
+    GET  /metrics                                            p50/p99 latency and batching statistics
+    GET  /health
+    """
+
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.metrics = LatencyMetrics()
+
+    async def predict_one(self, query):
+        stop_id, date, hour = self.predictor.validate(query)
+        score = await self.batcher.predict((stop_id, date, hour))
+        return {'stop_id': stop_id, 'date': date.strftime('%Y-%m-%d'), 'hour': hour, 'mobility_score': score}
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+
+        if url.path == '/health':
+            return 200, {'status': 'ok'}
+        if url.path == '/metrics':
+            return 200, {'latency': self.metrics.summary(), 'batching': self.batcher.summary()}
+        if url.path != '/predict':
+            return 404, {'error': f"Unknown path {url.path}"}
+
+        if method == 'GET':
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            return 200, await self.predict_one(params)
+        if method == 'POST':
+            queries = json.loads(body or b'[]')
+            if not isinstance(queries, list):
+                raise ValueError("Expected a JSON list of queries")
+            return 200, await asyncio.gather(*[self.predict_one(query) for query in queries])
+        return 405, {'error': f"Method {method} not allowed"}
+
+    async def respond(self, method, target, body):
+        try:
+            return await self.route(method, target, body)
+        except KeyError as e:
+            return 400, {'error': f"Missing parameter {e}"}
+        except LookupError as e:
+            return 404, {'error': str(e)}
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': type(e).__name__}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+                # Headers up to the blank line
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self.respond(method, target, body)
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+
+                if target.startswith('/predict'):
+                    self.metrics.record(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Mobility prediction service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,224 @@
+import hashlib
+import itertools
+import os
+import random
+import time
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from joblib import Parallel, delayed
+from sklearn.model_selection import GroupKFold, TimeSeriesSplit
+
+from application.services.lean_predictor import HOUR_COLUMN
+
+# LightGBM parameters of the current model (sklearn names, LightGBM accepts them as aliases)
+BASELINE_PARAMS = {
+    'num_leaves': 31,
+    'learning_rate': 0.1,
+    'min_child_samples': 20,
+    'subsample': 0.8,
+    'subsample_freq': 0,
+    'colsample_bytree': 0.8,
+}
+
+# Hyperparameter search space, sampled at random
+SEARCH_SPACE = {
+    'num_leaves': [15, 31, 63, 127],
+    'learning_rate': [0.03, 0.05, 0.1],
+    'min_child_samples': [10, 20, 40, 80],
+    'subsample': [0.7, 0.8, 1.0],
+    'subsample_freq': [0, 1],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+}
+
+# Dataset construction parameters, shared by every trial so the cached binary Datasets stay valid
+# (feature_pre_filter off lets trials change min_child_samples on the same Dataset)
+DATASET_PARAMS = {'max_bin': 255, 'feature_pre_filter': False, 'verbose': -1}
+
+MAX_BOOST_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+
+# Columns identifying the location (wifi hotspot) a training row was measured at
+LOCATION_COLUMNS_PREFIXES = ('number_of_nearby_', 'closest_')
+
+# Calendar column ordering the rows in time
+TIME_COLUMN = 'day_of_month'
+
+
+def encode_features(X):
+    """
+    Encode the training frame as the pipeline does: hour_slice ordinal codes (sorted categories) first,
+    then the remaining columns in their order.
+
+    Returns:
+        tuple: (float64 matrix, column names, hour categories)
+    """
+    hour_categories = sorted(X[HOUR_COLUMN].unique())
+    columns = [HOUR_COLUMN] + [column for column in X.columns if column != HOUR_COLUMN]
+    matrix = np.empty((len(X), len(columns)), dtype=np.float64)
+    matrix[:, 0] = pd.Categorical(X[HOUR_COLUMN], categories=hour_categories).codes
+    matrix[:, 1:] = X[columns[1:]].to_numpy(dtype=np.float64)
+    return matrix, columns, hour_categories
+
+
+def location_groups(X):
+    """
+    Group id per row: rows with the same POI features were measured at the same location.
+    """
+    location_columns = [column for column in X.columns if column.startswith(LOCATION_COLUMNS_PREFIXES)]
+    return X.groupby(location_columns, sort=False).ngroup().to_numpy()
+
+
+def cv_splits(X, strategy='grouped', n_splits=5):
+    """
+    Cross-validation folds that do not leak between training and validation.
+
+    Parameters:
+        X (pandas.DataFrame): Training features.
+        strategy (str): 'grouped' keeps every location in a single fold, 'time' validates each fold
+            on later days than it trains on (forward chaining over day_of_month).
+        n_splits (int): Number of folds.
+
+    Returns:
+        list: (train indices, validation indices) per fold.
+    """
+    if strategy == 'grouped':
+        return list(GroupKFold(n_splits=n_splits).split(X, groups=location_groups(X)))
+    if strategy == 'time':
+        order = np.argsort(X[TIME_COLUMN].to_numpy(), kind='stable')
+        return [(order[train], order[valid]) for train, valid in TimeSeriesSplit(n_splits=n_splits).split(order)]
+    raise ValueError(f"Unknown cross-validation strategy {strategy}")
+
+
+def cache_fold_datasets(matrix, y, columns, splits, cache_dir):
+    """
+    Build the LightGBM Datasets of every fold once and save them as binary files.
+
+    The cache key is the content hash of the data and folds, so reruns on the same data skip the
+    binning, and changed data never reuses a stale cache.
+
+    Returns:
+        list: (train path, validation path) per fold.
+    """
+    digest = hashlib.sha256()
+    for array in [matrix, y] + [index for split in splits for index in split]:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(repr((columns, DATASET_PARAMS)).encode('utf-8'))
+    fold_dir = os.path.join(cache_dir, digest.hexdigest()[:16])
+    os.makedirs(fold_dir, exist_ok=True)
+
+    paths = []
+    for fold, (train_index, valid_index) in enumerate(splits):
+        train_path = os.path.join(fold_dir, f'fold_{fold}_train.bin')
+        valid_path = os.path.join(fold_dir, f'fold_{fold}_valid.bin')
+        if not (os.path.exists(train_path) and os.path.exists(valid_path)):
+            train_set = lgb.Dataset(matrix[train_index], label=y[train_index], feature_name=columns,
+                                    params=DATASET_PARAMS, free_raw_data=False)
+            valid_set = lgb.Dataset(matrix[valid_index], label=y[valid_index], reference=train_set,
+                                    params=DATASET_PARAMS, free_raw_data=False)
+            train_set.save_binary(train_path)
+            valid_set.save_binary(valid_path)
+        paths.append((train_path, valid_path))
+    return paths
+
+
+def sample_params(n_trials, seed=42, search_space=SEARCH_SPACE):
+    """
+    The baseline parameters followed by distinct random draws from the search space.
+    """
+    grid = [dict(zip(search_space, values)) for values in itertools.product(*search_space.values())]
+    random.Random(seed).shuffle(grid)
+    candidates = [BASELINE_PARAMS] + [params for params in grid if params != BASELINE_PARAMS]
+    return candidates[:n_trials]
+
+
+def run_trial(trial, params, fold_paths, threads=1, max_boost_rounds=MAX_BOOST_ROUNDS,
+              early_stopping_rounds=EARLY_STOPPING_ROUNDS, seed=42):
+    """
+    Cross-validate one parameter set on the cached fold Datasets, with early stopping on every fold.
+
+    Returns:
+        dict: The parameters with mean/std validation MAE and RMSE, mean best iteration and fit seconds.
+    """
+    train_params = {
+        **params,
+        'objective': 'regression',
+        'metric': ['rmse', 'l1'],
+        'num_threads': threads,
+        'seed': seed,
+        'verbose': -1,
+    }
+
+    maes, rmses, iterations = [], [], []
+    start = time.perf_counter()
+    for train_path, valid_path in fold_paths:
+        train_set = lgb.Dataset(train_path, params=DATASET_PARAMS)
+        valid_set = lgb.Dataset(valid_path, reference=train_set, params=DATASET_PARAMS)
+        evals = {}
+        booster = lgb.train(
+            train_params,
+            train_set,
+            num_boost_round=max_boost_rounds,
+            valid_sets=[valid_set],
+            valid_names=['valid'],
+            callbacks=[
+                lgb.early_stopping(early_stopping_rounds, first_metric_only=True, verbose=False),
+                lgb.record_evaluation(evals),
+            ],
+        )
+        best = booster.best_iteration or max_boost_rounds
+        maes.append(evals['valid']['l1'][best - 1])
+        rmses.append(evals['valid']['rmse'][best - 1])
+        iterations.append(best)
+
+    return {
+        'trial': trial,
+        **params,
+        'mae_mean': float(np.mean(maes)),
+        'mae_std': float(np.std(maes)),
+        'rmse_mean': float(np.mean(rmses)),
+        'rmse_std': float(np.std(rmses)),
+        'best_iteration': int(round(np.mean(iterations))),
+        'fit_seconds': time.perf_counter() - start,
+    }
+
+
+def search(X, y, cache_dir, n_trials=20, n_jobs=-1, strategy='grouped', n_splits=5, seed=42):
+    """
+    Cross-validated hyperparameter search, one trial per joblib worker process.
+
+    Each trial trains single threaded, so n_jobs trials use n_jobs cores without oversubscription.
+
+    Parameters:
+        X (pandas.DataFrame): Training features.
+        y (numpy.ndarray): Target.
+        cache_dir (str): Directory of the cached fold Datasets.
+        n_trials (int): Number of parameter sets (the first is the baseline).
+        n_jobs (int): Worker processes (-1 = all cores).
+        strategy (str): Cross-validation strategy (see cv_splits).
+        n_splits (int): Number of folds.
+        seed (int): Seed of the parameter sampling and of LightGBM.
+
+    Returns:
+        pandas.DataFrame: One row per trial, best (lowest mean validation RMSE) first.
+    """
+    matrix, columns, _ = encode_features(X)
+    splits = cv_splits(X, strategy=strategy, n_splits=n_splits)
+    fold_paths = cache_fold_datasets(matrix, np.asarray(y, dtype=np.float64), columns, splits, cache_dir)
+
+    candidates = sample_params(n_trials, seed=seed)
+    results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(run_trial)(trial, params, fold_paths, seed=seed) for trial, params in enumerate(candidates)
+    )
+    return pd.DataFrame(results).sort_values('rmse_mean').reset_index(drop=True)
+
+
+def best_params(trials):
+    """
+    LGBMRegressor parameters of the best trial, with n_estimators set to its early stopped iteration count.
+    """
+    best = trials.iloc[0]
+    # The row mixes ints and floats, cast each parameter back to the type of its baseline value
+    params = {name: type(value)(best[name]) for name, value in BASELINE_PARAMS.items()}
+    params['n_estimators'] = int(best['best_iteration'])
+    return params
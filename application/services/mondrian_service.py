@@ -0,0 +1,229 @@
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+
+# Subtrees handed to the worker pool per worker (more tasks than workers evens out unbalanced subtrees)
+SUBTREES_PER_JOB = 4
+
+# Separators of the generalized values: numeric ranges as min~max, categorical values as a set
+RANGE_SEPARATOR = '~'
+SET_SEPARATOR = ','
+
+
+def encode_quasi_identifiers(df, qi):
+    """
+    Quasi-identifiers as one numeric matrix: numeric columns as they are, categorical columns as the
+    codes of their sorted values, so every median split is a comparison on a column of numbers.
+
+    Returns:
+        tuple: (float64 matrix of rows x qi, labels per column (None for numeric columns))
+    """
+    columns, labels = [], []
+    for column in qi:
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values):
+            columns.append(values.to_numpy(dtype=np.float64))
+            labels.append(None)
+        else:
+            codes, uniques = pd.factorize(values.astype(str), sort=True)
+            columns.append(codes.astype(np.float64))
+            labels.append(np.asarray(uniques, dtype=object))
+    return np.column_stack(columns), labels
+
+
+def median_split(values):
+    """
+    Rows left of the median of values, and the size of the smaller side.
+
+    Rows equal to the median go right, or left when nothing is below the median.
+    """
+    middle = len(values) // 2
+    median = np.partition(values, middle)[middle]
+    left = values < median
+    if not left.any():
+        left = values <= median
+    size = int(left.sum())
+    return left, min(size, len(values) - size)
+
+
+def split_node(matrix, ranges, rows, ks):
+    """
+    Split a partition for every k of the sweep it exists for (strict Mondrian).
+
+    For a given k, the partition is cut at the median of its widest quasi-identifier (span normalized by the
+    span of the whole table) whose cut leaves at least k rows on both sides, or of the next widest, and so on.
+    The cuts that satisfy the largest k usually satisfy every k, so most partitions are split once for the
+    whole sweep; ks are only grouped apart where they end up cutting different quasi-identifiers.
+
+    Parameters:
+        matrix (numpy.ndarray): Quasi-identifier matrix (encode_quasi_identifiers).
+        ranges (numpy.ndarray): Span of every quasi-identifier over the whole table.
+        rows (numpy.ndarray): Rows of the partition.
+        ks (numpy.ndarray): Sorted k values the partition exists for.
+
+    Returns:
+        tuple: (k values the partition is final for, list of (rows, ks) children)
+    """
+    # A partition of fewer than 2k rows cannot be cut for k
+    leaf_ks, ks = ks[2 * ks > len(rows)], ks[2 * ks <= len(rows)]
+    if len(ks) == 0:
+        return leaf_ks, []
+
+    values = matrix[rows]
+    spans = (values.max(axis=0) - values.min(axis=0)) / ranges
+    splits = []
+    for column in np.argsort(-spans, kind='stable'):
+        if spans[column] <= 0:
+            break
+        left, balance = median_split(values[:, column])
+        splits.append((left, balance))
+        if balance >= ks[-1]:
+            break
+
+    # The first cut balanced enough for each k (none: the partition is final for that k)
+    balances = np.array([balance for _, balance in splits] + [np.iinfo(np.int64).max])
+    choice = np.argmax(balances[None, :] >= ks[:, None], axis=1)
+    children = []
+    for split in np.unique(choice):
+        split_ks = ks[choice == split]
+        if split == len(splits):
+            leaf_ks = np.union1d(leaf_ks, split_ks)
+            continue
+        left = splits[split][0]
+        children += [(rows[left], split_ks), (rows[~left], split_ks)]
+    return leaf_ks, children
+
+
+def grow(matrix, ranges, rows, ks):
+    """
+    Every final partition of the subtree rooted at rows, for every k.
+
+    Returns:
+        tuple: (list of (rows, ks) per final partition, ks being the k values it is final for,
+        list of (ks, seconds) per node split, ks being the k values the node exists for)
+    """
+    leaves, splits, stack = [], [], [(rows, ks)]
+    while stack:
+        node_rows, node_ks = stack.pop()
+        start = time.perf_counter()
+        leaf_ks, children = split_node(matrix, ranges, node_rows, node_ks)
+        splits.append((node_ks, time.perf_counter() - start))
+        if len(leaf_ks):
+            leaves.append((node_rows, leaf_ks))
+        stack += children
+    return leaves, splits
+
+
+def partition_tree(matrix, k_list, n_jobs=-1):
+    """
+    The Mondrian partition tree of the table for every k of k_list, grown once.
+
+    The top of the tree is split here until there are enough independent subtrees, which are then
+    grown in parallel across a process pool.
+
+    Parameters:
+        matrix (numpy.ndarray): Quasi-identifier matrix (encode_quasi_identifiers).
+        k_list (list): The k values.
+        n_jobs (int): Worker processes (-1 = all cores).
+
+    Returns:
+        tuple: (final partitions and node split timings, as returned by grow)
+    """
+    ranges = matrix.max(axis=0) - matrix.min(axis=0)
+    ranges[ranges == 0] = 1
+    ks = np.unique(np.asarray(k_list, dtype=np.int64))
+
+    leaves, splits, frontier = [], [], [(np.arange(len(matrix)), ks)]
+    jobs = effective_n_jobs(n_jobs)
+    while frontier and jobs > 1 and len(frontier) < jobs * SUBTREES_PER_JOB:
+        # Split the largest open partition, so the subtrees handed out are of similar size
+        frontier.sort(key=lambda node: len(node[0]))
+        rows, node_ks = frontier.pop()
+        start = time.perf_counter()
+        leaf_ks, children = split_node(matrix, ranges, rows, node_ks)
+        splits.append((node_ks, time.perf_counter() - start))
+        if len(leaf_ks):
+            leaves.append((rows, leaf_ks))
+        frontier += children
+
+    subtrees = Parallel(n_jobs=n_jobs, backend='loky')(delayed(grow)(matrix, ranges, rows, node_ks) for rows, node_ks in frontier)
+    for subtree_leaves, subtree_splits in subtrees:
+        leaves += subtree_leaves
+        splits += subtree_splits
+    return leaves, splits
+
+
+def partition_sweep(matrix, k_list, n_jobs=-1):
+    """
+    Mondrian partitions of the table for every k of k_list, from one partition tree (partition_tree).
+
+    Returns:
+        dict: k -> list of row index arrays, one per equivalence class.
+    """
+    leaves, _ = partition_tree(matrix, k_list, n_jobs=n_jobs)
+    return {int(k): [rows for rows, leaf_ks in leaves if k in leaf_ks] for k in np.unique(k_list)}
+
+
+def normalized_avg_class_size(partitions, k):
+    """
+    Normalized average equivalence class size metric C_AVG: (rows / equivalence classes) / k (1 is optimal).
+    """
+    return sum(len(rows) for rows in partitions) / len(partitions) / k
+
+
+def generalize(df, qi, labels, partitions):
+    """
+    Anonymized copy of df: every quasi-identifier replaced by its range (numeric) or set of values
+    (categorical) within the equivalence class of the row, rows grouped by equivalence class.
+    """
+    classes = np.empty(len(df), dtype=np.int64)
+    for index, rows in enumerate(partitions):
+        classes[rows] = index
+
+    anonymized = df.copy()
+    for column, column_labels in zip(qi, labels):
+        groups = df[column].groupby(classes)
+        if column_labels is None:
+            low, high = groups.min(), groups.max()
+            generalized = np.where(low == high, low.astype(str), low.astype(str) + RANGE_SEPARATOR + high.astype(str))
+        else:
+            generalized = groups.agg(lambda values: SET_SEPARATOR.join(sorted(values.astype(str).unique()))).to_numpy()
+        anonymized[column] = np.asarray(generalized, dtype=object)[classes]
+
+    return anonymized.iloc[np.argsort(classes, kind='stable')].reset_index(drop=True)
+
+
+def k_sweep(matrix, k_list, n_jobs=-1, standalone=False):
+    """
+    Benchmark of the anonymization for every k of k_list, from one partition tree.
+
+    The seconds of a k are those spent splitting the nodes of the tree that exist for that k, i.e. the
+    partitioning work of that k alone, read from the shared tree. Rerunning the partitioning for each k
+    on its own (standalone) measures the same work end to end, at the cost of the per-k reruns the
+    shared tree avoids.
+
+    Returns:
+        tuple: (pandas.DataFrame with k, equivalence_classes, smallest_class, c_avg, seconds and, when
+        standalone, standalone_seconds, seconds of the shared sweep)
+    """
+    start = time.perf_counter()
+    leaves, splits = partition_tree(matrix, k_list, n_jobs=n_jobs)
+    sweep_seconds = time.perf_counter() - start
+
+    records = []
+    for k in np.unique(k_list):
+        partitions = [rows for rows, leaf_ks in leaves if k in leaf_ks]
+        record = {
+            'k': int(k),
+            'equivalence_classes': len(partitions),
+            'smallest_class': min(len(rows) for rows in partitions),
+            'c_avg': round(normalized_avg_class_size(partitions, k), 2),
+            'seconds': round(sum(seconds for node_ks, seconds in splits if k in node_ks), 3),
+        }
+        if standalone:
+            start = time.perf_counter()
+            partition_sweep(matrix, [k], n_jobs=n_jobs)
+            record['standalone_seconds'] = round(time.perf_counter() - start, 3)
+        records.append(record)
+    return pd.DataFrame(records), sweep_seconds
@@ -0,0 +1,98 @@
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Polygon
+
+# Label for points that do not fall inside any Porto neighborhood
+OUTSIDE_PORTO_MUNICIPALITY = 'OUTSIDE_PORTO_MUNICIPALITY_BOUNDARIES'
+
+
+def neighborhood_polygons(neighborhoods):
+    """
+    Build shapely polygons from the porto_neighborhoods.json records.
+
+    Polygons use (lon, lat) as (x, y), the same order as the GeoJSON they come from.
+    Neighborhoods without coordinates are skipped.
+
+    Parameters:
+        neighborhoods (list): Records with 'neighborhood_name' and a 'coordinates' list of {'lat', 'lon'} dicts.
+
+    Returns:
+        tuple: (names, polygons) lists, aligned with each other.
+    """
+    names = []
+    polygons = []
+    for neighborhood in neighborhoods:
+        if 'coordinates' not in neighborhood:
+            continue
+        names.append(neighborhood['neighborhood_name'])
+        polygons.append(Polygon([(coord['lon'], coord['lat']) for coord in neighborhood['coordinates']]))
+    return names, polygons
+
+
+def points_in_polygons(lat, lon, polygons):
+    """
+    Find which polygons contain each distinct coordinate, in a single vectorized pass.
+
+    Coordinates are deduplicated first (a stop_times table repeats the same ~2,500 stops over
+    and over) and the distinct points are matched against an STRtree of the polygons, which
+    evaluates the predicate on prepared geometries.
+
+    Parameters:
+        lat, lon (array-like): Point coordinates in degrees.
+        polygons (list): Shapely polygons with (lon, lat) as (x, y).
+
+    Returns:
+        tuple: (inverse, point_index, polygon_index) where inverse maps every input row to its distinct
+        coordinate and (point_index, polygon_index) are the containing pairs for the distinct coordinates.
+    """
+    coordinates = np.column_stack([np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)])
+    distinct, inverse = np.unique(coordinates, axis=0, return_inverse=True)
+
+    points = shapely.points(distinct)
+    point_index, polygon_index = STRtree(polygons).query(points, predicate='within')
+
+    return inverse.reshape(-1), point_index, polygon_index
+
+
+def assign_neighborhoods(lat, lon, names, polygons, default=OUTSIDE_PORTO_MUNICIPALITY):
+    """
+    Assign a neighborhood name to every coordinate.
+
+    When polygons overlap, the first one in the given order wins.
+
+    Parameters:
+        lat, lon (array-like): Point coordinates in degrees.
+        names (list): Neighborhood names aligned with the polygons.
+        polygons (list): Shapely polygons with (lon, lat) as (x, y).
+        default (str): Name for points outside every polygon.
+
+    Returns:
+        numpy.ndarray: Neighborhood name per input row.
+    """
+    inverse, point_index, polygon_index = points_in_polygons(lat, lon, polygons)
+
+    # Lowest matching polygon index per distinct point, len(polygons) meaning "no match"
+    first_match = np.full(inverse.max() + 1 if len(inverse) else 0, len(polygons))
+    np.minimum.at(first_match, point_index, polygon_index)
+
+    labels = np.array(list(names) + [default], dtype=object)
+    return labels[first_match][inverse]
+
+
+def count_points_in_polygons(lat, lon, polygons):
+    """
+    Count how many points fall inside each polygon (a point inside overlapping polygons counts for each).
+
+    Parameters:
+        lat, lon (array-like): Point coordinates in degrees.
+        polygons (list): Shapely polygons with (lon, lat) as (x, y).
+
+    Returns:
+        numpy.ndarray: Number of points per polygon.
+    """
+    inverse, point_index, polygon_index = points_in_polygons(lat, lon, polygons)
+
+    # Duplicate coordinates are counted as many times as they appear
+    multiplicity = np.bincount(inverse)
+    return np.bincount(polygon_index, weights=multiplicity[point_index], minlength=len(polygons)).astype(int)
@@ -0,0 +1,192 @@
+import os
+import shutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Explicit schemas of the datasets exchanged as Parquet between the datamesh stages
+
+# b_staging: GTFS trips x stop_times x stops denormalized table
+STCP_ROUTES_SPATIO_TEMPORAL_SCHEMA = pa.schema([
+    ('route_id', pa.string()),
+    ('direction_id', pa.int8()),
+    ('service_id', pa.string()),
+    ('trip_id', pa.string()),
+    ('trip_headsign', pa.string()),
+    ('wheelchair_accessible', pa.int8()),
+    ('block_id', pa.string()),
+    ('shape_id', pa.string()),
+    ('arrival_time', pa.string()),  # GTFS HH:MM:SS, may go past 24:00:00
+    ('departure_time', pa.string()),
+    ('stop_id', pa.string()),
+    ('stop_sequence', pa.int32()),
+    ('stop_headsign', pa.string()),
+    ('stop_code', pa.string()),
+    ('stop_name', pa.string()),
+    ('stop_lat', pa.float64()),
+    ('stop_lon', pa.float64()),
+    ('zone_id', pa.string()),
+    ('stop_url', pa.string()),
+])
+
+# c_features: staging table enriched with trip direction and neighborhood
+SCTP_ROUTES_SPATIO_TEMPORAL_SCHEMA = STCP_ROUTES_SPATIO_TEMPORAL_SCHEMA \
+    .append(pa.field('trip_direction', pa.string())) \
+    .append(pa.field('neighborhood_name', pa.string()))
+
+# c_features: spatio-temporal features without the time dimension
+SCTP_ROUTES_SPATIO_SCHEMA = pa.schema([
+    field for field in SCTP_ROUTES_SPATIO_TEMPORAL_SCHEMA
+    if field.name not in ('service_id', 'trip_id', 'arrival_time', 'departure_time')
+])
+
+# c_features: headway distribution per route, direction, service and stop
+SCTP_ROUTES_HEADWAYS_SCHEMA = pa.schema([
+    ('route_id', pa.string()),
+    ('direction_id', pa.int8()),
+    ('service_id', pa.string()),
+    ('stop_id', pa.string()),
+    ('departures', pa.int32()),
+    ('headway_mean_min', pa.float64()),
+    ('headway_p50_min', pa.float64()),
+    ('headway_p90_min', pa.float64()),
+    ('headway_max_min', pa.float64()),
+])
+
+# c_features: mean headway per route, direction, service, stop and clock hour
+SCTP_ROUTES_HEADWAYS_HOURLY_SCHEMA = pa.schema([
+    ('route_id', pa.string()),
+    ('direction_id', pa.int8()),
+    ('service_id', pa.string()),
+    ('stop_id', pa.string()),
+    ('hour', pa.int8()),
+    ('headways', pa.int32()),
+    ('headway_mean_min', pa.float64()),
+])
+
+# c_features: wifi hotspot occupancy per time bin (minute or hour)
+PORTO_WIFI_OCCUPANCY_SCHEMA = pa.schema([
+    ('calledstationid', pa.string()),
+    ('bin_start', pa.timestamp('s')),
+    ('concurrent_sessions_peak', pa.int32()),
+    ('concurrent_sessions_mean', pa.float64()),
+    ('sessions', pa.int32()),
+    ('connected_minutes', pa.float64()),
+    ('unique_devices', pa.int32()),
+])
+
+# c_features: hourly occupancy, with the date and hour_slice of the hourly wifi access features
+PORTO_WIFI_OCCUPANCY_HOURLY_SCHEMA = PORTO_WIFI_OCCUPANCY_SCHEMA \
+    .append(pa.field('date', pa.string())) \
+    .append(pa.field('hour_slice', pa.string()))
+
+# Partition column of the spatio-temporal datasets, so readers can prune by service day type
+SERVICE_PARTITION = ['service_id']
+
+
+def save_to_parquet(df, file_path, schema, partition_cols=None):
+    """
+    Save a pandas DataFrame as Parquet with an explicit schema.
+
+    Parameters:
+        df (pandas.DataFrame): The data to be saved (must contain every column of the schema).
+        file_path (str): The path of the Parquet file, or of the dataset directory when partitioned.
+        schema (pyarrow.Schema): The column names and types to store.
+        partition_cols (list): Optional columns to partition the dataset directory by (hive style).
+
+    Returns:
+        None
+    """
+    save_chunks_to_parquet([df], file_path, schema, partition_cols=partition_cols)
+
+
+def save_chunks_to_parquet(chunks, file_path, schema, partition_cols=None):
+    """
+    Save an iterable of pandas DataFrames as one Parquet file or dataset, writing each chunk as it arrives.
+
+    Only one chunk is held in memory at a time, so the size of the output is not bounded by memory.
+
+    Parameters:
+        chunks (iterable): DataFrames to be saved (each must contain every column of the schema).
+        file_path (str): The path of the Parquet file, or of the dataset directory when partitioned.
+        schema (pyarrow.Schema): The column names and types to store.
+        partition_cols (list): Optional columns to partition the dataset directory by (hive style).
+
+    Returns:
+        None
+    """
+    writer = None
+    try:
+        # Replace any previous version of the dataset
+        if partition_cols and os.path.exists(file_path):
+            shutil.rmtree(file_path)
+
+        # Ensure the directory exists
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        num_rows = 0
+        for chunk_number, chunk in enumerate(chunks):
+            # Cast the columns to the schema, in the schema order
+            table = pa.Table.from_pandas(chunk[schema.names], schema=schema, preserve_index=False)
+
+            if partition_cols:
+                # One file per chunk in every partition it touches
+                pq.write_to_dataset(
+                    table,
+                    file_path,
+                    partition_cols=partition_cols,
+                    basename_template=f"part-{chunk_number}-{{i}}.parquet",
+                    compression='zstd'
+                )
+            else:
+                if writer is None:
+                    writer = pq.ParquetWriter(file_path, schema, compression='zstd')
+                writer.write_table(table)
+
+            num_rows += table.num_rows
+
+        print(f"Saved {num_rows} rows to {file_path}")
+
+    except Exception as e:
+        # Fail the step: a missing or partial output must not pass for an up to date one
+        print(f"An error occurred while saving the file: {e}")
+        raise
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def load_parquet(file_path, schema=None, columns=None, filters=None):
+    """
+    Load a Parquet file or partitioned dataset into a pandas DataFrame.
+
+    Only the requested columns are decoded and filters are pushed down to the reader,
+    so partitions and row groups that cannot match are skipped.
+
+    Parameters:
+        file_path (str): The path of the Parquet file or dataset directory.
+        schema (pyarrow.Schema): Optional schema of the dataset, used to type the partition columns.
+        columns (list): Optional subset of columns to read.
+        filters (list): Optional predicates, e.g. [('service_id', 'in', ['UTEIS', 'SAB'])].
+
+    Returns:
+        pandas.DataFrame: The loaded data.
+    """
+    table = pq.read_table(file_path, columns=columns, filters=filters, schema=schema)
+    return table.to_pandas()
+
+
+def string_dtypes(schema):
+    """
+    pandas read_csv dtypes that keep the string columns of a schema as text
+    (ids such as route_id or block_id would otherwise be parsed as numbers or NaN floats).
+
+    Parameters:
+        schema (pyarrow.Schema): The schema the CSV data will be saved with.
+
+    Returns:
+        dict: Column name -> str for every string column.
+    """
+    return {field.name: str for field in schema if pa.types.is_string(field.type)}
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Size of the blocks read when hashing files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_path(path):
+    """
+    Content hash of a file, or of every file inside a directory (e.g. a partitioned Parquet dataset).
+
+    Parameters:
+        path (str): File or directory path.
+
+    Returns:
+        str: SHA-256 hex digest, or None if the path does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(dir_path, file_name)
+            for dir_path, _, file_names in os.walk(path)
+            for file_name in file_names
+        )
+    else:
+        files = [path]
+
+    digest = hashlib.sha256()
+    for file_path in files:
+        # Include the relative name so renamed partitions change the hash
+        digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def build_dag(steps):
+    """
+    Build the dependency graph of the pipeline steps from their declared inputs and outputs.
+
+    A step depends on every step producing one of its inputs.
+
+    Parameters:
+        steps (list): Step dicts with 'name', 'script', 'inputs' and 'outputs'.
+
+    Returns:
+        dict: Step name -> set of upstream step names.
+    """
+    producers = {}
+    for step in steps:
+        for output in step['outputs']:
+            if output in producers:
+                raise ValueError(f"{output} is produced by both {producers[output]} and {step['name']}")
+            producers[output] = step['name']
+
+    dag = {
+        step['name']: {producers[path] for path in step['inputs'] if path in producers and producers[path] != step['name']}
+        for step in steps
+    }
+
+    # Reject cycles (Kahn's algorithm must be able to order every step)
+    remaining = {name: set(upstream) for name, upstream in dag.items()}
+    while remaining:
+        ready = [name for name, upstream in remaining.items() if not upstream]
+        if not ready:
+            raise ValueError(f"Cycle between pipeline steps: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for upstream in remaining.values():
+            upstream.difference_update(ready)
+
+    return dag
+
+
+def step_fingerprint(step):
+    """
+    Fingerprint of a step: content hashes of its script and of all its inputs.
+
+    Parameters:
+        step (dict): Step dict with 'script' and 'inputs'.
+
+    Returns:
+        dict: Path -> content hash.
+    """
+    return {path: hash_path(path) for path in [step['script']] + list(step['inputs'])}
+
+
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_state(state, state_path):
+    dir_path = os.path.dirname(state_path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+    with open(state_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=4, ensure_ascii=False)
+
+
+def run_step(step):
+    """
+    Run a step script with the current interpreter from the working directory (the repository root).
+
+    Returns:
+        tuple: (succeeded, elapsed seconds, captured output)
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, step['script']], capture_output=True, text=True)
+    return result.returncode == 0, time.perf_counter() - start, result.stdout + result.stderr
+
+
+def run_pipeline(steps, state_path, jobs=4, force=False, dry_run=False):
+    """
+    Run the pipeline steps in dependency order, skipping the ones that are up to date.
+
+    A step is up to date when all its outputs exist and the content hashes of its script and
+    inputs match the ones recorded after its last successful run. Independent branches run in
+    parallel, and a step whose upstream re-ran but produced identical outputs is still skipped.
+
+    Parameters:
+        steps (list): Step dicts with 'name', 'script', 'inputs' and 'outputs' (paths relative to the repository root).
+        state_path (str): JSON file with the fingerprints of the last successful runs.
+        jobs (int): Maximum number of steps running at the same time.
+        force (bool): Run every step regardless of its fingerprint.
+        dry_run (bool): Only report which steps would run.
+
+    Returns:
+        dict: Step name -> status ('ran', 'skipped', 'failed', 'blocked', 'missing inputs', 'would run').
+    """
+    dag = build_dag(steps)
+    steps_by_name = {step['name']: step for step in steps}
+    state = load_state(state_path)
+    status = {}
+
+    def is_up_to_date(step, fingerprint):
+        outputs_exist = all(os.path.exists(path) for path in step['outputs'])
+        return not force and outputs_exist and state.get(step['name']) == fingerprint
+
+    pending = dict(dag)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            # Schedule every step whose upstream steps are all finished
+            for name in [name for name, upstream in pending.items() if all(u in status for u in upstream)]:
+                del pending[name]
+                step = steps_by_name[name]
+
+                if any(status[u] in ('failed', 'blocked') for u in dag[name]):
+                    status[name] = 'blocked'
+                    print(f"[BLOCKED] {name}: an upstream step did not complete")
+                    continue
+
+                if dry_run and any(status[u] == 'would run' for u in dag[name]):
+                    # Its inputs are about to be regenerated
+                    status[name] = 'would run'
+                    print(f"[WOULD RUN] {name}")
+                    continue
+
+                # Inputs nobody produced (e.g. a dataset not checked out); the step cannot run, but the
+                # steps downstream can still use the outputs already on disk
+                missing = [path for path in step['inputs'] if not os.path.exists(path)]
+                if missing:
+                    status[name] = 'missing inputs'
+                    print(f"[MISSING INPUTS] {name}: {missing}")
+                    continue
+
+                fingerprint = step_fingerprint(step)
+                if is_up_to_date(step, fingerprint):
+                    status[name] = 'skipped'
+                    print(f"[SKIPPED] {name}: inputs unchanged")
+                elif dry_run:
+                    status[name] = 'would run'
+                    print(f"[WOULD RUN] {name}")
+                else:
+                    print(f"[RUNNING] {name}")
+                    running[executor.submit(run_step, step)] = (name, fingerprint)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                succeeded, elapsed, output = future.result()
+                if succeeded:
+                    status[name] = 'ran'
+                    state[name] = fingerprint
+                    save_state(state, state_path)
+                    print(f"[DONE] {name} in {elapsed:.1f}s")
+                else:
+                    status[name] = 'failed'
+                    print(f"[FAILED] {name} after {elapsed:.1f}s\n{output}")
+
+    return status
@@ -0,0 +1,87 @@
+import math
+import numpy as np
+
+# Google encoded polyline precision (5 decimal places, ~1 m)
+POLYLINE_PRECISION = 5
+
+# Web Mercator ground resolution at zoom 0, in meters per pixel at the equator
+METERS_PER_PIXEL_ZOOM_0 = 156543.03392
+
+METERS_PER_DEGREE = 111320.0
+
+# Reference latitude of the maps (Porto)
+PORTO_LATITUDE = 41.15
+
+# Zoom levels a simplified polyline is produced for (city overview, district, street)
+ZOOM_LEVELS = [12, 14, 16]
+
+
+def tolerance_for_zoom(zoom, latitude=PORTO_LATITUDE, max_pixels=0.5):
+    """
+    Douglas-Peucker tolerance, in degrees, below which a deviation is invisible at a zoom level.
+
+    Parameters:
+        zoom (int): Web map zoom level.
+        latitude (float): Latitude the ground resolution is computed at.
+        max_pixels (float): Maximum on-screen deviation allowed, in pixels.
+
+    Returns:
+        float: The tolerance in degrees.
+    """
+    meters_per_pixel = METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / 2 ** zoom
+    return max_pixels * meters_per_pixel / METERS_PER_DEGREE
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """
+    Encode [lat, lon] points with Google's encoded polyline algorithm.
+
+    Parameters:
+        points (array-like): (n, 2) [lat, lon] points.
+        precision (int): Number of decimal places kept.
+
+    Returns:
+        str: The encoded polyline.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return ''
+
+    # Fixed point values, delta encoded point to point, then zigzag (sign in the lowest bit)
+    values = np.round(points * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    deltas = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Split every value in 5-bit chunks, low chunks first, 0x20 flagging that more chunks follow
+    chars = []
+    for value in deltas.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """
+    Decode a Google encoded polyline.
+
+    Parameters:
+        encoded (str): The encoded polyline.
+        precision (int): Number of decimal places it was encoded with.
+
+    Returns:
+        numpy.ndarray: (n, 2) [lat, lon] points.
+    """
+    values = []
+    value, shift = 0, 0
+    for char in encoded:
+        chunk = ord(char) - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10 ** precision
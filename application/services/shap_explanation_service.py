@@ -0,0 +1,154 @@
+import os
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from application.services.lean_predictor import HOUR_COLUMN
+
+# Rows explained when sampling (the summary plot does not get more informative beyond a few thousand points)
+SAMPLE_SIZE = 5000
+
+# Rows per SHAP chunk, each chunk is explained by one worker
+CHUNK_SIZE = 1024
+
+
+def stratified_sample(X, n_samples=SAMPLE_SIZE, strata_column=HOUR_COLUMN, seed=42):
+    """
+    Positions of a random sample of X with every stratum kept in proportion (at least one row each).
+
+    Parameters:
+        X (pandas.DataFrame): Rows to sample from.
+        n_samples (int): Sample size, the whole frame when None or not smaller than it.
+        strata_column (str): Column defining the strata (the hour slice by default).
+        seed (int): Random seed.
+
+    Returns:
+        numpy.ndarray: Sorted row positions.
+    """
+    if n_samples is None or n_samples >= len(X):
+        return np.arange(len(X))
+
+    strata, _ = pd.factorize(X[strata_column])
+    sizes = np.bincount(strata)
+    quotas = np.maximum(np.round(sizes * n_samples / len(X)).astype(np.int64), 1)
+
+    # Random order within every stratum, then the first quota rows of each
+    order = np.lexsort((np.random.default_rng(seed).random(len(X)), strata))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(X)) - starts[strata[order]]
+    return np.sort(order[rank < quotas[strata[order]]])
+
+
+def explain_chunk(booster, matrix):
+    """
+    Exact TreeSHAP values of a chunk, computed by LightGBM (pred_contrib), single threaded.
+
+    Returns:
+        numpy.ndarray: (rows, features + 1) contributions, the last column is the expected value.
+    """
+    return booster.predict(matrix, pred_contrib=True, num_threads=1)
+
+
+class ShapExplanation:
+    """
+    SHAP values of a sample of rows, with the encoded feature values they explain.
+
+    values[i, j] is the contribution of columns[j] to the prediction of row sample_index[i] (position in
+    the explained frame), base_value the expected prediction. mean_abs (global importance) is aggregated
+    chunk by chunk while the values are computed, so it never needs the full array in floating point
+    twice. Stored as one compressed .npz, the plots are redrawn from it without running the model.
+    """
+
+    def __init__(self, values, base_value, features, columns, sample_index, mean_abs):
+        self.values = values
+        self.base_value = float(base_value)
+        self.features = features
+        self.columns = list(columns)
+        self.sample_index = sample_index
+        self.mean_abs = mean_abs
+
+    @classmethod
+    def compute(cls, booster, matrix, columns, sample_index=None, chunk_size=CHUNK_SIZE, n_jobs=-1):
+        """
+        Explain the rows of an encoded feature matrix in chunks across a thread pool.
+
+        LightGBM releases the GIL while predicting, so chunks run in parallel threads sharing the booster
+        instead of copying it to worker processes.
+
+        Parameters:
+            booster (lightgbm.Booster): The trained booster.
+            matrix (numpy.ndarray): Encoded (rows, columns) features, in booster column order.
+            columns (list): Column names of the matrix.
+            sample_index (numpy.ndarray): Positions of the rows in the explained frame (default: 0..rows-1).
+            chunk_size (int): Rows per chunk.
+            n_jobs (int): Worker threads (-1 = all cores).
+
+        Returns:
+            ShapExplanation: The explanation.
+        """
+        rows, width = matrix.shape
+        values = np.empty((rows, width), dtype=np.float32)
+        abs_totals = np.zeros(width, dtype=np.float64)
+        base_value = 0.0
+
+        starts = range(0, rows, chunk_size)
+        chunks = Parallel(n_jobs=n_jobs, prefer='threads', return_as='generator')(
+            delayed(explain_chunk)(booster, matrix[start:start + chunk_size]) for start in starts
+        )
+        for start, contributions in zip(starts, chunks):
+            values[start:start + len(contributions)] = contributions[:, :-1]
+            abs_totals += np.abs(contributions[:, :-1]).sum(axis=0)
+            base_value = contributions[0, -1]
+
+        return cls(
+            values=values,
+            base_value=base_value,
+            features=matrix.astype(np.float32),
+            columns=columns,
+            sample_index=np.arange(rows) if sample_index is None else np.asarray(sample_index),
+            mean_abs=abs_totals / max(rows, 1),
+        )
+
+    def save(self, file_path):
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        np.savez_compressed(
+            file_path,
+            values=self.values,
+            base_value=np.array(self.base_value),
+            features=self.features,
+            columns=np.array(self.columns, dtype=str),
+            sample_index=self.sample_index,
+            mean_abs=self.mean_abs,
+        )
+        print(f"Saved SHAP values of {len(self.values)} rows to {file_path}")
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path, allow_pickle=False) as arrays:
+            return cls(
+                values=arrays['values'],
+                base_value=arrays['base_value'],
+                features=arrays['features'],
+                columns=arrays['columns'].tolist(),
+                sample_index=arrays['sample_index'],
+                mean_abs=arrays['mean_abs'],
+            )
+
+    def feature_frame(self):
+        """
+        Explained feature values as a DataFrame (the layout shap.summary_plot expects next to the values).
+        """
+        return pd.DataFrame(self.features, columns=self.columns)
+
+    def importance(self):
+        """
+        Global importance: mean absolute SHAP value per feature, most important first.
+        """
+        return (
+            pd.DataFrame({'feature': self.columns, 'mean_abs_shap': self.mean_abs})
+            .sort_values('mean_abs_shap', ascending=False)
+            .reset_index(drop=True)
+        )
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+import application.services.geo_proximity_service as gps
+
+
+class ShapeStore:
+    """
+    GTFS shapes held in contiguous NumPy arrays.
+
+    All points are sorted once by (shape_id, shape_pt_sequence) into a single (n, 2) [lat, lon]
+    array; offsets[i]:offsets[i + 1] delimits the points of shape_ids[i]. Per-shape accessors
+    return views into that array instead of building one dict per point.
+    """
+
+    def __init__(self, shape_ids, offsets, points, sequences):
+        self.shape_ids = shape_ids
+        self.offsets = offsets
+        self.points = points
+        self.sequences = sequences
+        self.positions = {shape_id: position for position, shape_id in enumerate(shape_ids)}
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        """
+        Load a GTFS shapes.csv file.
+
+        Parameters:
+            csv_file (str): Path of shapes.csv.
+
+        Returns:
+            ShapeStore: The loaded shapes.
+        """
+        shapes_df = pd.read_csv(
+            csv_file,
+            usecols=['shape_id', 'shape_pt_lat', 'shape_pt_lon', 'shape_pt_sequence'],
+            dtype={'shape_id': str, 'shape_pt_lat': np.float64, 'shape_pt_lon': np.float64, 'shape_pt_sequence': np.int32},
+            encoding='utf-8'
+        )
+
+        # Integer codes per shape_id (sorted ids), then one stable sort of all points
+        codes, shape_ids = pd.factorize(shapes_df['shape_id'], sort=True)
+        sequences = shapes_df['shape_pt_sequence'].to_numpy()
+        order = np.lexsort((sequences, codes))
+
+        points = np.ascontiguousarray(shapes_df[['shape_pt_lat', 'shape_pt_lon']].to_numpy()[order])
+        offsets = np.zeros(len(shape_ids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(codes, minlength=len(shape_ids)))
+
+        return cls(np.asarray(shape_ids, dtype=object), offsets, points, sequences[order])
+
+    def __len__(self):
+        return len(self.shape_ids)
+
+    def __contains__(self, shape_id):
+        return shape_id in self.positions
+
+    def bounds(self, shape_id):
+        position = self.positions[shape_id]
+        return self.offsets[position], self.offsets[position + 1]
+
+    def coordinates(self, shape_id):
+        """
+        Points of a shape as a zero-copy (n, 2) [lat, lon] view, ordered by shape_pt_sequence.
+        """
+        start, end = self.bounds(shape_id)
+        return self.points[start:end]
+
+    def point_sequences(self, shape_id):
+        """
+        shape_pt_sequence values of a shape's points, as a zero-copy view.
+        """
+        start, end = self.bounds(shape_id)
+        return self.sequences[start:end]
+
+    def endpoints(self, shape_id):
+        """
+        First and last [lat, lon] points of a shape.
+        """
+        coordinates = self.coordinates(shape_id)
+        return coordinates[0], coordinates[-1]
+
+    def cumulative_distance(self, shape_id):
+        """
+        Distance in kilometers travelled from the first point up to every point of a shape.
+        """
+        coordinates = self.coordinates(shape_id)
+        segments = gps.haversine_km(coordinates[:-1, 0], coordinates[:-1, 1], coordinates[1:, 0], coordinates[1:, 1])
+        return np.concatenate([[0.0], np.cumsum(segments)])
+
+    def simplified(self, shape_id, tolerance):
+        """
+        Douglas-Peucker simplification of a shape.
+
+        Parameters:
+            shape_id (str): The shape to simplify.
+            tolerance (float): Maximum deviation allowed, in degrees.
+
+        Returns:
+            numpy.ndarray: (m, 2) [lat, lon] points, m <= n, keeping both endpoints.
+        """
+        coordinates = self.coordinates(shape_id)
+        if len(coordinates) < 3:
+            return coordinates.copy()
+        line = shapely.linestrings(coordinates)
+        return shapely.get_coordinates(shapely.simplify(line, tolerance, preserve_topology=False))
@@ -0,0 +1,169 @@
+import os
+import numpy as np
+import pandas as pd
+
+import application.services.gtfs_time_utils as gtu
+
+# Attributes of the stop dimension, stored next to the counts
+STOP_ATTRIBUTES = ['stop_id', 'stop_lat', 'stop_lon', 'stop_name', 'neighborhood_name']
+
+# Neighborhood of stops the feature datasets have no neighborhood for
+UNKNOWN_NEIGHBORHOOD = 'Unknown'
+
+
+class TripCube:
+    """
+    Dense stop x service x hour cube of distinct trip counts.
+
+    counts[s, v, h] is the number of distinct trips calling at stops[s] on service_ids[v] during
+    hours[h]. The dimension dictionaries (stop attributes, service ids, hour labels) map array
+    positions back to values, so slicing and rolling up are array indexing and sums instead of
+    groupbys over string columns. Neighborhoods are an attribute of the stop dimension and are
+    rolled up through their integer codes.
+    """
+
+    def __init__(self, counts, stops, service_ids, hours):
+        self.counts = counts
+        self.stops = stops
+        self.service_ids = list(service_ids)
+        self.hours = list(hours)
+
+        self.stop_positions = {stop_id: position for position, stop_id in enumerate(stops['stop_id'])}
+        self.service_positions = {service_id: position for position, service_id in enumerate(self.service_ids)}
+        self.hour_positions = {hour: position for position, hour in enumerate(self.hours)}
+        self.neighborhood_codes, self.neighborhoods = pd.factorize(stops['neighborhood_name'], sort=True)
+
+    @classmethod
+    def from_frame(cls, trips_df, neighborhoods=None):
+        """
+        Build the cube from the hourly trip counts.
+
+        Parameters:
+            trips_df (pandas.DataFrame): sctp_bus_stops_trips_hourly rows (stop_id, service_id, hourly_slice,
+                stop_lat, stop_lon, stop_name, distinct_trip_count).
+            neighborhoods (dict): stop_id -> neighborhood_name.
+
+        Returns:
+            TripCube: The cube.
+        """
+        stops = (
+            trips_df[['stop_id', 'stop_lat', 'stop_lon', 'stop_name']]
+            .drop_duplicates(subset=['stop_id'])
+            .sort_values('stop_id')
+            .reset_index(drop=True)
+        )
+        stops['neighborhood_name'] = stops['stop_id'].map(neighborhoods or {}).fillna(UNKNOWN_NEIGHBORHOOD)
+
+        service_ids = sorted(trips_df['service_id'].unique())
+        hours = gtu.slice_labels(width_minutes=60)
+
+        stop_codes = pd.Index(stops['stop_id']).get_indexer(trips_df['stop_id'])
+        service_codes = pd.Index(service_ids).get_indexer(trips_df['service_id'])
+        hour_codes = pd.Index(hours).get_indexer(trips_df['hourly_slice'])
+        if (hour_codes < 0).any():
+            raise ValueError(f"Unknown hourly slices: {sorted(set(trips_df['hourly_slice'][hour_codes < 0]))}")
+
+        counts = np.zeros((len(stops), len(service_ids), len(hours)), dtype=np.int32)
+        np.add.at(counts, (stop_codes, service_codes, hour_codes), trips_df['distinct_trip_count'].to_numpy())
+        return cls(counts, stops, service_ids, hours)
+
+    def save(self, file_path):
+        """
+        Save the counts and dimension dictionaries as an uncompressed .npz (plain arrays, no pickles).
+        """
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        np.savez(
+            file_path,
+            counts=self.counts,
+            service_ids=np.array(self.service_ids, dtype=str),
+            hours=np.array(self.hours, dtype=str),
+            stop_lat=self.stops['stop_lat'].to_numpy(dtype=np.float64),
+            stop_lon=self.stops['stop_lon'].to_numpy(dtype=np.float64),
+            **{column: self.stops[column].to_numpy(dtype=str) for column in ['stop_id', 'stop_name', 'neighborhood_name']}
+        )
+        print(f"Saved {self.counts.shape} trip cube to {file_path}")
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path, allow_pickle=False) as arrays:
+            stops = pd.DataFrame({column: arrays[column] for column in STOP_ATTRIBUTES})
+            return cls(arrays['counts'], stops, arrays['service_ids'].tolist(), arrays['hours'].tolist())
+
+    def _positions(self, values, positions):
+        # None selects the whole axis, a single value or a list selects those positions
+        if values is None:
+            return slice(None)
+        if isinstance(values, (list, tuple, np.ndarray, pd.Index)):
+            return [positions[value] for value in values]
+        return positions[values]
+
+    def slice(self, stop_id=None, service_id=None, hour=None):
+        """
+        Trip counts for the selected stops, services and hours.
+
+        Each argument is None (all), a single value (axis dropped) or a list of values, e.g.
+        slice(stop_id=['A', 'B'], service_id=['U', 'S']) has shape (2, 2, 24).
+
+        Returns:
+            numpy.ndarray or int: A view (or copy for lists) of the cube.
+        """
+        # One axis at a time, so lists on several axes select their outer product instead of being paired
+        counts, axis = self.counts, 0
+        for positions in [
+            self._positions(stop_id, self.stop_positions),
+            self._positions(service_id, self.service_positions),
+            self._positions(hour, self.hour_positions),
+        ]:
+            counts = counts[(slice(None),) * axis + (positions,)]
+            if isinstance(positions, (list, slice)):
+                axis += 1
+        return counts
+
+    def hourly_totals(self, service_id=None):
+        """
+        Trip calls at all stops per hour (summed over services unless one is given).
+
+        Returns:
+            pandas.Series: Totals indexed by hour label.
+        """
+        counts = self.counts if service_id is None else self.counts[:, [self.service_positions[service_id]], :]
+        return pd.Series(counts.sum(axis=(0, 1)), index=self.hours)
+
+    def neighborhood_hourly_totals(self, service_id=None):
+        """
+        Roll the stops up to their neighborhoods: trip calls per neighborhood and hour.
+
+        Returns:
+            pandas.DataFrame: neighborhood_name x hour totals.
+        """
+        counts = self.counts if service_id is None else self.counts[:, [self.service_positions[service_id]], :]
+        totals = np.zeros((len(self.neighborhoods), len(self.hours)), dtype=np.int64)
+        np.add.at(totals, self.neighborhood_codes, counts.sum(axis=1))
+        return pd.DataFrame(totals, index=pd.Index(self.neighborhoods, name='neighborhood_name'), columns=self.hours)
+
+    def to_frame(self, service_id=None, hour=None):
+        """
+        Non-zero cells in long format (the sctp_bus_stops_trips_hourly columns plus neighborhood_name),
+        ordered by hour, service and stop.
+
+        Parameters:
+            service_id (str or list): Restrict to these services.
+            hour (str or list): Restrict to these hour labels.
+
+        Returns:
+            pandas.DataFrame: One row per stop, service and hour with trips.
+        """
+        service_positions = np.atleast_1d(np.arange(len(self.service_ids))[self._positions(service_id, self.service_positions)])
+        hour_positions = np.atleast_1d(np.arange(len(self.hours))[self._positions(hour, self.hour_positions)])
+        counts = self.counts[:, service_positions][:, :, hour_positions]
+
+        # Nonzero cells, ordered by hour first so animation frames need no sorting
+        hour_index, service_index, stop_index = np.nonzero(counts.transpose(2, 1, 0))
+        frame = self.stops.iloc[stop_index].reset_index(drop=True)
+        frame.insert(1, 'service_id', np.array(self.service_ids, dtype=object)[service_positions[service_index]])
+        frame.insert(2, 'hourly_slice', np.array(self.hours, dtype=object)[hour_positions[hour_index]])
+        frame['distinct_trip_count'] = counts[stop_index, service_index, hour_index]
+        return frame
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+import application.services.wifi_session_aggregator as wsa
+
+# RADIUS accounting columns an occupancy interval is built from
+SESSION_COLUMNS = ['calledstationid', 'callingstationid', 'acctstarttime', 'acctsessiontime']
+
+# Time bins occupancy is reported over
+BIN_SECONDS = {'minute': 60, 'hour': 3600}
+
+# Hotspots swept together (the sessions of different hotspots never interact, so the work is split by hotspot)
+HOTSPOTS_PER_BATCH = 16
+
+
+def load_sessions(file_path, chunk_bytes=wsa.CHUNK_BYTES):
+    """
+    Session intervals of a RADIUS accounting log, read chunk by chunk into compact arrays.
+
+    A session runs from acctstarttime for acctsessiontime seconds, on [start, end). Devices
+    (callingstationid) are kept as 64-bit hashes, which is all distinct counting needs.
+    Rows missing any of SESSION_COLUMNS, or with a malformed start time or negative duration, are skipped.
+
+    Returns:
+        tuple: (hotspot name per code, dict of hotspot, device, start and end arrays sorted by hotspot)
+    """
+    hotspot_codes, hotspots = {}, []
+    parts = []
+    for frame, _ in wsa.read_log_chunks(file_path, columns=SESSION_COLUMNS, chunk_bytes=chunk_bytes):
+        hotspot = wsa.dictionary_encode(frame['calledstationid'].to_numpy(dtype=object), hotspot_codes, hotspots)
+        start = wsa.parse_timestamps(frame['acctstarttime'].to_numpy())
+        duration = pd.to_numeric(frame['acctsessiontime'], errors='coerce').to_numpy()
+        devices = frame['callingstationid']
+        valid = (hotspot >= 0) & ~np.isnat(start) & (duration >= 0) & devices.notna().to_numpy()
+
+        start_seconds = start[valid].astype('datetime64[s]').astype(np.int64)
+        parts.append({
+            'hotspot': hotspot[valid],
+            'device': pd.util.hash_array(devices.to_numpy(dtype=object)[valid]),
+            'start': start_seconds,
+            'end': start_seconds + np.round(duration[valid]).astype(np.int64),
+        })
+
+    sessions = {
+        name: np.concatenate([part[name] for part in parts]) if parts else np.array([], dtype=np.int64)
+        for name in ['hotspot', 'device', 'start', 'end']
+    }
+    order = np.argsort(sessions['hotspot'], kind='stable')
+    return hotspots, {name: values[order] for name, values in sessions.items()}
+
+
+def coverage_runs(first, last):
+    """
+    Cells covered by a set of [first, last] cell ranges, as runs of constant coverage.
+
+    A sweep over the sorted range boundaries: +1 where a range opens, -1 past where it closes.
+
+    Returns:
+        tuple: (run start cells, run lengths, number of ranges covering the run), for covered runs only.
+    """
+    if len(first) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    boundaries = np.concatenate([first, last + 1])
+    deltas = np.concatenate([np.ones(len(first), dtype=np.int64), np.full(len(last), -1, dtype=np.int64)])
+    order = np.argsort(boundaries, kind='stable')
+    keys, index = np.unique(boundaries[order], return_index=True)
+    coverage = np.cumsum(np.add.reduceat(deltas[order], index))
+
+    # The coverage of a run holds until the next boundary (it is back to 0 after the last one)
+    covered = coverage[:-1] > 0
+    return keys[:-1][covered], np.diff(keys)[covered], coverage[:-1][covered]
+
+
+def expand_runs(starts, lengths, values):
+    """
+    One (cell, value) pair per cell of every run.
+    """
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cells = np.repeat(starts, lengths) + np.arange(lengths.sum()) - offsets
+    return cells, np.repeat(values, lengths)
+
+
+def device_ranges(hotspot, device, first_bin, last_bin):
+    """
+    Merge the bin ranges of every (hotspot, device) that share a bin, so that each device covers
+    any bin at most once and counting covering ranges counts distinct devices.
+
+    Returns:
+        tuple: (hotspot, first bin, last bin) per merged range.
+    """
+    order = np.lexsort((first_bin, device, hotspot))
+    hotspot, device, first_bin, last_bin = hotspot[order], device[order], first_bin[order], last_bin[order]
+
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (hotspot[1:] != hotspot[:-1]) | (device[1:] != device[:-1])
+    group = np.cumsum(new_group) - 1
+
+    # Latest bin reached so far within the group (a running maximum that restarts with every group)
+    span = int(last_bin.max()) + 2
+    reached = np.maximum.accumulate(group * span + last_bin) - group * span
+    previous = np.concatenate([[-1], reached[:-1]])
+
+    starts = np.flatnonzero(new_group | (first_bin > previous))
+    return hotspot[starts], first_bin[starts], np.maximum.reduceat(last_bin, starts)
+
+
+def occupancy(hotspot, device, start, end, bin_seconds):
+    """
+    Occupancy of every (hotspot, time bin) with at least one session, from one sort of the session events.
+
+    Parameters:
+        hotspot (numpy.ndarray): Hotspot code per session.
+        device (numpy.ndarray): Device hash per session.
+        start (numpy.ndarray): Session start, epoch seconds.
+        end (numpy.ndarray): Session end, epoch seconds (the session is active on [start, end)).
+        bin_seconds (int): Width of the time bins (aligned to the epoch, so to the minute or hour).
+
+    Returns:
+        pandas.DataFrame: hotspot, bin_start (epoch seconds), concurrent_sessions_peak (most sessions active
+        at the same instant), concurrent_sessions_mean (connected time over bin length), sessions (active
+        at some point of the bin), connected_minutes and unique_devices, ordered by hotspot and bin.
+    """
+    first_bin = start // bin_seconds
+    last_bin = np.maximum(end - 1, start) // bin_seconds
+    origin_bin = int(first_bin.min())
+    t0 = origin_bin * bin_seconds
+    first_bin, last_bin = first_bin - origin_bin, last_bin - origin_bin
+
+    # Cells are hotspot * cell_offset + bin, times are hotspot * time_offset + seconds since t0
+    cell_offset = int(last_bin.max()) + 2
+    time_offset = int(end.max()) - t0 + bin_seconds + 1
+
+    # Sessions and unique devices: number of (merged) bin ranges covering each cell
+    cells, sessions = expand_runs(*coverage_runs(hotspot * cell_offset + first_bin, hotspot * cell_offset + last_bin))
+    device_hotspot, device_first, device_last = device_ranges(hotspot, device, first_bin, last_bin)
+    device_cells, devices = expand_runs(*coverage_runs(device_hotspot * cell_offset + device_first,
+                                                       device_hotspot * cell_offset + device_last))
+    unique_devices = devices[np.searchsorted(device_cells, cells)]
+
+    # Sorted start and end events, with running sums of their times since t0
+    start_keys = np.sort(hotspot * time_offset + (start - t0))
+    end_keys = np.sort(hotspot * time_offset + (end - t0))
+    start_sums = np.concatenate([[0], np.cumsum(start_keys % time_offset)])
+    end_sums = np.concatenate([[0], np.cumsum(end_keys % time_offset)])
+
+    def connected_until(queries):
+        # Connected seconds up to each query time: sum over sessions of clip(t, start, end) - start.
+        # Sessions of earlier hotspots add the same constant to both ends of a bin, so it cancels out.
+        started = np.searchsorted(start_keys, queries, side='right')
+        ended = np.searchsorted(end_keys, queries, side='right')
+        elapsed = queries % time_offset
+        return elapsed * (started - ended) - (start_sums[started] - end_sums[ended]), started - ended
+
+    cell_hotspot, cell_bin = cells // cell_offset, cells % cell_offset
+    bin_start_keys = cell_hotspot * time_offset + cell_bin * bin_seconds
+    connected_start, active_at_start = connected_until(bin_start_keys)
+    connected_end, _ = connected_until(bin_start_keys + bin_seconds)
+    connected_seconds = connected_end - connected_start
+
+    # Peak concurrency: the running count after every instant with events (ends before starts),
+    # maximized per cell, against the sessions already active when the bin opens
+    event_keys = np.concatenate([end_keys, start_keys])
+    deltas = np.concatenate([np.full(len(end_keys), -1, dtype=np.int64), np.ones(len(start_keys), dtype=np.int64)])
+    order = np.lexsort((deltas, event_keys))
+    running = np.cumsum(deltas[order])
+    event_keys = event_keys[order]
+
+    # Only the count after the last event of an instant is a state the hotspot was actually in
+    settled = np.append(event_keys[1:] != event_keys[:-1], True)
+    running, event_keys = running[settled], event_keys[settled]
+    event_cells = (event_keys // time_offset) * cell_offset + (event_keys % time_offset) // bin_seconds
+    peak_cells, index = np.unique(event_cells, return_index=True)
+    peaks = np.maximum.reduceat(running, index)
+
+    position = np.minimum(np.searchsorted(peak_cells, cells), len(peak_cells) - 1)
+    has_events = peak_cells[position] == cells
+    peak = np.maximum(active_at_start, np.where(has_events, peaks[position], 0))
+
+    return pd.DataFrame({
+        'hotspot': cell_hotspot,
+        'bin_start': (origin_bin + cell_bin) * bin_seconds,
+        'concurrent_sessions_peak': peak,
+        'concurrent_sessions_mean': connected_seconds / bin_seconds,
+        'sessions': sessions,
+        'connected_minutes': connected_seconds / 60,
+        'unique_devices': unique_devices,
+    })
+
+
+def occupancy_batches(hotspots, sessions, bin_seconds, hotspots_per_batch=HOTSPOTS_PER_BATCH):
+    """
+    Occupancy per hotspot and time bin, computed and yielded a batch of hotspots at a time.
+
+    Parameters:
+        hotspots (list): Hotspot name per code (from load_sessions).
+        sessions (dict): Session arrays sorted by hotspot (from load_sessions).
+        bin_seconds (int): Width of the time bins.
+        hotspots_per_batch (int): Hotspots per batch.
+
+    Yields:
+        pandas.DataFrame: calledstationid, bin_start (timestamp) and the occupancy metrics (see occupancy).
+    """
+    boundaries = np.searchsorted(sessions['hotspot'], np.arange(0, len(hotspots) + hotspots_per_batch, hotspots_per_batch))
+    for batch_start, batch_end in zip(boundaries[:-1], boundaries[1:]):
+        if batch_start == batch_end:
+            continue
+        batch = {name: values[batch_start:batch_end] for name, values in sessions.items()}
+        frame = occupancy(batch['hotspot'], batch['device'], batch['start'], batch['end'], bin_seconds)
+        frame.insert(0, 'calledstationid', np.array(hotspots, dtype=object)[frame.pop('hotspot')])
+        frame['bin_start'] = pd.to_datetime(frame['bin_start'], unit='s')
+        yield frame
@@ -0,0 +1,314 @@
+import hashlib
+import io
+import os
+import numpy as np
+import pandas as pd
+
+import application.services.hyperloglog as hll
+
+# RADIUS accounting timestamps (acctstarttime / acctstoptime), e.g. 2024-09-18 14:05:31
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Bytes of the session log parsed at once (memory stays bounded by this, not by the log size)
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Bytes before the resume offset hashed to check the log was only appended to since the checkpoint
+TAIL_CHECK_BYTES = 4096
+
+# Area of the city-wide rollups
+CITY = 'Porto'
+
+# Hour slices as labelled in the wifi features and the mobility regressor ('07:00–07:59')
+HOUR_SLICE_LABELS = np.array([f"{hour:02d}:00–{hour:02d}:59" for hour in range(24)], dtype=object)
+
+
+def parse_timestamps(values, timestamp_format=TIMESTAMP_FORMAT):
+    """
+    Parse timestamp strings with a fixed format, parsing each distinct string only once.
+
+    Returns:
+        numpy.ndarray: datetime64[ns] per value, NaT where missing or malformed.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=timestamp_format, errors='coerce').to_numpy()
+
+    # Append NaT so missing values (code -1) pick it up
+    return np.append(parsed, np.datetime64('NaT', 'ns'))[codes]
+
+
+def epoch_hours(timestamps):
+    """
+    Hours since 1970-01-01 of datetime64 values (NaT is left to the caller to mask).
+    """
+    return np.asarray(timestamps, dtype='datetime64[ns]').astype('datetime64[h]').astype(np.int64)
+
+
+def read_log_chunks(file_path, offset=0, columns=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Read the complete lines of a CSV log from a byte offset on, a bounded chunk at a time.
+
+    A trailing line without its newline (still being written) is left for the next read, so the
+    function can be called again on a growing file from the returned offset.
+
+    Parameters:
+        file_path (str): CSV log with a header line.
+        offset (int): Byte offset to start at (0 = right after the header).
+        columns (list): Columns to keep (all when None).
+        chunk_bytes (int): Bytes read per chunk.
+
+    Yields:
+        tuple: (DataFrame of string columns, byte offset after its last line)
+    """
+    with open(file_path, 'rb') as file:
+        header = file.readline()
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+        offset = max(offset, len(header))
+        file.seek(offset)
+
+        pending = b''
+        while True:
+            data = file.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            end = data.rfind(b'\n') + 1
+            pending = data[end:]
+            if end == 0:
+                continue
+
+            frame = pd.read_csv(io.BytesIO(data[:end]), header=None, names=names, usecols=columns,
+                                dtype=str, encoding='utf-8')
+            offset += end
+            yield frame, offset
+
+
+def dictionary_encode(values, codes_by_value, dictionary):
+    """
+    Codes of the values in a dictionary kept across chunks, extended with the values not seen before.
+
+    Parameters:
+        values (numpy.ndarray): Values to encode.
+        codes_by_value (dict): Value -> code, updated in place.
+        dictionary (list): Value per code, updated in place.
+
+    Returns:
+        numpy.ndarray: int64 code per value, -1 where missing.
+    """
+    codes, uniques = pd.factorize(values)
+    dictionary_codes = np.empty(len(uniques), dtype=np.int64)
+    for position, value in enumerate(uniques):
+        if value not in codes_by_value:
+            codes_by_value[value] = len(dictionary)
+            dictionary.append(value)
+        dictionary_codes[position] = codes_by_value[value]
+    return np.where(codes >= 0, dictionary_codes[codes], -1)
+
+
+def tail_digest(file_path, offset, check_bytes=TAIL_CHECK_BYTES):
+    """
+    Hash of the bytes just before offset ('' when the file is shorter than offset).
+    """
+    if offset <= 0 or not os.path.exists(file_path) or os.path.getsize(file_path) < offset:
+        return ''
+    with open(file_path, 'rb') as file:
+        start = max(offset - check_bytes, 0)
+        file.seek(start)
+        return hashlib.sha256(file.read(offset - start)).hexdigest()
+
+
+class HourlySessionCounter:
+    """
+    Running session counts per (calledstationid, date, hour), updated chunk by chunk.
+
+    Hotspots are dictionary encoded and each (hotspot, hour) cell is one packed int64 key
+    (hotspot code << 32 | hours since epoch), kept sorted next to its count. Memory grows with the
+    number of hotspot-hours, not with the number of sessions, and a chunk is merged into the counts
+    without revisiting earlier ones.
+
+    Distinct devices (callingstationid) per cell are estimated with HyperLogLog sketches, which
+    merge into daily, neighborhood and city-wide distinct counts without going back to the log.
+
+    The counts and sketches are checkpointed together with the byte offset of the log they cover,
+    so a rerun on an appended log only reads the new lines.
+    """
+
+    def __init__(self, hotspots=None, keys=None, counts=None, offset=0, digest='', devices=None):
+        self.hotspots = list(hotspots or [])
+        self.hotspot_codes = {hotspot: code for code, hotspot in enumerate(self.hotspots)}
+        self.keys = np.array([], dtype=np.int64) if keys is None else keys
+        self.counts = np.array([], dtype=np.int64) if counts is None else counts
+        self.offset = offset
+        self.digest = digest
+        self.sessions = int(self.counts.sum())
+        self.devices = devices if devices is not None else hll.HyperLogLogSketches.for_error()
+
+    def encode_hotspots(self, hotspots):
+        return dictionary_encode(hotspots, self.hotspot_codes, self.hotspots)
+
+    def add(self, hotspots, start_times, devices=None):
+        """
+        Count a chunk of sessions.
+
+        Parameters:
+            hotspots (array-like): calledstationid per session.
+            start_times (array-like): acctstarttime strings per session (TIMESTAMP_FORMAT).
+            devices (array-like): Optional callingstationid per session, added to the distinct device sketches.
+
+        Returns:
+            int: Sessions counted (rows with a missing hotspot or malformed start time are skipped).
+        """
+        codes = self.encode_hotspots(np.asarray(hotspots, dtype=object))
+        timestamps = parse_timestamps(start_times)
+        valid = (codes >= 0) & ~np.isnat(timestamps)
+
+        session_keys = (codes[valid] << 32) | epoch_hours(timestamps[valid])
+        if devices is not None:
+            devices = pd.Series(np.asarray(devices, dtype=object)[valid])
+            known = devices.notna().to_numpy()
+            self.devices.add(session_keys[known], hll.hash_values(devices[known].to_numpy()))
+
+        chunk_keys, chunk_counts = np.unique(session_keys, return_counts=True)
+        keys, inverse = np.unique(np.concatenate([self.keys, chunk_keys]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, chunk_counts]),
+                                  minlength=len(keys)).astype(np.int64)
+        self.keys = keys
+        self.sessions += int(valid.sum())
+        return int(valid.sum())
+
+    def consume(self, file_path, chunk_bytes=CHUNK_BYTES):
+        """
+        Count the lines appended to the log since the last consume (or since the checkpoint).
+
+        Yields:
+            int: Sessions counted per chunk, after the chunk is merged and the offset advanced.
+        """
+        columns = ['calledstationid', 'acctstarttime', 'callingstationid']
+        for frame, offset in read_log_chunks(file_path, self.offset, columns=columns, chunk_bytes=chunk_bytes):
+            counted = self.add(frame['calledstationid'].to_numpy(), frame['acctstarttime'].to_numpy(),
+                               frame['callingstationid'].to_numpy())
+            self.offset = offset
+            self.digest = tail_digest(file_path, offset)
+            yield counted
+
+    def to_frame(self):
+        """
+        Counts as calledstationid, date, hour_slice, number_of_sessions_per_hour and unique_devices
+        (HyperLogLog estimate) rows, ordered by hotspot, date and hour.
+        """
+        codes = self.keys >> 32
+        hours = self.keys & 0xFFFFFFFF
+        frame = pd.DataFrame({
+            'calledstationid': np.array(self.hotspots, dtype=object)[codes] if len(codes) else [],
+            'date': (hours // 24).astype('datetime64[D]').astype(str),
+            'hour_slice': HOUR_SLICE_LABELS[hours % 24],
+            'number_of_sessions_per_hour': self.counts,
+            'unique_devices': np.round(self.devices.estimate_keys(self.keys)).astype(np.int64),
+        })
+        return frame.sort_values(['calledstationid', 'date', 'hour_slice'], kind='stable').reset_index(drop=True)
+
+    def device_rollups(self, neighborhoods):
+        """
+        Distinct devices per hotspot and day, per neighborhood and hour or day, and city-wide per hour or day,
+        merged from the hotspot-hour sketches.
+
+        Parameters:
+            neighborhoods (dict): calledstationid -> neighborhood_name (hotspots not in it are left out
+                of the neighborhood rollups, but kept in the city-wide ones).
+
+        Returns:
+            pandas.DataFrame: level, area, date, hour_slice ('' for daily rows) and unique_devices rows.
+        """
+        neighborhood_names = sorted(set(neighborhoods.values()))
+        codes_by_name = {name: code for code, name in enumerate(neighborhood_names)}
+
+        # Area code of every hotspot code, with the area names, per rollup area
+        areas = {
+            'hotspot': (np.arange(len(self.hotspots), dtype=np.int64), self.hotspots),
+            'neighborhood': (
+                np.array([codes_by_name.get(neighborhoods.get(hotspot), -1) for hotspot in self.hotspots], dtype=np.int64),
+                neighborhood_names,
+            ),
+            'city': (np.zeros(len(self.hotspots), dtype=np.int64), [CITY]),
+        }
+
+        frames = []
+        for area, hourly in [('hotspot', False), ('neighborhood', True), ('neighborhood', False), ('city', True), ('city', False)]:
+            area_codes, area_names = areas[area]
+
+            def area_period(keys):
+                # Key of the (area, hour or day) a hotspot-hour rolls up to, -1 for hotspots without an area
+                hotspot_areas = area_codes[keys >> 32]
+                periods = keys & 0xFFFFFFFF if hourly else (keys & 0xFFFFFFFF) // 24
+                return np.where(hotspot_areas >= 0, (hotspot_areas << 32) | periods, -1)
+
+            keys, estimates = self.devices.rollup(area_period).estimate()
+            periods = keys & 0xFFFFFFFF
+            frames.append(pd.DataFrame({
+                'level': f"{area}_{'hour' if hourly else 'day'}",
+                'area': np.array(area_names, dtype=object)[keys >> 32],
+                'date': (periods // 24 if hourly else periods).astype('datetime64[D]').astype(str),
+                'hour_slice': HOUR_SLICE_LABELS[periods % 24] if hourly else '',
+                'unique_devices': np.round(estimates).astype(np.int64),
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def flush(self, file_path):
+        """
+        Write the current counts to a CSV, replacing the previous one atomically so readers
+        never see a partial file.
+        """
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        temporary_path = f"{file_path}.tmp"
+        self.to_frame().to_csv(temporary_path, index=False, encoding='utf-8')
+        os.replace(temporary_path, file_path)
+
+    def save_state(self, file_path):
+        dir_path = os.path.dirname(file_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        np.savez(
+            file_path,
+            hotspots=np.array(self.hotspots, dtype=str),
+            keys=self.keys,
+            counts=self.counts,
+            offset=np.array(self.offset),
+            digest=np.array(self.digest),
+            device_precision=np.array(self.devices.precision),
+            device_keys=self.devices.keys,
+            device_registers=self.devices.registers,
+            device_ranks=self.devices.ranks,
+        )
+
+    @classmethod
+    def load_state(cls, file_path, log_path, relative_error=hll.DEFAULT_RELATIVE_ERROR):
+        """
+        Resume from a checkpoint, or start over when there is none, when the log was not only appended
+        to since (rotated, truncated or rewritten) or when the sketches were built for another error bound.
+        """
+        precision = hll.precision_for_error(relative_error)
+        if not os.path.exists(file_path):
+            return cls(devices=hll.HyperLogLogSketches(precision))
+
+        with np.load(file_path, allow_pickle=False) as arrays:
+            offset = int(arrays['offset'])
+            digest = str(arrays['digest'])
+            if tail_digest(log_path, offset) != digest:
+                print(f"{log_path} changed before offset {offset}, recounting from the start")
+                return cls(devices=hll.HyperLogLogSketches(precision))
+            if 'device_precision' not in arrays or int(arrays['device_precision']) != precision:
+                print(f"Checkpoint has no device sketches of precision {precision}, recounting from the start")
+                return cls(devices=hll.HyperLogLogSketches(precision))
+            return cls(
+                hotspots=arrays['hotspots'].tolist(),
+                keys=arrays['keys'],
+                counts=arrays['counts'],
+                offset=offset,
+                digest=digest,
+                devices=hll.HyperLogLogSketches(
+                    precision, arrays['device_keys'], arrays['device_registers'], arrays['device_ranks']
+                ),
+            )
@@ -1,11 +1,14 @@
 import os
 import sys
+import time
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-# Enabling json utils
+# Enabling json utils and http client utils
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 import application.services.json_file_utils as jfs
+import application.services.http_client_utils as hcu
 
 # Your Google API Key
 API_KEY = '# Your Google API Key'
@@ -13,28 +16,87 @@ API_KEY = '# Your Google API Key'
 
 PORTO_CITY_MAIN_INSTITUTIONS = './datamesh/b_staging/datasets/porto_city_main_institutions.json'
 
+# On-disk cache of the Places API responses, so reruns only pay for new queries
+PLACES_CACHE_DIR = './datamesh/a_raw_data/cache/google_places'
+
 # Define the base URL for Google Places API
 PLACES_API_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 
+# Harvester settings
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 10
+REQUEST_TIMEOUT = 30  # seconds
+MAX_PAGES = 3  # Text Search returns at most 3 pages of 20 results
+NEXT_PAGE_TOKEN_DELAY = 2  # seconds before a next_page_token becomes valid
+NEXT_PAGE_TOKEN_ATTEMPTS = 3
+
 # List of locations for searching (e.g., Porto, Lisbon, etc.)
 locations = ["Paranhos, Porto","Bonfim, Porto","Porto, Portugal", "Ramalde, Porto, Portugal", "Boa Vista, Porto, Portugal", "Cedofeita, Porto, Portugal"," Matosinhos, Porto, Portugal"]
 
-# Function to fetch places by type (school, university, hospital) and location
-def fetch_places_by_type(query, location):
+# Function to fetch one results page from Google Places API
+def fetch_places_page(session, rate_limiter, search_query, page_token, base_url, next_page_delay):
+    params = {'pagetoken': page_token, 'key': API_KEY} if page_token else {'query': search_query, 'key': API_KEY}
+
+    for _ in range(NEXT_PAGE_TOKEN_ATTEMPTS if page_token else 1):
+        if page_token:
+            # A next_page_token is only valid a short time after it was issued
+            time.sleep(next_page_delay)
+
+        rate_limiter.wait()
+        try:
+            response = session.get(base_url, params=params, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            # The exception message carries the request URL (and API key), only report its type
+            print(f"Error fetching data for {search_query}: {type(e).__name__}")
+            return None
+
+        if response.status_code != 200:
+            print(f"Error fetching data for {search_query}: {response.status_code}")
+            return None
+
+        try:
+            data = response.json()
+        except ValueError:
+            print(f"Error fetching data for {search_query}: response is not JSON")
+            return None
+
+        if data.get('status') in ('OK', 'ZERO_RESULTS'):
+            return data
+        if data.get('status') != 'INVALID_REQUEST':
+            break
+
+    print(f"Error fetching data for {search_query}: {data.get('status')}")
+    return None
+
+# Function to fetch places by type (school, university, hospital) and location, following pagination
+def fetch_places_by_type(session, rate_limiter, cache, query, location,
+                         base_url=PLACES_API_URL, next_page_delay=NEXT_PAGE_TOKEN_DELAY):
     # Create the search query (type + city)
     search_query = f"{query} in {location}"
-    
-    # Prepare the request URL
-    url = f"{PLACES_API_URL}?query={search_query}&key={API_KEY}"
-    
-    # Send the GET request to Google Places API
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        return response.json()  # Return the JSON response if successful
-    else:
-        print(f"Error fetching data for {location}: {response.status_code}")
-        return None
+
+    # The whole page chain is cached per query: a next_page_token is only valid within the chain that
+    # issued it, so a later page can never be fetched on its own in another run
+    cache_key = f"{search_query}|pages"
+    pages = cache.get(cache_key)
+    if pages is None:
+        pages = []
+        page_token = None
+        for _ in range(MAX_PAGES):
+            place_data = fetch_places_page(session, rate_limiter, search_query, page_token, base_url, next_page_delay)
+            if not place_data:
+                # Keep the pages fetched so far for this run, the chain is fetched again next run
+                break
+
+            pages.append(place_data)
+
+            page_token = place_data.get("next_page_token")
+            if not page_token:
+                cache.set(cache_key, pages)
+                break
+        else:
+            cache.set(cache_key, pages)
+
+    return {"results": [place for place_data in pages for place in place_data.get("results", [])]}
 
 def load_json_files(file_path):
     # Load the JSON file
@@ -48,12 +110,14 @@ def extract_place_info(place_data, place_type, location):
     places_info = []
     
     for place in place_data.get("results", []):
+        place_id = place.get("place_id")
         name = place.get("name")
         address = place.get("formatted_address")
         lat = place["geometry"]["location"].get("lat")
         lng = place["geometry"]["location"].get("lng")
         
         places_info.append({
+            "place_id": place_id,
             "name": name,
             "address": address,
             "lat": lat,
@@ -65,23 +129,40 @@ def extract_place_info(place_data, place_type, location):
     return places_info
 
 # Function to fetch and process multiple types (school, university, hospital) across multiple locations
-def fetch_all_places():
+def fetch_all_places(base_url=PLACES_API_URL, cache_dir=PLACES_CACHE_DIR, max_workers=MAX_WORKERS,
+                     requests_per_second=REQUESTS_PER_SECOND, next_page_delay=NEXT_PAGE_TOKEN_DELAY):
     types = [
         "primary school", "university", "hospital", "school", 
         "public office", "shopping mall", "tourist attraction", "park", "community garden", "subway station", "train station"
     ]
+
+    session = hcu.create_session(pool_size=max_workers)
+    rate_limiter = hcu.RateLimiter(requests_per_second)
+    cache = hcu.ResponseCache(cache_dir)
+
+    # Every location x type query, fetched concurrently
+    queries = [(place_type, location) for location in locations for place_type in types]
+
+    def fetch(query):
+        place_type, location = query
+        print(f"Fetching {place_type}s in {location}...")
+        return fetch_places_by_type(session, rate_limiter, cache, place_type, location, base_url, next_page_delay)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(fetch, queries))
+
     all_places = []
-    
-    # Iterate through each location
-    for location in locations:
-        for place_type in types:
-            print(f"Fetching {place_type}s in {location}...")
-            place_data = fetch_places_by_type(place_type, location)
-            
-            if place_data:
-                places_info = extract_place_info(place_data, place_type, location)
-                all_places.extend(places_info)  # Add all places to the final list
-    
+    seen_places = set()
+
+    # Keep the query order and drop places already found for the same type in an overlapping location
+    for (place_type, location), place_data in zip(queries, responses):
+        for place_info in extract_place_info(place_data, place_type, location):
+            place_key = (place_info["place_id"], place_type)
+            if place_info["place_id"] is not None and place_key in seen_places:
+                continue
+            seen_places.add(place_key)
+            all_places.append(place_info)  # Add the place to the final list
+
     return all_places
 
 def main():
@@ -1,27 +1,20 @@
+import os
+import sys
 import pandas as pd
-import requests
 import json
 
+# Enabling geocoding service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.geocoding_service as geo
+
 RAW_DATA_PORTO_DIGITAL_WIFI_HOTSPOTS = './datamesh/a_raw_data/datasets/hackacity/aps_hackacity.csv'
 
+# Persistent reverse-geocoding cache, so refreshes only pay for new coordinates
+GEOCODING_CACHE = './datamesh/a_raw_data/cache/geocoding.sqlite'
+
 # Your Google API Key
 API_KEY = '# Your Google API Key'
 
-# Function to get address from latitude and longitude using Google Geocoding API
-def get_address_from_latlon(lat, lon):
-    geocode_url = f'https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lon}&key={API_KEY}'
-    response = requests.get(geocode_url)
-    
-    if response.status_code == 200:
-        result = response.json()
-        if result['status'] == 'OK':
-            return result['results'][0]['formatted_address']
-        else:
-            return None  # If no result found
-    else:
-        print(f"Error with Geocoding API: {response.status_code}")
-        return None
-
 # Load the CSV into a pandas DataFrame
 file_path = RAW_DATA_PORTO_DIGITAL_WIFI_HOTSPOTS
 
@@ -47,14 +40,9 @@ if __name__ == "__main__":
     # Rename 'Latitude' and 'Longitude' columns to 'lat' and 'lon'
     df_cleaned = df_cleaned.rename(columns={'Latitude': 'lat', 'Longitude': 'lon'})
 
-    # Add address to the DataFrame
-    addresses = []
-    for index, row in df_cleaned.iterrows():
-        lat, lon = row['lat'], row['lon']
-        address = get_address_from_latlon(lat, lon)
-        addresses.append(address if address else "Address not found")
-    
-    df_cleaned['address'] = addresses
+    # Add address to the DataFrame (cached coordinates are not requested again)
+    addresses = geo.reverse_geocode(list(zip(df_cleaned['lat'], df_cleaned['lon'])), API_KEY, GEOCODING_CACHE)
+    df_cleaned['address'] = [address if address else "Address not found" for address in addresses]
 
     # Select and reorder the desired columns
     df_cleaned = df_cleaned[['MAC_ADDRESS', 'lat', 'lon', 'address', 'Hotspot', 'Zone', 'Parish']]
@@ -1,38 +1,20 @@
-import csv
 import os
 import sys
-import pandas as pd
 import json
+import pandas as pd
 
-# Enabling json utils
+# Enabling json utils and shape store
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 import application.services.json_file_utils as jfs
+import application.services.polyline_service as ps
+from application.services.shape_store import ShapeStore
 
 STCP_ROUTES = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/routes.csv'
 STCP_TRIPS = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/trips.csv'
 STCP_SHAPE = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/shapes.csv'
 
-# Function to read the CSV data and organize by shape_id
-def read_shape_csv(csv_file):
-    shape_data = {}
-    # Open and read the CSV file
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            shape_id = row['shape_id']
-            # If shape_id is not in the dictionary, initialize an empty list
-            if shape_id not in shape_data:
-                shape_data[shape_id] = []
-            # Append the coordinates to the list for this shape_id
-            shape_data[shape_id].append({
-                "shape_pt_lat": float(row['shape_pt_lat']),
-                "shape_pt_lon": float(row['shape_pt_lon']),
-                "shape_pt_sequence": int(row['shape_pt_sequence'])
-            })
-    return shape_data
-
-# Read CSV data into a dictionary
-shape_data = read_shape_csv(STCP_SHAPE)
+# Read the shapes into contiguous arrays, sorted by shape_id and shape_pt_sequence
+shape_store = ShapeStore.from_csv(STCP_SHAPE)
 
 # Step 1: Read the CSV data into pandas DataFrames
 routes_df = pd.read_csv(STCP_ROUTES, encoding='utf-8')
@@ -60,7 +42,7 @@ for route_id, group in merged_df.groupby(['route_id', 'route_long_name']):
     routes_list.append(route_info)
 
 # Function to remove 'trip_id', deduplicate trips, and append coordinates from CSV
-def remove_trip_id_and_extract_shape_ids(data, shape_data):
+def remove_trip_id_and_extract_shape_ids(data, shape_store):
     for route in data:
         # Create a set to hold unique shape_ids
         unique_shape_ids = set()
@@ -90,7 +72,7 @@ def remove_trip_id_and_extract_shape_ids(data, shape_data):
         route['unique_shape_ids'] = []
 
         # Add the coordinates from the CSV to each unique_shape_id
-        for unique_shape_id in unique_shape_ids:
+        for unique_shape_id in sorted(unique_shape_ids):
             shape_info = {"shape_id": unique_shape_id}
 
             # Determine trip direction based on shape_id
@@ -101,8 +83,7 @@ def remove_trip_id_and_extract_shape_ids(data, shape_data):
             else:
                 shape_info['trip_direction'] = 'UNKNOWN'
 
-            if unique_shape_id in shape_data:
-                shape_info['coordinates'] = shape_data[unique_shape_id]
+            if unique_shape_id in shape_store:
                 route['unique_shape_ids'].append(shape_info)
         
         del route['trips']  # Remove trips section as requested
@@ -110,35 +91,77 @@ def remove_trip_id_and_extract_shape_ids(data, shape_data):
     return data
 
 # Apply the function to the data
-cleaned_data = remove_trip_id_and_extract_shape_ids(routes_list, shape_data)
+cleaned_data = remove_trip_id_and_extract_shape_ids(routes_list, shape_store)
 
 OUTPUT_PATH = './datamesh/b_staging/datasets/stcp_routes_shapes.json'
 
-# Loop through each route_data and modify the unique_shape_ids
+# Per route size report of the simplified polylines
+reduction_rows = []
+
+# Loop through each route_data and add the shape geometry from the shape store
 for route in cleaned_data:
+    route_points = 0
+    route_bytes = 0
+    simplified_points = dict.fromkeys(ps.ZOOM_LEVELS, 0)
+    simplified_bytes = dict.fromkeys(ps.ZOOM_LEVELS, 0)
+
     for shape in route["unique_shape_ids"]:
-        # Sort coordinates by shape_pt_sequence
-        sorted_coordinates = sorted(shape["coordinates"], key=lambda x: x["shape_pt_sequence"])
+        shape_id = shape["shape_id"]
+        coordinates = shape_store.coordinates(shape_id)
 
-        # Extract the first and last coordinates
-        first_coord = sorted_coordinates[0]  # First coordinate (smallest sequence)
-        last_coord = sorted_coordinates[-1]  # Last coordinate (largest sequence)
+        # Points ordered by shape_pt_sequence, serialized straight from the arrays
+        shape["coordinates"] = [
+            {"shape_pt_lat": lat, "shape_pt_lon": lon, "shape_pt_sequence": sequence}
+            for (lat, lon), sequence in zip(
+                shape_store.coordinates(shape_id).tolist(),
+                shape_store.point_sequences(shape_id).tolist()
+            )
+        ]
+
+        # Extract the first and last coordinates (smallest and largest sequence)
+        first_coord, last_coord = shape_store.endpoints(shape_id)
 
         # Add first_coordinates and last_coordinates fields
         shape["first_coordinates"] = {
-            "shape_pt_lat": first_coord["shape_pt_lat"],
-            "shape_pt_lon": first_coord["shape_pt_lon"]
+            "shape_pt_lat": float(first_coord[0]),
+            "shape_pt_lon": float(first_coord[1])
         }
         shape["last_coordinates"] = {
-            "shape_pt_lat": last_coord["shape_pt_lat"],
-            "shape_pt_lon": last_coord["shape_pt_lon"]
+            "shape_pt_lat": float(last_coord[0]),
+            "shape_pt_lon": float(last_coord[1])
         }
 
-output_json = json.dumps(cleaned_data, indent=4, ensure_ascii=False)
-
-# Print or save the JSON output
-print(output_json)
-
-# Optionally, save the output to a file
-with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-    f.write(output_json)
+        # Full resolution and per zoom level Douglas-Peucker simplified geometry, as Google encoded polylines
+        shape["encoded_polyline"] = ps.encode_polyline(coordinates)
+        shape["simplified_polylines"] = {}
+        for zoom in ps.ZOOM_LEVELS:
+            simplified = shape_store.simplified(shape_id, ps.tolerance_for_zoom(zoom))
+            shape["simplified_polylines"][str(zoom)] = ps.encode_polyline(simplified)
+            simplified_points[zoom] += len(simplified)
+            simplified_bytes[zoom] += len(shape["simplified_polylines"][str(zoom)])
+
+        route_points += len(coordinates)
+        route_bytes += len(json.dumps(coordinates.tolist()))
+
+    reduction_rows.append({
+        "route_id": route["route_id"],
+        "points": route_points,
+        "coordinates_bytes": route_bytes,
+        **{f"points_z{zoom}": simplified_points[zoom] for zoom in ps.ZOOM_LEVELS},
+        **{f"polyline_bytes_z{zoom}": simplified_bytes[zoom] for zoom in ps.ZOOM_LEVELS},
+    })
+
+reduction_df = pd.DataFrame(reduction_rows)
+print("Polyline reduction per route (raw [lat, lon] JSON vs encoded simplified polyline):")
+print(reduction_df.to_string(index=False))
+totals = reduction_df.drop(columns="route_id").sum()
+for zoom in ps.ZOOM_LEVELS:
+    print(
+        f"Zoom {zoom}: {totals[f'points_z{zoom}']}/{totals['points']} points "
+        f"({totals[f'points_z{zoom}'] / totals['points']:.1%}), "
+        f"{totals[f'polyline_bytes_z{zoom}']}/{totals['coordinates_bytes']} bytes "
+        f"({totals[f'polyline_bytes_z{zoom}'] / totals['coordinates_bytes']:.1%})"
+    )
+
+# Save the output to a file
+jfs.save_to_file(cleaned_data, OUTPUT_PATH)
@@ -7,6 +7,7 @@ import json
 # Enabling json utils
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 import application.services.json_file_utils as jfs
+import application.services.parquet_file_utils as pfu
 
 STCP_ROUTES = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/routes.csv'
 STCP_TRIPS = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/trips.csv'
@@ -14,24 +15,38 @@ STCP_STOPS = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp
 STCP_STOP_TIMES = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/stop_times.csv'
 STCP_SHAPE = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp/shapes.csv'
 
-# Load the first CSV
-trips_df = pd.read_csv(STCP_TRIPS)
+# Keep ids and GTFS times as text when parsing the CSVs
+STRING_DTYPES = pfu.string_dtypes(pfu.STCP_ROUTES_SPATIO_TEMPORAL_SCHEMA)
 
-# Load the second CSV
-stop_times_df = pd.read_csv(STCP_STOP_TIMES)
+# Number of stop_times rows denormalized at a time
+STOP_TIMES_CHUNK_SIZE = 500_000
 
-# Load the third CSV
-stops_df = pd.read_csv(STCP_STOPS)
+OUTPUT_PARQUET = './datamesh/b_staging/datasets/stcp_routes_spatio_temporal.parquet'
 
+# Load a GTFS dimension table (trips, stops) indexed by its key
+def load_dimension(csv_file, key):
+    return pd.read_csv(csv_file, dtype=STRING_DTYPES).set_index(key)
 
-# Perform the join using trip_id as the key
-denormalized_df = pd.merge(trips_df, stop_times_df, on='trip_id', how='inner')
+# Stream stop_times in chunks and join each chunk against the indexed trips and stops
+def denormalize_stop_times(stop_times_file, trips_df, stops_df, chunksize=STOP_TIMES_CHUNK_SIZE):
+    for stop_times_chunk in pd.read_csv(stop_times_file, dtype=STRING_DTYPES, chunksize=chunksize):
+        # Perform the join using trip_id as the key
+        denormalized_chunk = stop_times_chunk.join(trips_df, on='trip_id', how='inner')
 
-# Step 2: Join the resulting table with stops on stop_id
-final_denormalized_df = pd.merge(denormalized_df, stops_df, on='stop_id', how='inner')
+        # Join the resulting rows with stops on stop_id
+        yield denormalized_chunk.join(stops_df, on='stop_id', how='inner')
 
-OUTPUT_CSV = './datamesh/b_staging/datasets/stcp_routes_spatio_temporal.csv'
-# Save the denormalized table to a new CSV
-final_denormalized_df.to_csv(OUTPUT_CSV, index=False, encoding='utf-8')
+# Load the trips and stops dimension tables (small, kept in memory)
+trips_df = load_dimension(STCP_TRIPS, 'trip_id')
+stops_df = load_dimension(STCP_STOPS, 'stop_id')
 
-print(f"Denormalized table created successfully and saved as {OUTPUT_CSV}")
+# Save the denormalized table chunk by chunk as a Parquet dataset partitioned by service_id,
+# so peak memory stays bounded by the chunk size regardless of the feed size
+pfu.save_chunks_to_parquet(
+    denormalize_stop_times(STCP_STOP_TIMES, trips_df, stops_df),
+    OUTPUT_PARQUET,
+    pfu.STCP_ROUTES_SPATIO_TEMPORAL_SCHEMA,
+    partition_cols=pfu.SERVICE_PARTITION
+)
+
+print(f"Denormalized table created successfully and saved as {OUTPUT_PARQUET}")
@@ -6,8 +6,14 @@ import pandas as pd
 # Enabling json utils
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 import application.services.json_file_utils as jfs
+import application.services.polyline_service as ps
 
-STCP_STAGING = './datamesh/b_staging/datasets/stcp_routes.json'
+STCP_STAGING = './datamesh/b_staging/datasets/stcp_routes_shapes.json'
+
+MAP_ZOOM = 15
+
+# Finest simplification level that is still invisible at the map zoom
+POLYLINE_ZOOM = str(min(zoom for zoom in ps.ZOOM_LEVELS if zoom >= MAP_ZOOM))
 
 # Load the data from JSON
 route_data = jfs.load_json_files(STCP_STAGING)
@@ -26,7 +32,7 @@ map_center = [41.140801, -8.615485]  # Starting coordinates
 stadia_tiles = "https://tiles.stadiamaps.com/tiles/alidade_smooth/{z}/{x}/{y}.png?api_key=3efbf953-e729-4e4a-a46a-90a29827fa12"
 # Add attribution for Stadia Maps
 stadia_attr = "Map tiles by Stadia Maps, © OpenMapTiles © OpenStreetMap contributors"
-mymap = folium.Map(location=map_center, zoom_start=15, tiles=stadia_tiles, attr=stadia_attr)
+mymap = folium.Map(location=map_center, zoom_start=MAP_ZOOM, tiles=stadia_tiles, attr=stadia_attr)
 
 # List of colors to assign to each route (you can extend this list)
 colors = ['blue', 'green', 'red', 'purple', 'orange', 'darkblue', 'darkgreen', 'cadetblue']
@@ -34,16 +40,21 @@ colors = ['blue', 'green', 'red', 'purple', 'orange', 'darkblue', 'darkgreen', '
 # Create a dictionary to store feature groups for each route_id
 route_feature_groups = {}
 
+# Number of raw and drawn points
+raw_points = 0
+drawn_points = 0
+
 # Add markers and polyline for each shape in the filtered routes
 for i, (_, route) in enumerate(routes_df.iterrows()):
     shape_id = route['shape_id']
-    coordinates = route['coordinates']
     
     # Assign a color to each route based on the index
     route_color = colors[i % len(colors)]
     
-    # Create a list of coordinates for plotting
-    shape_coords = [(coord['shape_pt_lat'], coord['shape_pt_lon']) for coord in coordinates]
+    # Simplified polyline for the map zoom instead of every raw shape point
+    shape_coords = ps.decode_polyline(route[f'simplified_polylines.{POLYLINE_ZOOM}']).tolist()
+    raw_points += len(route['coordinates'])
+    drawn_points += len(shape_coords)
     
     # Create a FeatureGroup for each route_id if it doesn't exist
     route_id = route['route_id']
@@ -54,12 +65,12 @@ for i, (_, route) in enumerate(routes_df.iterrows()):
     folium.PolyLine(shape_coords, color=route_color, weight=2.5, opacity=1, tooltip=route["route_long_name"]).add_to(route_feature_groups[route_id])
     
     # Add a marker at the beginning of the route (first coordinate)
-    first_coord = shape_coords[0]
+    first_coord = [route['first_coordinates.shape_pt_lat'], route['first_coordinates.shape_pt_lon']]
     popup_start = folium.Popup(f"""Start route {route['route_id']} | {route['route_long_name']}""", max_width=500)
     folium.Marker(location=first_coord, popup=popup_start, icon=folium.Icon(color=route_color, icon='info-sign')).add_to(route_feature_groups[route_id])
     
     # Add a marker at the end of the route (last coordinate)
-    last_coord = shape_coords[-1]
+    last_coord = [route['last_coordinates.shape_pt_lat'], route['last_coordinates.shape_pt_lon']]
     popup_end = folium.Popup(f"""End route {route['route_id']} | {route['route_long_name']}""", max_width=500)
     folium.Marker(location=last_coord, popup=popup_end, icon=folium.Icon(color=route_color, icon='info-sign')).add_to(route_feature_groups[route_id])
 
@@ -70,6 +81,9 @@ for feature_group in route_feature_groups.values():
 # Add LayerControl to allow users to toggle between different routes
 layer_control = folium.LayerControl().add_to(mymap)
 
+if raw_points:
+    print(f"Drawing {drawn_points}/{raw_points} shape points ({drawn_points / raw_points:.1%}) at zoom {POLYLINE_ZOOM} simplification")
+
 
 
 
@@ -1,78 +1,68 @@
+import argparse
+import os
+import sys
+import time
 import joblib
 import pandas as pd
 
-pd.set_option('display.max_rows', None)
-pd.set_option('display.max_columns', None)
+# Enabling trip cube and mobility inference service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.mobility_inference_service as mis
+from application.services.lean_predictor import LeanPredictor, preferred_model_path
+from application.services.trip_cube import TripCube
 
-TRIP_COUNT = "./datamesh/c_features/datasets/sctp_bus_stops_trips_hourly.csv"
+TRIP_CUBE = "./datamesh/c_features/datasets/sctp_bus_stops_trips_cube.npz"
 STCP_STOPS = "./datamesh/c_features/datasets/stcp_stops_nearby_poi.json"
 MODEL_PATH = "./datamesh/d_ml_inference/models/mobility_regressor.joblib"
+LEAN_MODEL_PATH = "./datamesh/d_ml_inference/models/mobility_regressor_lean.json"
 OUTPUT_PATH = "./datamesh/c_features/datasets/mobility_regression_inference.csv"
 
-# load data
-trip_count = pd.read_csv(TRIP_COUNT)
-stcp_stops = pd.read_json(STCP_STOPS)
+# Stop x service x hour feature rows, rebuilt only when the cube or the stops change
+FEATURE_CACHE = "./datamesh/c_features/datasets/mobility_inference_features.npz"
 
-# merge trip count with stcp stop geospatial data
-merged = pd.merge(trip_count, stcp_stops, left_on=['stop_lat', 'stop_lon'], right_on=['lat', 'lon'], how='left')
 
-# create inference dataset
-dates = pd.date_range(start='2024-11-01', end='2024-11-30', freq='D')
-df = pd.DataFrame({'date': dates})
-df['day_of_month'] = df['date'].dt.day
-df['day_of_week'] = df['date'].dt.dayofweek
-df["day_of_week_category"] = df["day_of_week"].apply(lambda x: 'SAB' if x == 5 else 'DOM' if x == 6 else 'UTEIS')
-final_dataset = pd.merge(df, merged, left_on="day_of_week_category", right_on="service_id", how='inner')
+def load_model():
+    # fast path: the lean predictor exported by modeling.py, same predictions without the sklearn pipeline
+    model_path = preferred_model_path(LEAN_MODEL_PATH, MODEL_PATH)
+    return LeanPredictor.load(model_path) if model_path == LEAN_MODEL_PATH else joblib.load(model_path)
 
-final_dataset_cp = final_dataset.copy()  # for later use
 
-# match inference schema with training schema
+def main(start, end):
+    # stop x service x hour features, built once and cached as typed arrays
+    features = mis.cached_stop_hour_features(
+        trip_counts_loader=lambda: TripCube.load(TRIP_CUBE).to_frame(),
+        stops_loader=lambda: pd.read_json(STCP_STOPS, dtype={'stop_id': str}),
+        input_paths=[TRIP_CUBE, STCP_STOPS],
+        cache_path=FEATURE_CACHE
+    )
 
-# feature engineering
-final_dataset["total_pois"] = (
-    final_dataset["number_of_nearby_schools"] +
-    final_dataset["number_of_nearby_hospitals"] +
-    final_dataset["number_of_nearby_universitys"] +
-    final_dataset["number_of_nearby_public_offices"] +
-    final_dataset["number_of_nearby_tourist_attractions"] +
-    final_dataset["number_of_nearby_train_stations"] +
-    final_dataset["number_of_nearby_subway_stations"]
-)
+    # inference over the dates, predicting each distinct feature row once
+    calendar = mis.build_calendar(start, end)
+    model = load_model()
+    inference_start = time.perf_counter()
+    rows, y_pred, predicted_rows = mis.predict_calendar(model, features, calendar)
+    print(f"Predicted {predicted_rows} distinct rows for {len(rows)} (date, stop, hour) rows "
+          f"({len(rows) / max(predicted_rows, 1):.1f}x fewer) in {time.perf_counter() - inference_start:.2f}s")
 
-# drop columns
-final_dataset.drop(
-    columns=[
-        "date",
-        "day_of_week_category",
-        "stop_id_x",
-        "stop_id_y",
-        "stop_name_x",
-        "stop_name_y",
-        "service_id",
-        "stop_lat",
-        "stop_lon",
-        "neighborhood_name",
-        "distinct_trip_count"
-    ],
-    inplace=True
-)
+    # normalize mobility score between 0 and 100
+    mobility_score = (y_pred - y_pred.min()) / (y_pred.max() - y_pred.min()) * 100
 
-# rename columns
-final_dataset.rename(columns={"hourly_slice": "hour_slice"}, inplace=True)
-final_dataset["hour_slice"] = final_dataset["hour_slice"].apply(lambda x: x.replace("-", "–"))
+    # transform and save
+    final_transformed = pd.concat([
+        features.iloc[rows["feature_index"]][["stop_id", "neighborhood_name", "lat", "lon"]].reset_index(drop=True),
+        calendar.iloc[rows["calendar_index"]][["date", "day_of_week_category"]].reset_index(drop=True),
+        features.iloc[rows["feature_index"]][["hourly_slice"]].reset_index(drop=True),
+    ], axis=1)
+    final_transformed["mobility_score"] = mobility_score.round().astype(int)
+    final_transformed["distinct_trip_count"] = features["distinct_trip_count"].to_numpy()[rows["feature_index"]]
+    final_transformed.to_csv(OUTPUT_PATH, index=False)
+    print(f"Saved {len(final_transformed)} predictions to {OUTPUT_PATH}")
 
-# inference
-model = joblib.load(MODEL_PATH)
-y_pred = model.predict(final_dataset)
-final_dataset_cp["mobility_score"] = y_pred
 
-# normalize mobility score between 0 and 100 
-final_dataset_cp["mobility_score"] = (final_dataset_cp["mobility_score"] - final_dataset_cp["mobility_score"].min()) / (final_dataset_cp["mobility_score"].max() - final_dataset_cp["mobility_score"].min()) * 100
-final_dataset_cp["mobility_score"] = final_dataset_cp["mobility_score"].round()
-final_dataset_cp["mobility_score"] = final_dataset_cp["mobility_score"].astype(int)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mobility score inference per bus stop, date and hour")
+    parser.add_argument('--start', default='2024-11-01', help="First date to predict")
+    parser.add_argument('--end', default='2024-11-30', help="Last date to predict")
+    args = parser.parse_args()
 
-# transform and save
-final_transformed = final_dataset_cp[["stop_id_x", "neighborhood_name", "lat", "lon", "date", "day_of_week_category", "hourly_slice", "mobility_score", "distinct_trip_count"]]
-final_transformed = final_transformed[final_transformed["stop_id_x"] != "."]
-final_transformed.rename(columns={"stop_id_x": "stop_id"}, inplace=True)
-final_transformed.to_csv(OUTPUT_PATH, index=False)
+    main(args.start, args.end)
@@ -3,25 +3,18 @@ import sys
 from folium import Polygon
 import requests
 import json
-from shapely import Point
 from shapely.geometry import Polygon as ShapelyPolygon
 
 # Enabling json utils
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 import application.services.json_file_utils as jfs
+import application.services.neighborhood_service as nbs
 
 # File paths
 GEO_API_NEIGHBORHOODS_INHABITANTS = './datamesh/a_raw_data/datasets/geoapi.pt/geo_api_neighborhoods_inhabitants.json'
 GEO_API_NEIGHBORHOODS_POLYGON_COORDINATES = './datamesh/a_raw_data/datasets/geoapi.pt/geo_api_neighborhoods_polygon.json'
 PORTO_WIFI_DATAPOINTS = './datamesh/b_staging/datasets/porto_digital_wifi_hotspots.json'
 
-# Function to check if a point is inside the neighborhood polygon
-def is_point_in_polygon(lat, lon, polygon_coords):
-    # Create a shapely polygon and point
-    polygon = ShapelyPolygon(polygon_coords)
-    point = Point(lon, lat)  # Shapely uses (longitude, latitude)
-    return point.within(polygon)
-
 wifi_data_points = jfs.load_json_files(PORTO_WIFI_DATAPOINTS)
 
 # Sample first JSON (your initial data with neighborhoods and inhabitants)
@@ -49,15 +42,18 @@ for neighborhood in neighborhoods_data:
         neighborhood['number_of_wifi_hotspots'] = 0  # Initialize the field to 0
 
 # Step 3: Count how many wifi data points are inside each neighborhood polygon
-for point in wifi_data_points:
-    lat = point['lat']
-    lon = point['lon']
-    
-    # Check each neighborhood's polygon and increment count if the point is inside
-    for neighborhood in neighborhoods_data:
-        if 'coordinates' in neighborhood:
-            if is_point_in_polygon(lat, lon, freguesia_to_coordinates[neighborhood['neighborhood_name']]):
-                neighborhood['number_of_wifi_hotspots'] += 1
+enriched_neighborhoods = [neighborhood for neighborhood in neighborhoods_data if 'coordinates' in neighborhood]
+neighborhood_polygons = [
+    ShapelyPolygon(freguesia_to_coordinates[neighborhood['neighborhood_name']])
+    for neighborhood in enriched_neighborhoods
+]
+wifi_counts = nbs.count_points_in_polygons(
+    [point['lat'] for point in wifi_data_points],
+    [point['lon'] for point in wifi_data_points],
+    neighborhood_polygons
+)
+for neighborhood, count in zip(enriched_neighborhoods, wifi_counts):
+    neighborhood['number_of_wifi_hotspots'] = int(count)
 
 # Save the enriched data to a new JSON file (optional)
 ENRICHED_GEO_API_NEIGHBORHOODS = './datamesh/c_features/datasets/porto_neighborhoods.json'
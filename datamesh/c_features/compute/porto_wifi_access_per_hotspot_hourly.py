@@ -1,27 +1,88 @@
+import argparse
+import json
 import os
 import sys
+import time
 import pandas as pd
 
+# Enabling wifi session aggregator, HyperLogLog sketches and neighborhood service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.wifi_session_aggregator as wsa
+import application.services.hyperloglog as hll
+import application.services.neighborhood_service as nbs
+
 # Input CSV file
 PORTO_NETWORK_ACTIVITY = "./datamesh/b_staging/datasets/porto_wifi_hotspots_network_activity.csv"
 
-# Load the CSV data into a DataFrame
-csv_df = pd.read_csv(PORTO_NETWORK_ACTIVITY, encoding='utf-8')
+# Hotspot locations and neighborhood polygons, for the neighborhood rollups
+PORTO_WIFI_HOTSPOTS = "./datamesh/b_staging/datasets/porto_digital_wifi_hotspots.json"
+PORTO_NEIGHBORHOODS = "./datamesh/c_features/datasets/porto_neighborhoods.json"
+
+# Output CSV files
+PORTO_WIFI_ACCESS_HOURLY = "./datamesh/c_features/datasets/porto_wifi_access_per_hotspot_hourly.csv"
+PORTO_WIFI_UNIQUE_DEVICES = "./datamesh/c_features/datasets/porto_wifi_unique_devices_rollups.csv"
+
+# Running counts and the log offset they cover, so reruns on an appended log only read the new lines
+AGGREGATOR_STATE = "./datamesh/c_features/cache/porto_wifi_access_per_hotspot_hourly_state.npz"
+
+
+def hotspot_neighborhoods(hotspots):
+    """
+    Neighborhood of every calledstationid ('AA-BB-CC-DD-EE-FF:SSID'), through the hotspot MAC address and location.
+    """
+    with open(PORTO_WIFI_HOTSPOTS, 'r', encoding='utf-8') as f:
+        locations = pd.DataFrame(json.load(f))
+    with open(PORTO_NEIGHBORHOODS, 'r', encoding='utf-8') as f:
+        names, polygons = nbs.neighborhood_polygons(json.load(f))
+
+    locations['neighborhood_name'] = nbs.assign_neighborhoods(locations['lat'], locations['lon'], names, polygons)
+    by_mac = dict(zip(locations['MAC_ADDRESS'].str.lower(), locations['neighborhood_name']))
+    macs = [str(hotspot).split(':')[0].strip().lower() for hotspot in hotspots]
+    return {hotspot: by_mac[mac] for hotspot, mac in zip(hotspots, macs) if mac in by_mac}
+
+
+def flush_device_rollups(counter):
+    # Daily, neighborhood and city distinct devices, merged from the hotspot-hour sketches
+    rollups = counter.device_rollups(hotspot_neighborhoods(counter.hotspots))
+    rollups.to_csv(PORTO_WIFI_UNIQUE_DEVICES, index=False, encoding='utf-8')
+
+
+def main(follow, interval, chunk_mb, reset, error):
+    if reset:
+        counter = wsa.HourlySessionCounter(devices=hll.HyperLogLogSketches.for_error(error))
+    else:
+        counter = wsa.HourlySessionCounter.load_state(AGGREGATOR_STATE, PORTO_NETWORK_ACTIVITY, relative_error=error)
+    print(f"Distinct devices estimated with 2^{counter.devices.precision} register HyperLogLog sketches "
+          f"(standard error {hll.standard_error(counter.devices.precision):.2%})")
+    if counter.offset:
+        print(f"Resuming from byte {counter.offset} ({counter.sessions} sessions already counted)")
+
+    while True:
+        # Count the sessions logged since the last pass, a bounded chunk at a time
+        counted = sum(counter.consume(PORTO_NETWORK_ACTIVITY, chunk_bytes=chunk_mb * 1024 * 1024))
+
+        if counted or not follow:
+            # Flush the updated counts and checkpoint them with the offset they cover
+            counter.flush(PORTO_WIFI_ACCESS_HOURLY)
+            flush_device_rollups(counter)
+            counter.save_state(AGGREGATOR_STATE)
+            print(f"Counted {counted} new sessions ({counter.sessions} total, {len(counter.keys)} hotspot-hours)")
 
-# Parse the acctstarttime to extract date and hour_slice
-csv_df['acctstarttime'] = pd.to_datetime(csv_df['acctstarttime'])
-csv_df['date'] = csv_df['acctstarttime'].dt.date
+        if not follow:
+            break
+        time.sleep(interval)
 
-# Generate the hour_slice in HH:00–HH:59 format
-csv_df['hour_slice'] = csv_df['acctstarttime'].dt.hour.apply(
-    lambda h: f"{h:02d}:00–{h:02d}:59"
-)
+    # Show a preview of the result
+    print(counter.to_frame().head())
 
-# Group by calledstationid, date, and hour_slice and count the number of sessions in each group
-aggregated_df = csv_df.groupby(['calledstationid', 'date', 'hour_slice']).size().reset_index(name='number_of_sessions_per_hour')
 
-# Save the final DataFrame to a CSV file
-aggregated_df.to_csv('./datamesh/c_features/datasets/porto_wifi_access_per_hotspot_hourly.csv', index=False, encoding='utf-8')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hourly wifi sessions per hotspot, streamed from the RADIUS accounting log")
+    parser.add_argument('--follow', action='store_true', help="Keep tailing the log and flush the counts as sessions are appended")
+    parser.add_argument('--interval', type=float, default=60, help="Seconds between two passes over the log when following")
+    parser.add_argument('--chunk-mb', type=int, default=wsa.CHUNK_BYTES // (1024 * 1024), help="Megabytes of log parsed at once")
+    parser.add_argument('--reset', action='store_true', help="Ignore the checkpoint and recount the whole log")
+    parser.add_argument('--error', type=float, default=hll.DEFAULT_RELATIVE_ERROR, help="Standard error of the distinct device estimates")
+    args = parser.parse_args()
 
-# Show a preview of the result
-print(aggregated_df.head())
+    main(args.follow, args.interval, args.chunk_mb, args.reset, args.error)
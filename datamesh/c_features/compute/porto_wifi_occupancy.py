@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+
+# Enabling wifi occupancy service and parquet utils
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.wifi_occupancy_service as wos
+import application.services.wifi_session_aggregator as wsa
+import application.services.parquet_file_utils as pfu
+
+# Input CSV file
+PORTO_NETWORK_ACTIVITY = "./datamesh/b_staging/datasets/porto_wifi_hotspots_network_activity.csv"
+
+# Output Parquet files
+OCCUPANCY_PER_MINUTE = "./datamesh/c_features/datasets/porto_wifi_occupancy_per_hotspot_minute.parquet"
+OCCUPANCY_HOURLY = "./datamesh/c_features/datasets/porto_wifi_occupancy_per_hotspot_hourly.parquet"
+
+
+def with_hour_slice(frames):
+    # Date and hour_slice columns, to join with porto_wifi_access_per_hotspot_hourly
+    for frame in frames:
+        frame['date'] = frame['bin_start'].dt.strftime('%Y-%m-%d')
+        frame['hour_slice'] = wsa.HOUR_SLICE_LABELS[frame['bin_start'].dt.hour.to_numpy()]
+        yield frame
+
+
+# Load the session intervals (start + duration) of every hotspot
+start = time.perf_counter()
+hotspots, sessions = wos.load_sessions(PORTO_NETWORK_ACTIVITY)
+print(f"Loaded {len(sessions['start'])} sessions of {len(hotspots)} hotspots in {time.perf_counter() - start:.1f}s")
+
+# Concurrent sessions, connected minutes and unique devices per hotspot and minute, then per hotspot and hour
+start = time.perf_counter()
+pfu.save_chunks_to_parquet(
+    wos.occupancy_batches(hotspots, sessions, wos.BIN_SECONDS['minute']),
+    OCCUPANCY_PER_MINUTE,
+    pfu.PORTO_WIFI_OCCUPANCY_SCHEMA
+)
+pfu.save_chunks_to_parquet(
+    with_hour_slice(wos.occupancy_batches(hotspots, sessions, wos.BIN_SECONDS['hour'])),
+    OCCUPANCY_HOURLY,
+    pfu.PORTO_WIFI_OCCUPANCY_HOURLY_SCHEMA
+)
+print(f"Computed hotspot occupancy in {time.perf_counter() - start:.1f}s")
+
+# Show a preview of the result
+print(pfu.load_parquet(OCCUPANCY_HOURLY).head())
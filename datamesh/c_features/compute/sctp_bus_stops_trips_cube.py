@@ -0,0 +1,26 @@
+import os
+import sys
+import pandas as pd
+
+# Enabling trip cube
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+from application.services.trip_cube import TripCube
+
+# File paths
+TRIPS_HOURLY = './datamesh/c_features/datasets/sctp_bus_stops_trips_hourly.csv'
+STCP_STOPS = './datamesh/c_features/datasets/stcp_stops_nearby_poi.json'
+OUTPUT_CUBE = './datamesh/c_features/datasets/sctp_bus_stops_trips_cube.npz'
+
+# Load the hourly trip counts and the neighborhood of every stop
+trips_df = pd.read_csv(TRIPS_HOURLY, dtype={'stop_id': str, 'service_id': str, 'stop_name': str}, encoding='utf-8')
+stops_df = pd.read_json(STCP_STOPS, dtype={'stop_id': str})
+neighborhoods = dict(zip(stops_df['stop_id'], stops_df['neighborhood_name']))
+
+# Materialize the stop x service x hour cube
+cube = TripCube.from_frame(trips_df, neighborhoods=neighborhoods)
+cube.save(OUTPUT_CUBE)
+
+# Summary of the stored dimensions
+print(f"Stops: {len(cube.stops)} | Services: {cube.service_ids} | Hours: {len(cube.hours)}")
+print("Trip calls per hour (all services):")
+print(cube.hourly_totals().to_string())
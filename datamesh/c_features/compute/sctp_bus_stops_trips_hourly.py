@@ -1,39 +1,65 @@
+import os
+import sys
 import pandas as pd
-import json
-from datetime import datetime
+
+# Enabling parquet and GTFS time utils
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.parquet_file_utils as pfu
+import application.services.gtfs_time_utils as gtu
 
 OUTPUT_CSV = './datamesh/c_features/datasets/sctp_bus_stops_trips_hourly.csv'
 
 # File paths
-SCTP_STAGING_SPATIO_TEMPORAL = "./datamesh/b_staging/datasets/stcp_routes_spatio_temporal.csv"
+SCTP_STAGING_SPATIO_TEMPORAL = "./datamesh/b_staging/datasets/stcp_routes_spatio_temporal.parquet"
+
+# Load only the columns needed for the aggregation
+csv_data = pfu.load_parquet(
+    SCTP_STAGING_SPATIO_TEMPORAL,
+    schema=pfu.STCP_ROUTES_SPATIO_TEMPORAL_SCHEMA,
+    columns=['stop_id', 'service_id', 'trip_id', 'arrival_time', 'stop_lat', 'stop_lon', 'stop_name']
+)
 
-# Load CSV data
-csv_data = pd.read_csv(SCTP_STAGING_SPATIO_TEMPORAL)
+# Seconds since the start of the service day; times past 24:00:00 are trips running after midnight
+arrival_seconds = gtu.parse_gtfs_times(csv_data['arrival_time'])
 
-# Function to calculate hourly slice
-def calculate_hourly_slice(arrival_time):
-    try:
-        time_obj = datetime.strptime(arrival_time, '%H:%M:%S')
-        start = time_obj.replace(minute=0, second=0)
-        end = time_obj.replace(minute=59, second=59)
-        return f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')}"
-    except ValueError:
-        return None  # Handle invalid time formats gracefully
+# Hourly slice as categorical codes, overnight trips counted in their clock hour (25:10 -> 01:00-01:59)
+hourly_slices = gtu.time_slices(arrival_seconds, width_minutes=60)
 
-# Add hourly slice column
-csv_data['hourly_slice'] = csv_data['arrival_time'].apply(calculate_hourly_slice)
+# Integer keys for the grouping (-1 marks a missing value)
+stop_columns = ['stop_id', 'stop_lat', 'stop_lon', 'stop_name']
+stop_groups = csv_data.groupby(stop_columns, sort=True)
+service_codes, service_ids = pd.factorize(csv_data['service_id'], sort=True)
+keys = pd.DataFrame({
+    'stop_code': stop_groups.ngroup().to_numpy(),
+    'service_code': service_codes,
+    'slice_code': hourly_slices.codes,
+    'trip_code': pd.factorize(csv_data['trip_id'])[0],
+})
 
-# Filter out rows with invalid hourly slices
-csv_data = csv_data[csv_data['hourly_slice'].notna()]
+# Filter out rows with invalid arrival times or missing keys
+keys = keys[(keys[['stop_code', 'service_code', 'slice_code']] >= 0).all(axis=1)]
 
-# Group by stop_id, service_id, hourly_slice and count distinct trip_ids
+# Count distinct trip_ids per stop, service_id and hourly_slice
 aggregated_data = (
-    csv_data
-    .groupby(['stop_id', 'service_id', 'hourly_slice', 'stop_lat', 'stop_lon', 'stop_name'])
-    .agg(distinct_trip_count=('trip_id', 'nunique'))
+    keys
+    .drop_duplicates()
+    .groupby(['stop_code', 'service_code', 'slice_code'], sort=True)
+    .size()
+    .rename('distinct_trip_count')
     .reset_index()
 )
 
+# Decode the integer keys back to their values
+stops = stop_groups.size().index.to_frame(index=False)
+aggregated_data = pd.concat([
+    stops.iloc[aggregated_data['stop_code']].reset_index(drop=True),
+    pd.DataFrame({
+        'service_id': service_ids[aggregated_data['service_code']],
+        'hourly_slice': hourly_slices.categories[aggregated_data['slice_code']],
+        'distinct_trip_count': aggregated_data['distinct_trip_count'],
+    })
+], axis=1)[['stop_id', 'service_id', 'hourly_slice', 'stop_lat', 'stop_lon', 'stop_name', 'distinct_trip_count']]
+
 # Save the result to a CSV file
 aggregated_data.to_csv(OUTPUT_CSV, index=False, encoding='utf-8')
 
@@ -1,56 +1,58 @@
-import pandas as pd
+import os
+import sys
+
+# Enabling parquet, GTFS time utils and headway service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.parquet_file_utils as pfu
+import application.services.gtfs_time_utils as gtu
+import application.services.headway_service as hws
 
 # Input and output file paths
-SCTP_ROUTES_SPATIO_TEMPORAL_JSON = "./datamesh/c_features/datasets/sctp_routes_spatio_temporal.csv"
+SCTP_ROUTES_SPATIO_TEMPORAL = "./datamesh/c_features/datasets/sctp_routes_spatio_temporal.parquet"
 OUTPUT = "./datamesh/c_features/datasets/sctp_routes_idle_time.csv"
+OUTPUT_HEADWAYS = "./datamesh/c_features/datasets/sctp_routes_headways.parquet"
+OUTPUT_HEADWAYS_HOURLY = "./datamesh/c_features/datasets/sctp_routes_headways_hourly.parquet"
 
-# Load the data from CSV
-df = pd.read_csv(SCTP_ROUTES_SPATIO_TEMPORAL_JSON, encoding='utf-8')
+ROUTE_KEYS = ['route_id', 'direction_id', 'service_id']
+STOP_KEYS = ROUTE_KEYS + ['stop_id']
 
-# Ensure columns are of string type for comparison
-df['route_id'] = df['route_id'].astype(str)
-df['direction_id'] = df['direction_id'].astype(str)
-df['stop_sequence'] = df['stop_sequence'].astype(str)
+# Load only the columns needed for the headway calculation
+df = pfu.load_parquet(
+    SCTP_ROUTES_SPATIO_TEMPORAL,
+    schema=pfu.SCTP_ROUTES_SPATIO_TEMPORAL_SCHEMA,
+    columns=['route_id', 'direction_id', 'service_id', 'stop_id', 'stop_sequence', 'arrival_time']
+)
 
 # Clean 'service_id' column by removing leading/trailing spaces
 df['service_id'] = df['service_id'].str.strip()
 
-# Convert 'arrival_time' to datetime, and coerce errors to NaT if invalid
-df['arrival_time'] = pd.to_datetime(df['arrival_time'], format='%H:%M:%S', errors='coerce')
-
-# Drop rows where 'arrival_time' is NaT (invalid or missing values)
-df = df.dropna(subset=['arrival_time'])
-
-# Filter by stop_sequence == '1' (since stop_sequence is a string)
-df = df[df['stop_sequence'] == '1']
-
-# Sort by route_id, direction_id, service_id, and arrival_time for correct time difference calculation
-df = df.sort_values(by=['route_id', 'direction_id', 'service_id', 'arrival_time'])
-
-# Step 1: Calculate the idle time as the difference in minutes between consecutive rows within each group
-df['idle_time'] = df.groupby(['route_id', 'direction_id', 'service_id'])['arrival_time'].diff().dt.total_seconds() / 60
-
-# Step 2: Drop rows where idle_time is NaN (the first row in each group will have NaN idle_time)
-df = df.dropna(subset=['idle_time'])
-
-# Ensure that all required columns are of the correct type
-df['route_id'] = df['route_id'].astype(str)
-df['direction_id'] = df['direction_id'].astype(str)
-df['service_id'] = df['service_id'].astype(str)
-
-# Print the number of records after calculating idle_time
-print("Number of records after calculating idle_time:", df.shape)
-
-# Step 3: Calculate the mean idle time for the selected group (route_id, direction_id, service_id)
-agg_df = df.groupby(['route_id', 'direction_id', 'service_id']).agg(
-    idle_time_average=('idle_time', 'mean')
-).reset_index()
-
-# Save the aggregated data with mean idle time to a new CSV
+# Arrival times as seconds since the start of the service day (overnight times past 24:00:00 are kept)
+arrival_seconds = gtu.parse_gtfs_times(df['arrival_time'])
+print("Number of records with a valid arrival_time:", (arrival_seconds != gtu.INVALID_TIME).sum())
+
+# Step 1: Headway distribution at every stop of every route, direction and service
+headways = hws.headway_stats(df[STOP_KEYS], arrival_seconds)
+pfu.save_to_parquet(headways, OUTPUT_HEADWAYS, pfu.SCTP_ROUTES_HEADWAYS_SCHEMA)
+
+# Step 2: Mean headway per clock hour at every stop
+hourly = hws.hourly_headways(df[STOP_KEYS], arrival_seconds)
+pfu.save_to_parquet(hourly, OUTPUT_HEADWAYS_HOURLY, pfu.SCTP_ROUTES_HEADWAYS_HOURLY_SCHEMA)
+
+# Step 3: Idle time of each route, direction and service: headways between departures from the first stop
+first_stop = (df['stop_sequence'] == 1).to_numpy()
+agg_df = hws.headway_stats(df.loc[first_stop, ROUTE_KEYS], arrival_seconds[first_stop])
+agg_df = agg_df.rename(columns={
+    'headway_mean_min': 'idle_time_average',
+    'headway_p50_min': 'idle_time_p50',
+    'headway_p90_min': 'idle_time_p90',
+    'headway_max_min': 'idle_time_max',
+})[ROUTE_KEYS + ['idle_time_average', 'idle_time_p50', 'idle_time_p90', 'idle_time_max', 'departures']]
+
+# Save the aggregated idle time to a CSV
 agg_df.to_csv(OUTPUT, index=False, encoding='utf-8')
 
 # Optionally print out the first few rows of the aggregated data
 print(agg_df.head())
 
 # Let the user know where the file was saved
-print(f"The aggregated CSV file with mean idle time has been saved as {OUTPUT}.")
+print(f"The aggregated CSV file with idle time statistics has been saved as {OUTPUT}.")
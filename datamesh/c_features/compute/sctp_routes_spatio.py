@@ -1,24 +1,30 @@
-import pandas as pd
+import os
+import sys
 
-### REDUCE DIMENSIONALITY TO RELY ONLY ON SPATIO DIMENSION REMOVING THE TIME DIMENSION ####
+# Enabling parquet utils
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.parquet_file_utils as pfu
 
+### REDUCE DIMENSIONALITY TO RELY ONLY ON SPATIO DIMENSION REMOVING THE TIME DIMENSION ####
 
-# Input CSV file
-SCTP_ROUTES_SPATIO_TEMPORAL_JSON = "./datamesh/c_features/datasets/sctp_routes_spatio_temporal.csv"
 
-# Output CSV file
-OUTPUT_CSV = "./datamesh/c_features/datasets/sctp_routes_spatio.csv"
+# Input Parquet dataset
+SCTP_ROUTES_SPATIO_TEMPORAL = "./datamesh/c_features/datasets/sctp_routes_spatio_temporal.parquet"
 
-# Load the CSV data into a DataFrame
-df = pd.read_csv(SCTP_ROUTES_SPATIO_TEMPORAL_JSON, encoding='utf-8')
+# Output Parquet file
+OUTPUT_PARQUET = "./datamesh/c_features/datasets/sctp_routes_spatio.parquet"
 
-# Drop the specified columns: service_id, trip_id, arrival_time, departure_time
-df_reduced = df.drop(columns=['service_id', 'trip_id', 'arrival_time', 'departure_time'])
+# Load the data without the time columns: service_id, trip_id, arrival_time, departure_time
+df_reduced = pfu.load_parquet(
+    SCTP_ROUTES_SPATIO_TEMPORAL,
+    schema=pfu.SCTP_ROUTES_SPATIO_TEMPORAL_SCHEMA,
+    columns=pfu.SCTP_ROUTES_SPATIO_SCHEMA.names
+)
 
 # Select only distinct rows based on the remaining columns
 df_distinct = df_reduced.drop_duplicates()
 
-# Save the reduced DataFrame to a new CSV file
-df_distinct.to_csv(OUTPUT_CSV, index=False, encoding='utf-8')
+# Save the reduced DataFrame to a new Parquet file
+pfu.save_to_parquet(df_distinct, OUTPUT_PARQUET, pfu.SCTP_ROUTES_SPATIO_SCHEMA)
 
-print(f"Reduced CSV with distinct data has been saved to {OUTPUT_CSV}")
+print(f"Reduced dataset with distinct data has been saved to {OUTPUT_PARQUET}")
@@ -1,22 +1,27 @@
-import pandas as pd
+import os
+import sys
 import json
-from shapely.geometry import Point, Polygon
+
+# Enabling neighborhood service and parquet utils
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.neighborhood_service as nbs
+import application.services.parquet_file_utils as pfu
 
 ### ADDING NEW FEATURES ####
 # trip_direction (INBOUND_CITY_CENTER, OUTBOUND_CITY_CENTER)
 # neighborhood for each stop datapoint
 ##### neighborhood feature finds if stop coordinate falls inside each Porto neighborhood boundarie
 
-OUTPUT_CSV = './datamesh/c_features/datasets/sctp_routes_spatio_temporal.csv'
+OUTPUT_PARQUET = './datamesh/c_features/datasets/sctp_routes_spatio_temporal.parquet'
 
 
 # File paths
-SCTP_STAGING_SPATIO_TEMPORAL = "./datamesh/b_staging/datasets/stcp_routes_spatio_temporal.csv"
+SCTP_STAGING_SPATIO_TEMPORAL = "./datamesh/b_staging/datasets/stcp_routes_spatio_temporal.parquet"
 PORTO_NEIGHBORHOODS = "./datamesh/c_features/datasets/porto_neighborhoods.json"
 
 
-# Load CSV data
-csv_data = pd.read_csv(SCTP_STAGING_SPATIO_TEMPORAL)
+# Load staging data
+csv_data = pfu.load_parquet(SCTP_STAGING_SPATIO_TEMPORAL, schema=pfu.STCP_ROUTES_SPATIO_TEMPORAL_SCHEMA)
 
 
 # Add the trip_direction column based on trip_id
@@ -35,29 +40,23 @@ csv_data['trip_direction'] = csv_data['trip_id'].apply(determine_trip_direction)
 with open(PORTO_NEIGHBORHOODS, 'r', encoding='utf-8') as f:
     neighborhoods = json.load(f)
 
-# Create a list of neighborhood polygons
-neighborhood_polygons = []
-for neighborhood in neighborhoods:
-    name = neighborhood['neighborhood_name']
-    coordinates = [(coord['lat'], coord['lon']) for coord in neighborhood['coordinates']]
-    polygon = Polygon(coordinates)
-    neighborhood_polygons.append({'name': name, 'polygon': polygon})
-
-# Function to find the neighborhood for a given latitude and longitude
-def get_neighborhood(lat, lon):
-    point = Point(lat, lon)
-    for neighborhood in neighborhood_polygons:
-        if neighborhood['polygon'].contains(point):
-            return neighborhood['name']
-    return 'OUTSIDE_PORTO_MUNICIPALITY_BOUNDARIES'  # Return None if no neighborhood is found
-
-# Apply the function to each row in the CSV
-csv_data['neighborhood_name'] = csv_data.apply(
-    lambda row: get_neighborhood(row['stop_lat'], row['stop_lon']),
-    axis=1
+# Create the neighborhood polygons
+neighborhood_names, neighborhood_polygons = nbs.neighborhood_polygons(neighborhoods)
+
+# Find the neighborhood of each stop coordinate in a single vectorized pass
+csv_data['neighborhood_name'] = nbs.assign_neighborhoods(
+    csv_data['stop_lat'].to_numpy(),
+    csv_data['stop_lon'].to_numpy(),
+    neighborhood_names,
+    neighborhood_polygons
 )
 
-# Save the updated DataFrame to a new CSV
-csv_data.to_csv(OUTPUT_CSV, index=False, encoding='utf-8')
+# Save the updated DataFrame as a Parquet dataset partitioned by service_id
+pfu.save_to_parquet(
+    csv_data,
+    OUTPUT_PARQUET,
+    pfu.SCTP_ROUTES_SPATIO_TEMPORAL_SCHEMA,
+    partition_cols=pfu.SERVICE_PARTITION
+)
 
-print(f"CSV with 'neighborhood_name' field has been saved to {OUTPUT_CSV}")
+print(f"Dataset with 'neighborhood_name' field has been saved to {OUTPUT_PARQUET}")
@@ -1,42 +1,32 @@
-import csv
 import json
-from math import radians, sin, cos, sqrt, atan2
+import os
+import sys
+
+# Enabling geo proximity service and parquet utils
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.geo_proximity_service as gps
+import application.services.parquet_file_utils as pfu
 
 # File paths
 # File paths
 INSTITUTIONS_JSON = './datamesh/b_staging/datasets/porto_city_main_institutions.json'
-STOPS_CSV = './datamesh/c_features/datasets/sctp_routes_spatio_temporal.csv'
+STOPS_PARQUET = './datamesh/c_features/datasets/sctp_routes_spatio_temporal.parquet'
 
 # Save the updated JSON to a file
 OUTPUT_JSON = './datamesh/c_features/datasets/stcp_stops_nearby_poi.json'
 
-# Haversine formula to calculate distance between two coordinates
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Earth radius in kilometers
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-# Load CSV and get distinct stops
-def load_distinct_stops(csv_file):
-    stops = {}
-    with open(csv_file, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            stop_id = row['stop_id']
-            if stop_id not in stops:
-                stops[stop_id] = {
-                    'stop_id': stop_id,
-                    'stop_name': row['stop_name'],
-                    'lat': float(row['stop_lat']),
-                    'lon': float(row['stop_lon']),
-                    'neighborhood_name': row['neighborhood_name']
-                }
-    return list(stops.values())
-
-# Generalized function to compute number of nearby entities of a specific type
+# Load the stop columns and get distinct stops
+def load_distinct_stops(parquet_file):
+    stops_df = pfu.load_parquet(
+        parquet_file,
+        schema=pfu.SCTP_ROUTES_SPATIO_TEMPORAL_SCHEMA,
+        columns=['stop_id', 'stop_name', 'stop_lat', 'stop_lon', 'neighborhood_name']
+    )
+    stops_df = stops_df.drop_duplicates(subset=['stop_id'])
+    stops_df = stops_df.rename(columns={'stop_lat': 'lat', 'stop_lon': 'lon'})
+    return stops_df[['stop_id', 'stop_name', 'lat', 'lon', 'neighborhood_name']].to_dict(orient='records')
+
+# Compute number of nearby institutions and closest distance per type for each stop
 def add_nearby_entity_fields(stops, institutions, radius=1.5):
     """
     Adds multiple fields for different types of entities to each stop.
@@ -46,56 +36,7 @@ def add_nearby_entity_fields(stops, institutions, radius=1.5):
     :param radius: Radius in kilometers to consider an entity as "nearby"
     :return: Stops with the new fields added
     """
-    entity_types = [
-        'school',
-        'hospital',
-        'university',
-        'public office',
-        'tourist attraction',
-        'train station',
-        'subway station',
-    ]
-
-    # Filter institutions by type
-    institutions_by_type = {
-        entity_type: [inst for inst in institutions if inst.get('type') == entity_type]
-        for entity_type in entity_types
-    }
-
-    for stop in stops:
-        stop_lat = stop['lat']
-        stop_lon = stop['lon']
-
-        # Initialize fields for each entity type
-        for entity_type in entity_types:
-            stop[f'number_of_nearby_{entity_type.replace(" ", "_")}s'] = 0
-            stop[f'closest_{entity_type.replace(" ", "_")}_km'] = float('inf')
-
-        # Calculate nearby entities and closest distances for each type
-        for entity_type, filtered_institutions in institutions_by_type.items():
-            count = 0
-            min_distance = float('inf')
-            
-            for institution in filtered_institutions:
-                inst_lat = institution.get('lat')
-                inst_lon = institution.get('long')
-
-                if inst_lat is None or inst_lon is None:
-                    continue
-
-                distance = haversine(stop_lat, stop_lon, inst_lat, inst_lon)
-                min_distance = min(min_distance, distance)
-                
-                if distance <= radius:
-                    count += 1
-
-            # Update the count and closest distance fields
-            stop[f'number_of_nearby_{entity_type.replace(" ", "_")}s'] = count
-            stop[f'closest_{entity_type.replace(" ", "_")}_km'] = (
-                min_distance if min_distance != float('inf') else None
-            )
-
-    return stops
+    return gps.add_nearby_entity_fields(locations=stops, entities=institutions, radius=radius)
 
 # Load JSON data for institutions
 def load_institutions(json_file):
@@ -110,7 +51,7 @@ def save_to_json(data, output_file):
 # Main function
 def main():
     # Load distinct stops
-    stops = load_distinct_stops(STOPS_CSV)
+    stops = load_distinct_stops(STOPS_PARQUET)
 
     # Load institutions data
     institutions = load_institutions(INSTITUTIONS_JSON)
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+# Enabling lean predictor, trip cube and mobility inference service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.mobility_inference_service as mis
+from application.services.lean_predictor import LeanPredictor
+from application.services.trip_cube import TripCube
+
+MODEL_PATH = './datamesh/d_ml_inference/models/mobility_regressor.joblib'
+TRIP_CUBE = './datamesh/c_features/datasets/sctp_bus_stops_trips_cube.npz'
+STCP_STOPS = './datamesh/c_features/datasets/stcp_stops_nearby_poi.json'
+
+# Month of (date, stop, hour) rows predicted by the batch inference
+BENCHMARK_START = '2024-11-01'
+BENCHMARK_END = '2024-11-30'
+REPEATS = 3
+
+# Online sized batches (micro-batches of the prediction service)
+SMALL_BATCH_SIZE = 32
+SMALL_BATCHES = 200
+
+
+def best_time(function, repeats=REPEATS):
+    # Best of a few runs, to leave out warm-up and scheduling noise
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+# Full month feature frame: every (date, stop, hour) row, without any deduplication
+features = mis.build_stop_hour_features(
+    TripCube.load(TRIP_CUBE).to_frame(),
+    pd.read_json(STCP_STOPS, dtype={'stop_id': str})
+)
+calendar = mis.build_calendar(BENCHMARK_START, BENCHMARK_END)
+rows = calendar.merge(features, left_on='day_of_week_category', right_on='service_id', how='inner')
+
+pipeline = joblib.load(MODEL_PATH)
+lean = LeanPredictor.from_pipeline(pipeline)
+frame = rows[list(pipeline.feature_names_in_)]
+matrix = lean.feature_matrix(frame)
+
+pipeline_time, pipeline_predictions = best_time(lambda: pipeline.predict(frame))
+lean_frame_time, lean_frame_predictions = best_time(lambda: lean.predict(frame))
+lean_matrix_time, lean_matrix_predictions = best_time(lambda: lean.predict_matrix(matrix))
+float32_time, float32_predictions = best_time(lambda: lean.predict_matrix(matrix.astype(np.float32)))
+
+# The lean paths must reproduce the pipeline exactly
+assert np.array_equal(pipeline_predictions, lean_frame_predictions), "Lean predictor (frame) differs from the pipeline"
+assert np.array_equal(pipeline_predictions, lean_matrix_predictions), "Lean predictor (matrix) differs from the pipeline"
+
+print(f"Benchmark on {len(frame)} rows ({BENCHMARK_START} to {BENCHMARK_END}), best of {REPEATS}:")
+print("-" * 30)
+for name, elapsed in [
+    ("joblib pipeline", pipeline_time),
+    ("lean predictor, DataFrame input", lean_frame_time),
+    ("lean predictor, encoded float64 matrix", lean_matrix_time),
+    ("lean predictor, encoded float32 matrix", float32_time),
+]:
+    print(f"{name}: {elapsed:.3f}s ({len(frame) / elapsed:,.0f} rows/s, {pipeline_time / elapsed:.2f}x)")
+
+# float32 rounds the distance features, which can cross a split threshold
+float32_mismatches = int((float32_predictions != pipeline_predictions).sum())
+print(f"float32 input: {float32_mismatches} of {len(frame)} predictions differ from the pipeline "
+      f"(max abs difference {np.abs(float32_predictions - pipeline_predictions).max():.3g})")
+
+# Per call overhead on online sized batches
+small_frames = [frame.iloc[i * SMALL_BATCH_SIZE:(i + 1) * SMALL_BATCH_SIZE] for i in range(SMALL_BATCHES)]
+small_matrices = [lean.feature_matrix(small_frame) for small_frame in small_frames]
+pipeline_small_time, _ = best_time(lambda: [pipeline.predict(small_frame) for small_frame in small_frames])
+lean_small_time, _ = best_time(lambda: [lean.predict_matrix(small_matrix) for small_matrix in small_matrices])
+print(f"{SMALL_BATCHES} batches of {SMALL_BATCH_SIZE} rows: joblib pipeline {pipeline_small_time / SMALL_BATCHES * 1000:.2f} ms/batch, "
+      f"lean predictor {lean_small_time / SMALL_BATCHES * 1000:.2f} ms/batch ({pipeline_small_time / lean_small_time:.1f}x)")
+print("Lean predictions are identical to the pipeline.")
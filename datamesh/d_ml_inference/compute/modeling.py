@@ -1,7 +1,7 @@
+import argparse
 import warnings
 import joblib
 import pandas as pd
-import matplotlib.pyplot as plt
 
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OrdinalEncoder
@@ -9,13 +9,33 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import mean_absolute_error, root_mean_squared_error
 from lightgbm import LGBMRegressor
-from shap import TreeExplainer, summary_plot
+import os
+import sys
+
+# Enabling lean predictor, model training and SHAP explanation services
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.model_training_service as mts
+import application.services.shap_explanation_service as ses
+from application.services.lean_predictor import LeanPredictor
 
 warnings.filterwarnings('ignore')
 
 DATASET = './datamesh/c_features/datasets/mobility_regression_training.csv'
 MODEL_PATH = './datamesh/d_ml_inference/models/mobility_regressor.joblib'
-PLOT_PATH = './datamesh/d_ml_inference/plots/mobility_regressor_shap.png'
+LEAN_MODEL_PATH = './datamesh/d_ml_inference/models/mobility_regressor_lean.json'
+SHAP_PATH = './datamesh/d_ml_inference/models/mobility_regressor_shap.npz'
+TRIALS_PATH = './datamesh/d_ml_inference/models/mobility_regressor_trials.csv'
+
+# Binary LightGBM Datasets of the cross-validation folds, reused between trials and runs
+DATASET_CACHE = './datamesh/d_ml_inference/cache/lgb_datasets'
+
+parser = argparse.ArgumentParser(description="Train the mobility regressor with a cross-validated hyperparameter search")
+parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel trials (-1 = all cores)")
+parser.add_argument('--trials', type=int, default=20, help="Parameter sets to try (the first is the current configuration)")
+parser.add_argument('--cv', choices=['grouped', 'time'], default='grouped', help="Folds grouped by location or forward in time")
+parser.add_argument('--folds', type=int, default=5, help="Number of cross-validation folds")
+parser.add_argument('--shap-samples', type=int, default=ses.SAMPLE_SIZE, help="Test rows explained, stratified by hour (0 = all)")
+args = parser.parse_args()
 
 # 1. load data
 df = pd.read_csv(DATASET)
@@ -26,7 +46,18 @@ X = df.drop(columns=['number_of_sessions_per_hour'])
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# 3. preprocess data
+# 3. cross-validated hyperparameter search on the training split, trials in parallel processes
+trials = mts.search(
+    X_train, y_train, DATASET_CACHE,
+    n_trials=args.trials, n_jobs=args.n_jobs, strategy=args.cv, n_splits=args.folds
+)
+trials.to_csv(TRIALS_PATH, index=False)
+print(f"Cross-validation ({args.cv}, {args.folds} folds) of {len(trials)} trials:")
+print(trials[['trial', 'rmse_mean', 'rmse_std', 'mae_mean', 'best_iteration', 'fit_seconds']].head(10).to_string(index=False))
+best_params = mts.best_params(trials)
+print(f"Best parameters: {best_params}")
+
+# 4. preprocess data
 preprocessor = ColumnTransformer(
     transformers=[
         ('hour_slice_encoder', OrdinalEncoder(), ['hour_slice']) 
@@ -38,16 +69,15 @@ model = Pipeline([
     ('cat_pipeline', preprocessor),
     ('model', LGBMRegressor(
         random_state=42,
-        min_child_samples=20,  # Add minimum samples per leaf
-        subsample=0.8,         # Use bagging
-        colsample_bytree=0.8   # Use feature fraction
+        verbose=-1,
+        **best_params          # Best cross-validated configuration, n_estimators from early stopping
     ))
 ])
 
-# 4. train model
+# 5. train model
 model.fit(X_train, y_train)
 
-# 5. evaluate model
+# 6. evaluate model
 y_pred = model.predict(X_test)
 
 print("Model Performance Metrics:")
@@ -55,12 +85,20 @@ print("-" * 30)
 print(f"Mean Absolute Error: {mean_absolute_error(y_test, y_pred):.2f}")
 print(f"Root Mean Squared Error: {root_mean_squared_error(y_test, y_pred):.2f}")
 
-# 6. export model
+# 7. export model
 joblib.dump(model, MODEL_PATH)
 
-# 7. export shap plot
-explainer = TreeExplainer(model.named_steps['model'])
-X_test_encoded = preprocessor.transform(X_test)
-X_test_encoded = pd.DataFrame(X_test_encoded, columns=X.columns)
-summary_plot(explainer.shap_values(X_test_encoded), X_test_encoded, show=False)
-plt.savefig(PLOT_PATH)
+# 8. export lean predictor (raw booster + hour codes) for the inference fast path
+lean_model = LeanPredictor.from_pipeline(model)
+assert (lean_model.predict(X_test) == y_pred).all(), "Lean predictor predictions differ from the pipeline"
+lean_model.save(LEAN_MODEL_PATH)
+
+# 9. export shap values of a stratified test sample (plots are drawn from them by plot_shap.py)
+sample_index = ses.stratified_sample(X_test, n_samples=args.shap_samples or None)
+explanation = ses.ShapExplanation.compute(
+    lean_model.booster, lean_model.feature_matrix(X_test.iloc[sample_index]), lean_model.columns,
+    sample_index=sample_index, n_jobs=args.n_jobs
+)
+explanation.save(SHAP_PATH)
+print("Global feature importance (mean |SHAP|):")
+print(explanation.importance().head(10).to_string(index=False))
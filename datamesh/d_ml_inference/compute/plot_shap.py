@@ -0,0 +1,34 @@
+import warnings
+import matplotlib.pyplot as plt
+from shap import summary_plot
+import os
+import sys
+
+# Enabling SHAP explanation service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+from application.services.shap_explanation_service import ShapExplanation
+
+warnings.filterwarnings('ignore')
+
+SHAP_PATH = './datamesh/d_ml_inference/models/mobility_regressor_shap.npz'
+PLOT_PATH = './datamesh/d_ml_inference/plots/mobility_regressor_shap.png'
+IMPORTANCE_PLOT_PATH = './datamesh/d_ml_inference/plots/mobility_regressor_shap_importance.png'
+
+# 1. load cached shap values (computed by modeling.py, no model needed here)
+explanation = ShapExplanation.load(SHAP_PATH)
+print(f"Loaded SHAP values of {len(explanation.values)} rows from {SHAP_PATH}")
+
+# 2. export summary plot
+summary_plot(explanation.values, explanation.feature_frame(), show=False)
+plt.savefig(PLOT_PATH, bbox_inches='tight')
+plt.close()
+
+# 3. export global importance plot
+importance = explanation.importance().iloc[::-1]
+plt.figure(figsize=(8, 0.35 * len(importance) + 1))
+plt.barh(importance['feature'], importance['mean_abs_shap'])
+plt.xlabel('mean(|SHAP value|)')
+plt.tight_layout()
+plt.savefig(IMPORTANCE_PLOT_PATH)
+plt.close()
+print(f"Saved SHAP plots to {PLOT_PATH} and {IMPORTANCE_PLOT_PATH}")
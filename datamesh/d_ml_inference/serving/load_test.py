@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import numpy as np
+import pandas as pd
+
+STCP_STOPS = './datamesh/c_features/datasets/stcp_stops_nearby_poi.json'
+
+
+async def request(reader, writer, host, method, path, body=b''):
+    """
+    Send one HTTP/1.1 request on a keep-alive connection and return (status, JSON payload).
+    """
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+
+
+async def client(host, port, queries, batch_size, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            started = time.perf_counter()
+            if batch_size == 1:
+                stop_id, date, hour = batch[0]
+                status, _ = await request(reader, writer, host, 'GET', f"/predict?stop_id={stop_id}&date={date}&hour={hour}")
+            else:
+                body = json.dumps([{'stop_id': stop_id, 'date': date, 'hour': hour} for stop_id, date, hour in batch])
+                status, _ = await request(reader, writer, host, 'POST', '/predict', body.encode('utf-8'))
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests, concurrency, batch_size, seed):
+    # Random (stop, date, hour) queries over the known stops
+    stop_ids = pd.read_json(STCP_STOPS, dtype={'stop_id': str})['stop_id'].tolist()
+    rng = random.Random(seed)
+    dates = [date.strftime('%Y-%m-%d') for date in pd.date_range('2024-11-01', '2024-11-30')]
+    queries = [(rng.choice(stop_ids), rng.choice(dates), rng.randrange(24)) for _ in range(requests * batch_size)]
+
+    latencies = []
+    errors = []
+    per_client = -(-len(queries) // concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(host, port, queries[i * per_client:(i + 1) * per_client], batch_size, latencies, errors)
+        for i in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"Requests: {len(latencies)} ({batch_size} queries each) over {concurrency} connections in {elapsed:.2f}s")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} requests/s, {len(queries) / elapsed:.0f} queries/s")
+    print(f"Client latency: p50 {np.percentile(latencies_ms, 50):.2f} ms | p99 {np.percentile(latencies_ms, 99):.2f} ms")
+    print(f"Errors: {len(errors)}")
+
+    # Server side view of the same run
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await request(reader, writer, host, 'GET', '/metrics')
+    writer.close()
+    print(f"Server metrics: {metrics}")
+
+
+if __name__ == "__main__":
+    # Run from the repository root against a running mobility_prediction_server.py
+    parser = argparse.ArgumentParser(description="Load test of the mobility prediction API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--requests', type=int, default=5000, help="Total number of HTTP requests")
+    parser.add_argument('--concurrency', type=int, default=32, help="Number of concurrent keep-alive connections")
+    parser.add_argument('--batch-size', type=int, default=1, help="Queries per request (1 = GET, more = POST)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.host, args.port, args.requests, args.concurrency, args.batch_size, args.seed))
@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import os
+import sys
+
+# Enabling mobility prediction service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.mobility_prediction_service as mps
+from application.services.lean_predictor import preferred_model_path
+
+MODEL_PATH = './datamesh/d_ml_inference/models/mobility_regressor.joblib'
+LEAN_MODEL_PATH = './datamesh/d_ml_inference/models/mobility_regressor_lean.json'
+STCP_STOPS = './datamesh/c_features/datasets/stcp_stops_nearby_poi.json'
+
+
+def main(host, port, max_batch_size, max_wait_ms):
+    # Load the model and the stop features once, then serve from memory
+    # (the lean predictor when modeling.py exported one from the current model, the joblib pipeline otherwise)
+    model_path = preferred_model_path(LEAN_MODEL_PATH, MODEL_PATH)
+    predictor = mps.MobilityPredictor(model_path, STCP_STOPS)
+    server = mps.MobilityPredictionServer(predictor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    asyncio.run(server.serve(host, port))
+
+
+if __name__ == "__main__":
+    # Run from the repository root: python datamesh/d_ml_inference/serving/mobility_prediction_server.py
+    parser = argparse.ArgumentParser(description="Online mobility score prediction API")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8050, help="Port to listen on")
+    parser.add_argument('--max-batch-size', type=int, default=mps.MAX_BATCH_SIZE, help="Maximum queries per model call")
+    parser.add_argument('--max-wait-ms', type=float, default=mps.MAX_BATCH_WAIT_MS, help="Maximum wait to fill a batch")
+    args = parser.parse_args()
+
+    main(args.host, args.port, args.max_batch_size, args.max_wait_ms)
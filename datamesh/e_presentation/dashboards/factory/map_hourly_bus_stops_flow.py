@@ -1,15 +1,17 @@
-import pandas as pd
+import os
+import sys
 import plotly.express as px
 
-# Load the data from the CSV file (replace with your file path)
-data_file = "./datamesh/c_features/datasets/sctp_bus_stops_trips_hourly.csv"
-df = pd.read_csv(data_file,encoding='utf-8')
+# Enabling trip cube
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
+from application.services.trip_cube import TripCube
 
-# Ensure the 'hourly_slice' is ordered correctly for the animation slider
+# Load the pre-aggregated stop x service x hour cube
+cube_file = "./datamesh/c_features/datasets/sctp_bus_stops_trips_cube.npz"
+cube = TripCube.load(cube_file)
 
-
-# Sort the data by 'hourly_slice' to ensure correct slider order
-df = df.sort_values('hourly_slice')
+# Non-zero cells in long format, already ordered by hourly_slice for the animation slider
+df = cube.to_frame()
 
 # Create the animated scatter map
 fig = px.scatter_mapbox(
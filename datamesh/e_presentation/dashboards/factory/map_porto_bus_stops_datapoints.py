@@ -1,18 +1,18 @@
 import os
 import sys
 import folium
-import pandas as pd
 
 # Sample data for neighborhoods with coordinates (only a part of it for this example)
 # Enabling simulation service path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
 import application.services.json_file_utils as jfs
+import application.services.parquet_file_utils as pfu
 
 # Dataset with latitude and longitude of wifi hotspots
-SCTP_SPATIO_FEATURE = './datamesh/c_features/datasets/sctp_routes_spatio.csv'
+SCTP_SPATIO_FEATURE = './datamesh/c_features/datasets/sctp_routes_spatio.parquet'
 
-# Load the CSV data into a DataFrame
-bus_stops_df = pd.read_csv(SCTP_SPATIO_FEATURE, encoding='utf-8')
+# Load the stop coordinates into a DataFrame
+bus_stops_df = pfu.load_parquet(SCTP_SPATIO_FEATURE, columns=['stop_id', 'stop_lat', 'stop_lon'])
 
 # Dataset with polygons for neighborhoods
 neighborhoods_data = jfs.load_json_files('./datamesh/c_features/datasets/porto_neighborhoods.json')
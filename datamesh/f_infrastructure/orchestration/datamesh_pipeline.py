@@ -0,0 +1,184 @@
+import argparse
+import os
+import sys
+
+# Enabling pipeline runner
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+import application.services.pipeline_runner as runner
+
+# All paths are relative to the repository root, where every datamesh script is run from
+RAW_GTFS_STCP = './datamesh/a_raw_data/datasets/porto_digital/stcp_routes/gtfs_stcp'
+RAW_GEO_API = './datamesh/a_raw_data/datasets/geoapi.pt'
+STAGING = './datamesh/b_staging/datasets'
+FEATURES = './datamesh/c_features/datasets'
+
+# Fingerprints of the last successful run of every step
+PIPELINE_STATE = './datamesh/f_infrastructure/orchestration/pipeline_state.json'
+
+# ETL, feature and inference steps with the datasets they read and write
+PIPELINE_STEPS = [
+    # b_staging
+    {
+        'name': 'porto_city_main_institutions',
+        'script': './datamesh/b_staging/etl/porto_city_main_institutions.py',
+        'inputs': [],
+        'outputs': [f'{STAGING}/porto_city_main_institutions.json'],
+    },
+    {
+        'name': 'porto_digital_wifi_hotspots',
+        'script': './datamesh/b_staging/etl/porto_digital_wifi_hotspots.py',
+        'inputs': ['./datamesh/a_raw_data/datasets/hackacity/aps_hackacity.csv'],
+        'outputs': [f'{STAGING}/porto_digital_wifi_hotspots.json'],
+    },
+    {
+        'name': 'stcp_routes_shapes',
+        'script': './datamesh/b_staging/etl/sctp_routes_shapes.py',
+        'inputs': [f'{RAW_GTFS_STCP}/routes.csv', f'{RAW_GTFS_STCP}/trips.csv', f'{RAW_GTFS_STCP}/shapes.csv'],
+        'outputs': [f'{STAGING}/stcp_routes_shapes.json'],
+    },
+    {
+        'name': 'stcp_routes_spatio_temporal_staging',
+        'script': './datamesh/b_staging/etl/sctp_routes_spatio_temporal.py',
+        'inputs': [f'{RAW_GTFS_STCP}/trips.csv', f'{RAW_GTFS_STCP}/stops.csv', f'{RAW_GTFS_STCP}/stop_times.csv'],
+        'outputs': [f'{STAGING}/stcp_routes_spatio_temporal.parquet'],
+    },
+    # c_features: wifi chain
+    {
+        'name': 'porto_neighborhoods',
+        'script': './datamesh/c_features/compute/porto_neighborhoods.py',
+        'inputs': [
+            f'{RAW_GEO_API}/geo_api_neighborhoods_inhabitants.json',
+            f'{RAW_GEO_API}/geo_api_neighborhoods_polygon.json',
+            f'{STAGING}/porto_digital_wifi_hotspots.json',
+        ],
+        'outputs': [f'{FEATURES}/porto_neighborhoods.json'],
+    },
+    {
+        'name': 'porto_wifi_hotspots_nearby_poi',
+        'script': './datamesh/c_features/compute/porto_wifi_hostpots_nearby_poi.py',
+        'inputs': [f'{STAGING}/porto_city_main_institutions.json', f'{STAGING}/porto_digital_wifi_hotspots.json'],
+        'outputs': [f'{FEATURES}/porto_wifi_hotspots_nearby_poi.json'],
+    },
+    {
+        'name': 'porto_wifi_access_per_hotspot_hourly',
+        'script': './datamesh/c_features/compute/porto_wifi_access_per_hotspot_hourly.py',
+        'inputs': [
+            f'{STAGING}/porto_wifi_hotspots_network_activity.csv',
+            f'{STAGING}/porto_digital_wifi_hotspots.json',
+            f'{FEATURES}/porto_neighborhoods.json',
+        ],
+        'outputs': [
+            f'{FEATURES}/porto_wifi_access_per_hotspot_hourly.csv',
+            f'{FEATURES}/porto_wifi_unique_devices_rollups.csv',
+        ],
+    },
+    {
+        'name': 'porto_wifi_occupancy',
+        'script': './datamesh/c_features/compute/porto_wifi_occupancy.py',
+        'inputs': [f'{STAGING}/porto_wifi_hotspots_network_activity.csv'],
+        'outputs': [
+            f'{FEATURES}/porto_wifi_occupancy_per_hotspot_minute.parquet',
+            f'{FEATURES}/porto_wifi_occupancy_per_hotspot_hourly.parquet',
+        ],
+    },
+    # c_features: STCP chain
+    {
+        'name': 'sctp_routes_spatio_temporal',
+        'script': './datamesh/c_features/compute/sctp_routes_spatio_temporal.py',
+        'inputs': [f'{STAGING}/stcp_routes_spatio_temporal.parquet', f'{FEATURES}/porto_neighborhoods.json'],
+        'outputs': [f'{FEATURES}/sctp_routes_spatio_temporal.parquet'],
+    },
+    {
+        'name': 'sctp_routes_spatio',
+        'script': './datamesh/c_features/compute/sctp_routes_spatio.py',
+        'inputs': [f'{FEATURES}/sctp_routes_spatio_temporal.parquet'],
+        'outputs': [f'{FEATURES}/sctp_routes_spatio.parquet'],
+    },
+    {
+        'name': 'sctp_routes_idle_time',
+        'script': './datamesh/c_features/compute/sctp_routes_iddle_time.py',
+        'inputs': [f'{FEATURES}/sctp_routes_spatio_temporal.parquet'],
+        'outputs': [
+            f'{FEATURES}/sctp_routes_idle_time.csv',
+            f'{FEATURES}/sctp_routes_headways.parquet',
+            f'{FEATURES}/sctp_routes_headways_hourly.parquet',
+        ],
+    },
+    {
+        'name': 'sctp_bus_stops_trips_hourly',
+        'script': './datamesh/c_features/compute/sctp_bus_stops_trips_hourly.py',
+        'inputs': [f'{STAGING}/stcp_routes_spatio_temporal.parquet'],
+        'outputs': [f'{FEATURES}/sctp_bus_stops_trips_hourly.csv'],
+    },
+    {
+        'name': 'sctp_bus_stops_trips_cube',
+        'script': './datamesh/c_features/compute/sctp_bus_stops_trips_cube.py',
+        'inputs': [f'{FEATURES}/sctp_bus_stops_trips_hourly.csv', f'{FEATURES}/stcp_stops_nearby_poi.json'],
+        'outputs': [f'{FEATURES}/sctp_bus_stops_trips_cube.npz'],
+    },
+    {
+        'name': 'stcp_stops_nearby_poi',
+        'script': './datamesh/c_features/compute/sctp_stops_nearby_poi.py',
+        'inputs': [f'{STAGING}/porto_city_main_institutions.json', f'{FEATURES}/sctp_routes_spatio_temporal.parquet'],
+        'outputs': [f'{FEATURES}/stcp_stops_nearby_poi.json'],
+    },
+    # d_ml_inference
+    {
+        'name': 'mobility_regressor',
+        'script': './datamesh/d_ml_inference/compute/modeling.py',
+        'inputs': [f'{FEATURES}/mobility_regression_training.csv'],
+        'outputs': [
+            './datamesh/d_ml_inference/models/mobility_regressor.joblib',
+            './datamesh/d_ml_inference/models/mobility_regressor_lean.json',
+            './datamesh/d_ml_inference/models/mobility_regressor_trials.csv',
+            './datamesh/d_ml_inference/models/mobility_regressor_shap.npz',
+        ],
+    },
+    {
+        'name': 'mobility_regressor_shap_plots',
+        'script': './datamesh/d_ml_inference/compute/plot_shap.py',
+        'inputs': ['./datamesh/d_ml_inference/models/mobility_regressor_shap.npz'],
+        'outputs': [
+            './datamesh/d_ml_inference/plots/mobility_regressor_shap.png',
+            './datamesh/d_ml_inference/plots/mobility_regressor_shap_importance.png',
+        ],
+    },
+    {
+        'name': 'mobility_regression_inference',
+        'script': './datamesh/c_features/compute/mobility_regression_inference.py',
+        'inputs': [
+            f'{FEATURES}/sctp_bus_stops_trips_cube.npz',
+            f'{FEATURES}/stcp_stops_nearby_poi.json',
+            # The lean export is optional (the step falls back to the joblib model) and is produced with it
+            './datamesh/d_ml_inference/models/mobility_regressor.joblib',
+        ],
+        'outputs': [f'{FEATURES}/mobility_regression_inference.csv'],
+    },
+]
+
+
+def main(jobs, force, dry_run, only):
+    steps = PIPELINE_STEPS
+    if only:
+        steps = [step for step in steps if step['name'] in only]
+
+    status = runner.run_pipeline(steps, PIPELINE_STATE, jobs=jobs, force=force, dry_run=dry_run)
+
+    print("Pipeline summary:")
+    print("-" * 30)
+    for name, step_status in status.items():
+        print(f"{name}: {step_status}")
+
+    return 1 if 'failed' in status.values() else 0
+
+
+if __name__ == "__main__":
+    # Run from the repository root: python datamesh/f_infrastructure/orchestration/datamesh_pipeline.py
+    parser = argparse.ArgumentParser(description="Incremental runner for the datamesh pipeline")
+    parser.add_argument('--jobs', type=int, default=4, help="Maximum number of steps running in parallel")
+    parser.add_argument('--force', action='store_true', help="Run every step even if its inputs are unchanged")
+    parser.add_argument('--dry-run', action='store_true', help="Only show which steps would run")
+    parser.add_argument('--only', nargs='*', help="Restrict the run to these step names")
+    args = parser.parse_args()
+
+    sys.exit(main(args.jobs, args.force, args.dry_run, args.only))
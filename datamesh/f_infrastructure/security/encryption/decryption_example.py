@@ -1,78 +1,58 @@
 import argparse
-import base64
+import os
+import sys
 import pandas as pd
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import pyarrow as pa
+
+# Enabling column encryption service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
+import application.services.column_encryption_service as ces
 
-def decrypt_value_gcm(encrypted_text: str, nonce_b64: str, key: bytes) -> str:
-    """
-    Decrypt a single value using AES-GCM given the ciphertext, nonce, and key.
-    """
-    if encrypted_text is None or nonce_b64 is None:
-        return None
-    
-    aesgcm = AESGCM(key)
-    ciphertext = base64.b64decode(encrypted_text)
-    nonce = base64.b64decode(nonce_b64)
-    
-    decrypted_data = aesgcm.decrypt(nonce, ciphertext, associated_data=None)
-    return decrypted_data.decode('utf-8')
 
-def decrypt_columns_gcm(encrypted_df: pd.DataFrame, keys_df: pd.DataFrame, id_col: str, columns_to_decrypt: list) -> pd.DataFrame:
+def decrypt_columns_gcm(path_encrypted_data: str, path_keys_data: str, master_key: bytes, id_col: str,
+                        columns_to_decrypt: list, ids: list = None, select: list = None, n_jobs: int = -1) -> pd.DataFrame:
     """
-    Given an encrypted DataFrame, a keys DataFrame, and the list of columns to decrypt:
-    - Merge the encrypted data with the keys data on the ID column.
-    - Use the keys and nonces to decrypt the specified columns.
+    Given an encrypted Arrow IPC file, the keys file, the master key and the list of columns to decrypt:
+    - Look up the salt of every ID met in the keys index (no merge of the keys into the data).
+    - Read and decrypt only the rows of the requested IDs and the selected columns, in chunks across a process pool.
     - Return a new DataFrame with decrypted plaintext.
     """
-    # Merge encrypted data and keys on the ID column
-    merged_df = pd.merge(encrypted_df, keys_df, on=id_col)
-
-    # Decrypt the specified columns
-    for col in columns_to_decrypt:
-        key_col = f'{col}_key'
-        nonce_col = f'{col}_nonce'
-
-        decrypted_values = []
-        for i, row in merged_df.iterrows():
-            # Retrieve key and nonce
-            key = base64.b64decode(row[key_col])
-            nonce_b64 = row[nonce_col]
-            ciphertext_b64 = row[col]
+    key_index = ces.KeyIndex.load(path_keys_data)
+    batches = ces.decrypt_batches(path_encrypted_data, key_index, master_key, id_col, columns_to_decrypt,
+                                  ids=ids, select=select, n_jobs=n_jobs)
+    schema = ces.decrypted_schema(path_encrypted_data, columns_to_decrypt, select)
+    return pa.Table.from_batches(list(batches), schema=schema).to_pandas()
 
-            # Decrypt the value
-            plain_text = decrypt_value_gcm(ciphertext_b64, nonce_b64, key)
-            decrypted_values.append(plain_text)
 
-        # Replace the encrypted column with the decrypted plaintext
-        merged_df[col] = decrypted_values
+def main(path_encrypted_data, path_keys_data, master_key_path, id_col, columns, output_path, ids=None, select=None,
+         n_jobs=-1):
 
-    # Remove the key/nonce columns
-    for col in columns_to_decrypt:
-        del merged_df[f'{col}_key']
-        del merged_df[f'{col}_nonce']
-
-    return merged_df
-
-def main(path_encrypted_data, path_keys_data, id_col, columns ,output_path):
-
-    #id_col: pk 
+    #id_col: pk
     #columns: encrypted columns
+    #ids: subjects to re-identify (all when None)
+    #select: output columns (all when None)
 
-    # Load the data
-    encrypted_df = pd.read_csv(path_encrypted_data)
-    keys_df = pd.read_csv(path_keys_data)
+    master_key = ces.load_master_key(master_key_path)
 
-    # Decrypt the columns
-    decrypted_df = decrypt_columns_gcm(
-        encrypted_df=encrypted_df,
-        keys_df=keys_df,
-        id_col=id_col,
-        columns_to_decrypt=columns
-    )
+    # Decrypt the columns, streaming the decrypted batches to the output CSV
+    ces.decrypt_to_csv(path_encrypted_data, path_keys_data, master_key, id_col, columns, output_path,
+                       ids=ids, select=select, n_jobs=n_jobs)
 
-    # Save the decrypted data
-    decrypted_df.to_csv(output_path, index=False)
     print(f"Decryption complete. Decrypted data written to '{output_path}'.")
 
+
 if __name__ == '__main__':
-    pass
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Decrypt columns encrypted by encryption_example.py")
+    parser.add_argument('input', help="Arrow IPC file with the encrypted data")
+    parser.add_argument('id_col', help="Column identifying the data subject")
+    parser.add_argument('columns', nargs='+', help="Columns to decrypt")
+    parser.add_argument('--keys', required=True, help="Arrow IPC file with the per-ID salts")
+    parser.add_argument('--master-key', required=True, help="Master key file")
+    parser.add_argument('--output', required=True, help="CSV file for the decrypted data")
+    parser.add_argument('--ids', nargs='+', help="Only decrypt the rows of these IDs")
+    parser.add_argument('--select', nargs='+', help="Only output these columns")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Worker processes (-1 = all cores)")
+    args = parser.parse_args()
+
+    main(args.input, args.keys, args.master_key, args.id_col, args.columns, args.output,
+         ids=args.ids, select=args.select, n_jobs=args.n_jobs)
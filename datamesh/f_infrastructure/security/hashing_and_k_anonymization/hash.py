@@ -1,55 +1,54 @@
+import argparse
+import os
+import sys
 import pandas as pd
-from argon2 import PasswordHasher
-import secrets
-
-def hash_value(value: str, ph: PasswordHasher) -> str:
-    """
-    Hash a given value using Argon2.
-    
-    Parameters
-    ----------
-    value : str
-        The string to hash.
-    ph : PasswordHasher
-        An Argon2 PasswordHasher instance preconfigured with desired parameters.
-    
-    Returns
-    -------
-    str
-        A hashed representation of 'value'.
-    """
-    # Convert the value to a string just to be sure it's hashable
-    if not isinstance(value, str):
-        value = str(value)
-    return ph.hash(value)
-
-def main(input_path, columns, output_path):
-
-    df = pd.read_csv(input_path)
-
-    # Create an Argon2 PasswordHasher instance with recommended parameters
-    # You may adjust memory_cost, time_cost, and parallelism depending on performance/security needs.
-    ph = PasswordHasher(
-        time_cost=3,      # Number of iterations
-        memory_cost=102400, # Memory usage in KiB
-        parallelism=2      # Number of parallel threads
-    )
+
+# Enabling pseudonymization service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
+import application.services.pseudonymization_service as ps
+
+# Rows read, pseudonymized and written at once
+CHUNK_ROWS = 1000000
+
+
+def main(input_path, columns, output_path, key_path, method=ps.DEFAULT_METHOD, chunk_rows=CHUNK_ROWS, n_jobs=-1):
+
+    # The key is created on first use and must be kept apart from the data: whoever holds it can
+    # recompute the pseudonym of any candidate value
+    if not os.path.exists(key_path):
+        ps.generate_key(key_path)
+    pseudonymizer = ps.Pseudonymizer(ps.load_key(key_path), method=method, n_jobs=n_jobs)
 
     # Hash the sensitive columns. Ideally, only hash data that must remain pseudonymous.
     # Store the hash and do NOT store the original data.
+    rows = 0
+    for chunk in pd.read_csv(input_path, dtype={column: str for column in columns}, chunksize=chunk_rows):
+        for column in columns:
+            chunk[f'{column}_hashed'] = pseudonymizer.pseudonymize(chunk[column])
 
-    for column in columns:
-        df[f'{column}_hashed'] = df[column].apply(lambda x: hash_value(x, ph))
+        # Drop the original columns to ensure data is not linkable
+        chunk.drop(columns=columns, inplace=True)
 
-    # Optionally drop the original columns to ensure data is not linkable
-    df.drop(columns=columns, inplace=True)
+        if rows == 0:
+            # The resulting dataframe now has hashed versions of sensitive fields.
+            print(chunk.head())
+        chunk.to_csv(output_path, index=False, mode='w' if rows == 0 else 'a', header=rows == 0)
+        rows += len(chunk)
 
-    # The resulting dataframe now has hashed versions of sensitive fields.
-    print(df)
+    print(f"Pseudonymized {len(columns)} columns of {rows} rows ({len(pseudonymizer.digests)} distinct values) "
+          f"with {method} to {output_path}")
 
-    df.to_csv(output_path, index=False)
 
 # Example usage:
 if __name__ == "__main__":
-    
-    pass
+    parser = argparse.ArgumentParser(description="Replace sensitive columns of a CSV file by keyed pseudonyms")
+    parser.add_argument('input', help="CSV file with the raw data")
+    parser.add_argument('columns', nargs='+', help="Columns to pseudonymize")
+    parser.add_argument('--output', required=True, help="CSV file for the pseudonymized data")
+    parser.add_argument('--key', required=True, help="Secret key file (created if missing)")
+    parser.add_argument('--method', choices=ps.METHODS, default=ps.DEFAULT_METHOD, help="Keyed hash function")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows processed at once")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Worker processes for Argon2 (-1 = all cores)")
+    args = parser.parse_args()
+
+    main(args.input, args.columns, args.output, args.key, args.method, args.chunk_rows, args.n_jobs)
@@ -10,29 +10,32 @@
 # Completely remove outlier values or portions of quasi-identifying fields that cannot be safely 
 # generalized without harming utility too much.
 
-from mondrian.classes.data_frame_manager import DataFrameManager
-from mondrian.classes.mondrian import Mondrian
+import argparse
+import os
+import sys
 from datetime import datetime
 import matplotlib.pyplot as plt
-import numpy as np
-import random
 import pandas as pd
 
-def plot_test(dfm, qi):
-    print('Started ananomyzation testing for different k values - this operation can take several minutes')
+# Enabling Mondrian service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
+import application.services.mondrian_service as ms
 
-    k_list = [ 2, 10, 20, 40, 60, 80, 100 ]
+# k values benchmarked by plot_test
+K_LIST = [2, 10, 20, 40, 60, 80, 100]
 
-    avg_list = [ ]
 
-    for k_value in k_list:
-        print('[DEBUG] - Started ananomyzation for k = %d' % k_value)
+def plot_test(matrix, n_jobs=-1, standalone=False):
+    print('Started anonymization testing for different k values')
 
-        mondrian = Mondrian(k_value, dfm, qi)
-        mondrian.anonymize_aux()
-        avg_list.append(round(mondrian.get_normalized_avg_equivalence_class_size(), 2))
-        
-        print('[DEBUG] - Finished ananomyzation for k = %d' % k_value)
+    # Every k is cut from the same partition tree, grown once (standalone also reruns each k alone, for comparison)
+    benchmark, sweep_seconds = ms.k_sweep(matrix, K_LIST, n_jobs=n_jobs, standalone=standalone)
+    print(benchmark.to_string(index=False))
+    print('Partitions for all %d k values computed in %.2f seconds' % (len(K_LIST), sweep_seconds))
+    if standalone:
+        print('(%.2f seconds when anonymizing for each k separately)' % benchmark['standalone_seconds'].sum())
+
+    k_list, avg_list = benchmark['k'].tolist(), benchmark['c_avg'].tolist()
 
     fig, ax = plt.subplots(figsize=(12,8))
     plt.plot(k_list, avg_list, marker='o')
@@ -46,9 +49,12 @@ def plot_test(dfm, qi):
     plt.xticks(k_list)
     plt.grid()
     plt.savefig('./plot_output.jpg')
+    plt.close(fig)
+
+    return benchmark
 
 
-def main(input_path, qi, k, rid, plt_flag, output_path):
+def main(input_path, qi, k, rid, plt_flag, output_path, n_jobs=-1, standalone_timing=False):
 
     # qi: variables that need to be generalized
     # k: number of paritions/groups identifiable
@@ -63,25 +69,35 @@ def main(input_path, qi, k, rid, plt_flag, output_path):
     print('[DEBUG] - ORIGINAL DATASET')
     print(df)
 
-    dfm = DataFrameManager(df, qi)
-
-    mondrian = Mondrian(k, dfm, qi)
+    matrix, labels = ms.encode_quasi_identifiers(df, qi)
 
     print('Starting anonymization for k = %d' % k)
     start = datetime.now()
-    mondrian.anonymize_aux()
+    partitions = ms.partition_sweep(matrix, [k], n_jobs=n_jobs)[k]
     end = (datetime.now() - start).total_seconds()
 
     print('Finished in %.2f seconds (%.3f minutes (%.2f hours))' % (end, end / 60, end / 60 / 60))
-    print('Normalized average equivalence class size metric AVG %.2f' % mondrian.get_normalized_avg_equivalence_class_size())
+    print('Normalized average equivalence class size metric AVG %.2f' % ms.normalized_avg_class_size(partitions, k))
     
     print('Writing anonymized data on file')
-    mondrian.write_on_file(output_path)
+    ms.generalize(df, qi, labels, partitions).to_csv(output_path, sep=';', index=False)
 
     # used to test anonymization for different k values
     if 'y' == plt_flag:
-        plot_test(dfm, qi)
+        plot_test(matrix, n_jobs=n_jobs, standalone=standalone_timing)
     
 
 if __name__ == '__main__':
-    pass
+    parser = argparse.ArgumentParser(description="k-anonymize a CSV file with Mondrian multidimensional partitioning")
+    parser.add_argument('input', help="CSV file with the raw data")
+    parser.add_argument('qi', nargs='+', help="Quasi-identifier columns to generalize")
+    parser.add_argument('-k', type=int, required=True, help="Minimum equivalence class size")
+    parser.add_argument('--output', required=True, help="CSV file (; separated) for the anonymized data")
+    parser.add_argument('--rid', choices=['y', 'n'], default='n', help="Drop the id column")
+    parser.add_argument('--plot', choices=['y', 'n'], default='n', help="Benchmark and plot C_AVG for k in %s" % K_LIST)
+    parser.add_argument('--standalone-timing', action='store_true', help="Also time each k of the benchmark anonymized on its own")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Worker processes (-1 = all cores)")
+    args = parser.parse_args()
+
+    main(args.input, args.qi, args.k, args.rid, args.plot, args.output, n_jobs=args.n_jobs,
+         standalone_timing=args.standalone_timing)
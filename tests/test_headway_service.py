@@ -0,0 +1,30 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Enabling headway service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import application.services.gtfs_time_utils as gtu
+import application.services.headway_service as hs
+
+
+def test_headway_stats_match_numpy_and_drop_null_keys():
+    keys = pd.DataFrame({
+        'route_id': ['200', '200', '200', '200', None, None, '201', '201', '201', '202'],
+        'stop_id': ['A', 'A', 'A', 'A', 'A', 'A', 'B', 'B', 'B', 'C'],
+    })
+    seconds = np.array([3600, 4200, 4500, 5700, 3700, 3900, 7200, gtu.INVALID_TIME, 9000, 3600])
+    stats = hs.headway_stats(keys, seconds)
+
+    # Rows with a null route are ignored, like INVALID_TIME rows; 202 has a single departure
+    assert stats[['route_id', 'stop_id']].values.tolist() == [['200', 'A'], ['201', 'B']]
+    assert stats['departures'].tolist() == [4, 2]
+
+    gaps = np.array([600, 300, 1200])
+    route_200 = stats.iloc[0]
+    assert route_200['headway_mean_min'] == gaps.mean() / 60
+    assert route_200['headway_max_min'] == 20
+    for percentile in hs.HEADWAY_PERCENTILES:
+        assert np.isclose(route_200[f'headway_p{percentile}_min'], np.percentile(gaps, percentile) / 60)
+    assert stats.iloc[1]['headway_mean_min'] == 30
@@ -0,0 +1,56 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Enabling HyperLogLog sketches
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import application.services.hyperloglog as hll
+
+PRECISION = 12
+KEYS = 64
+
+
+def sketch_of(distinct_counts, seed=0):
+    """
+    One sketch per key, key i holding distinct_counts[i] distinct values (each added twice), and the exact counts.
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.repeat(np.arange(len(distinct_counts)), distinct_counts)
+    hashes = hll.hash_values(rng.integers(0, 2 ** 62, len(keys)))
+    sketches = hll.HyperLogLogSketches(PRECISION)
+    sketches.add(np.concatenate([keys, keys]), np.concatenate([hashes, hashes]))
+    return sketches, np.asarray(distinct_counts)
+
+
+# Through the small range, around the linear counting cutoff (2.5 * 2^12 = 10240) and beyond
+@pytest.mark.parametrize('distinct', [100, 1000, 8000, 10000, 12000, 20000])
+def test_estimates_against_exact_counts(distinct):
+    sketches, exact = sketch_of([distinct] * KEYS)
+    _, estimates = sketches.estimate()
+    relative_errors = estimates / exact - 1
+
+    assert abs(relative_errors.mean()) < 0.005
+    assert np.sqrt(np.mean(relative_errors ** 2)) < 1.25 * hll.standard_error(PRECISION)
+
+
+def test_rollup_matches_exact_union():
+    # Hourly sketches of 24 keys rolled up into 2 days of 12 hours, against the exact distinct counts
+    sketches, exact = sketch_of(np.full(24, 2000), seed=1)
+    days = sketches.rollup(lambda keys: keys // 12)
+    day_keys, estimates = days.estimate()
+
+    assert day_keys.tolist() == [0, 1]
+    assert np.all(np.abs(estimates / (12 * 2000) - 1) < 4 * hll.standard_error(PRECISION))
+    assert np.array_equal(sketches.estimate_keys(np.array([0, 99])) > 0, [True, False])
+
+
+def test_merge_is_a_union():
+    left, _ = sketch_of([5000], seed=2)
+    right, _ = sketch_of([5000], seed=3)
+    merged = left.merge(right)
+    _, estimate = merged.estimate()
+    _, again = merged.merge(left).estimate()
+
+    assert abs(estimate[0] / 10000 - 1) < 4 * hll.standard_error(PRECISION)
+    assert again[0] == estimate[0]